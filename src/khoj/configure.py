@@ -32,6 +32,7 @@ from khoj.database.adapters import (
     AgentAdapters,
     ClientApplicationAdapters,
     ConversationAdapters,
+    EntryAdapters,
     ProcessLockAdapters,
     aget_or_create_user_by_phone_number,
     aget_user_by_phone_number,
@@ -40,7 +41,13 @@ from khoj.database.adapters import (
     get_all_users,
     get_or_create_search_models,
 )
-from khoj.database.models import ClientApplication, KhojUser, ProcessLock, Subscription
+from khoj.database.models import (
+    ClientApplication,
+    KhojUser,
+    ProcessLock,
+    SearchModelConfig,
+    Subscription,
+)
 from khoj.processor.embeddings import CrossEncoderModel, EmbeddingsModel
 from khoj.routers.api_content import configure_content, configure_search
 from khoj.routers.helpers import update_telemetry_state
@@ -265,6 +272,7 @@ def configure_server(
                     )
                 }
             )
+            configure_embeddings_index(model)
 
         state.SearchType = configure_search_types()
         state.search_models = configure_search(state.search_models, state.config.search_type)
@@ -284,6 +292,19 @@ def configure_server(
         logger.error(f"Failed to load some search models: {e}", exc_info=True)
 
 
+def configure_embeddings_index(search_model: SearchModelConfig):
+    "Build the vector index over entries embedded with the search model"
+    # Bi-encoder of the search model may have changed since the last start, so always use the loaded model dimensions
+    embeddings_dimensions = state.embeddings_model[search_model.name].embeddings_dimensions()
+    if search_model.embeddings_dimensions != embeddings_dimensions:
+        search_model.embeddings_dimensions = embeddings_dimensions
+        search_model.save()
+    try:
+        EntryAdapters.ensure_embeddings_index(search_model)
+    except Exception as e:
+        logger.error(f"Failed to build vector index for search model {search_model.name}: {e}", exc_info=True)
+
+
 def setup_default_agent(user: KhojUser):
     AgentAdapters.create_default_agent(user)
 
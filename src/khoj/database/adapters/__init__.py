@@ -6,31 +6,48 @@ import random
 import re
 import secrets
 import sys
+import time
 from datetime import date, datetime, timedelta, timezone
 from enum import Enum
-from functools import wraps
+from functools import lru_cache, wraps
 from typing import (
     Any,
     Callable,
     Coroutine,
+    Dict,
     Iterable,
     List,
     Optional,
     ParamSpec,
+    Tuple,
     TypeVar,
 )
 
 import cron_descriptor
 from apscheduler.job import Job
 from asgiref.sync import sync_to_async
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
 from django.contrib.sessions.backends.db import SessionStore
-from django.db.models import Prefetch, Q
+from django.db import connection, transaction
+from django.db.models import (
+    F,
+    FloatField,
+    Func,
+    IntegerField,
+    Lookup,
+    Min,
+    Prefetch,
+    Q,
+    Value,
+)
+from django.db.models.functions import Cast, Upper
+from django.db.models.lookups import Contains
 from django.db.models.manager import BaseManager
-from django.db.utils import IntegrityError
+from django.db.utils import DataError, IntegrityError
 from django_apscheduler import util
 from django_apscheduler.models import DjangoJob, DjangoJobExecution
 from fastapi import HTTPException
-from pgvector.django import CosineDistance
+from pgvector.django import CosineDistance, VectorField
 from torch import Tensor
 
 from khoj.database.models import (
@@ -63,9 +80,8 @@ from khoj.database.models import (
     WebScraper,
 )
 from khoj.processor.conversation import prompts
-from khoj.search_filter.date_filter import DateFilter
-from khoj.search_filter.file_filter import FileFilter
-from khoj.search_filter.word_filter import WordFilter
+from khoj.search_filter import query_parser
+from khoj.search_filter.query_parser import parse_query_filters
 from khoj.utils import state
 from khoj.utils.config import OfflineChatProcessorModel
 from khoj.utils.helpers import (
@@ -93,6 +109,17 @@ P = ParamSpec("P")
 T = TypeVar("T")
 
 
+class Like(Lookup):
+    "Case sensitive SQL LIKE pattern match. Can use a trigram index on the matched field"
+
+    lookup_name = "like"
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f"{lhs} LIKE {rhs}", [*lhs_params, *rhs_params]
+
+
 def require_valid_user(func: Callable[P, T]) -> Callable[P, T]:
     @wraps(func)
     def sync_wrapper(*args: P.args, **kwargs: P.kwargs) -> T:
@@ -537,6 +564,20 @@ def get_default_search_model() -> SearchModelConfig:
     return SearchModelConfig.objects.first()
 
 
+SEARCH_MODEL_CACHE_TTL = float(os.getenv("KHOJ_SEARCH_MODEL_CACHE_TTL", "60"))  # seconds
+default_search_model_cache: Tuple[float, SearchModelConfig] = (0, None)
+
+
+async def aget_default_search_model() -> SearchModelConfig:
+    "Get default search model. Cache it in memory to not query the database on each search"
+    global default_search_model_cache
+    cached_at, search_model = default_search_model_cache
+    if search_model is None or time.monotonic() - cached_at > SEARCH_MODEL_CACHE_TTL:
+        search_model = await sync_to_async(get_default_search_model)()
+        default_search_model_cache = (time.monotonic(), search_model)
+    return search_model
+
+
 def get_or_create_search_models():
     search_models = SearchModelConfig.objects.all()
     if search_models.count() == 0:
@@ -804,7 +845,8 @@ class AgentAdapters:
             }
         )
 
-        # Delete all existing files and entries
+        # Delete all existing files and entries. Invalidate cached search results with agent
+        state.query_cache.invalidate(f"agent:{agent.slug}")
         await FileObject.objects.filter(agent=agent).adelete()
         await Entry.objects.filter(agent=agent).adelete()
 
@@ -829,6 +871,7 @@ class AgentAdapters:
                             file_name=entry.file_name,
                             url=entry.url,
                             hashed_value=entry.hashed_value,
+                            search_model_id=entry.search_model_id,
                         )
                     )
 
@@ -1402,14 +1445,47 @@ class ConversationAdapters:
     @require_valid_user
     def delete_message_by_turn_id(user: KhojUser, conversation_id: str, turn_id: str):
         conversation = ConversationAdapters.get_conversation_by_user(user, conversation_id=conversation_id)
-        if not conversation or not conversation.conversation_log or not conversation.conversation_log.get("chat"):
+        if not conversation or not conversation.chat_messages.exists():
             return False
-        conversation_log = conversation.conversation_log
-        updated_log = [msg for msg in conversation_log["chat"] if msg.get("turnId") != turn_id]
-        conversation.conversation_log["chat"] = updated_log
+        # Delete messages of turn without loading the rest of the conversation
+        conversation.chat_messages.filter(turn_id=turn_id).delete()
         conversation.save()
         return True
 
+    @staticmethod
+    def get_conversation_messages(
+        conversation: Conversation, before_turn_id: str = None, limit: int = 50, include_context: bool = False
+    ) -> Tuple[List[dict], bool]:
+        """Get latest messages of conversation before the turn with before_turn_id, in chronological order.
+
+        Returns the messages and whether the conversation has older messages. Messages of a turn are not split across
+        windows. Context fields of messages are only loaded if include_context is set.
+        """
+        messages = conversation.chat_messages.order_by("-index")
+        if before_turn_id:
+            turn_start = conversation.chat_messages.filter(turn_id=before_turn_id).aggregate(Min("index"))
+            if turn_start["index__min"] is not None:
+                messages = messages.filter(index__lt=turn_start["index__min"])
+        if not include_context:
+            messages = messages.defer("context")
+
+        window = list(messages[:limit])
+        if not window:
+            return [], False
+
+        # Include rest of oldest turn in window
+        oldest = window[-1]
+        if oldest.turn_id:
+            window += list(messages.filter(turn_id=oldest.turn_id, index__lt=oldest.index))
+        has_more = messages.filter(index__lt=window[-1].index).exists()
+        return [message.to_log(include_context) for message in reversed(window)], has_more
+
+    @staticmethod
+    def get_conversation_turn_context(conversation: Conversation, turn_id: str) -> List[dict]:
+        "Get context fields of messages in a conversation turn"
+        messages = conversation.chat_messages.filter(turn_id=turn_id).order_by("index").only("by", "turn_id", "context")
+        return [{"by": message.by, "turnId": message.turn_id, **message.context} for message in messages]
+
 
 class FileObjectAdapters:
     @staticmethod
@@ -1437,6 +1513,11 @@ class FileObjectAdapters:
     def delete_file_object_by_name(user: KhojUser, file_name: str):
         return FileObject.objects.filter(user=user, file_name=file_name).delete()
 
+    @staticmethod
+    @require_valid_user
+    def delete_file_objects_by_names(user: KhojUser, file_names: List[str]):
+        return FileObject.objects.filter(user=user, file_name__in=file_names).delete()
+
     @staticmethod
     @require_valid_user
     def delete_all_file_objects(user: KhojUser):
@@ -1479,9 +1560,15 @@ class FileObjectAdapters:
 
 
 class EntryAdapters:
-    word_filter = WordFilter()
-    file_filter = FileFilter()
-    date_filter = DateFilter()
+    word_filter = query_parser.word_filter
+    file_filter = query_parser.file_filter
+    date_filter = query_parser.date_filter
+    # Use exact search for owners with fewer relevant entries than this, vector index search for the rest
+    vector_index_min_entries = 10000
+    # Multiple of requested results to fetch from the vector index, as candidates can be dropped by filters
+    vector_index_overfetch = 4
+    # Rank constant of reciprocal rank fusion. Dampens the weight of top ranked results of each retriever
+    rrf_k = 60
 
     @staticmethod
     @require_valid_user
@@ -1492,6 +1579,7 @@ class EntryAdapters:
     @require_valid_user
     def delete_entry_by_file(user: KhojUser, file_path: str):
         deleted_count, _ = Entry.objects.filter(user=user, file_path=file_path).delete()
+        state.query_cache.invalidate(str(user.uuid))
         return deleted_count
 
     @staticmethod
@@ -1517,6 +1605,7 @@ class EntryAdapters:
             batch = Entry.objects.filter(id__in=batch_ids, user=user)
             count, _ = batch.delete()
             deleted_count += count
+        state.query_cache.invalidate(str(user.uuid))
         return deleted_count
 
     @staticmethod
@@ -1529,6 +1618,7 @@ class EntryAdapters:
             batch = Entry.objects.filter(id__in=batch_ids, user=user)
             count, _ = await batch.adelete()
             deleted_count += count
+        state.query_cache.invalidate(str(user.uuid))
         return deleted_count
 
     @staticmethod
@@ -1536,10 +1626,45 @@ class EntryAdapters:
     def get_existing_entry_hashes_by_file(user: KhojUser, file_path: str):
         return Entry.objects.filter(user=user, file_path=file_path).values_list("hashed_value", flat=True)
 
+    @staticmethod
+    @require_valid_user
+    def get_existing_entry_hashes_by_file_type(user: KhojUser, file_type: str):
+        "Stream file path, hash pairs of all entries of user with file type in a single query"
+        return (
+            Entry.objects.filter(user=user, file_type=file_type)
+            .values_list("file_path", "hashed_value")
+            .iterator(chunk_size=10000)
+        )
+
     @staticmethod
     @require_valid_user
     def delete_entry_by_hash(user: KhojUser, hashed_values: List[str]):
         Entry.objects.filter(user=user, hashed_value__in=hashed_values).delete()
+        state.query_cache.invalidate(str(user.uuid))
+
+    @staticmethod
+    @require_valid_user
+    def delete_entries_by_hashes(user: KhojUser, hashed_values: List[str], batch_size=10000):
+        deleted_count = 0
+        for i in range(0, len(hashed_values), batch_size):
+            batch = hashed_values[i : i + batch_size]
+            count, _ = Entry.objects.filter(user=user, hashed_value__in=batch).delete()
+            deleted_count += count
+
+        state.query_cache.invalidate(str(user.uuid))
+        return deleted_count
+
+    @staticmethod
+    @require_valid_user
+    def delete_entries_by_filenames(user: KhojUser, filenames: List[str], batch_size=1000):
+        deleted_count = 0
+        for i in range(0, len(filenames), batch_size):
+            batch = filenames[i : i + batch_size]
+            count, _ = Entry.objects.filter(user=user, file_path__in=batch).delete()
+            deleted_count += count
+
+        state.query_cache.invalidate(str(user.uuid))
+        return deleted_count
 
     @staticmethod
     def get_entries_by_date_filter(entry: BaseManager[Entry], start_date: date, end_date: date):
@@ -1571,7 +1696,9 @@ class EntryAdapters:
     @staticmethod
     @arequire_valid_user
     async def adelete_entry_by_file(user: KhojUser, file_path: str):
-        return await Entry.objects.filter(user=user, file_path=file_path).adelete()
+        deleted = await Entry.objects.filter(user=user, file_path=file_path).adelete()
+        state.query_cache.invalidate(str(user.uuid))
+        return deleted
 
     @staticmethod
     @arequire_valid_user
@@ -1582,6 +1709,7 @@ class EntryAdapters:
             count, _ = await Entry.objects.filter(user=user, file_path__in=batch).adelete()
             deleted_count += count
 
+        state.query_cache.invalidate(str(user.uuid))
         return deleted_count
 
     @staticmethod
@@ -1608,13 +1736,30 @@ class EntryAdapters:
         total_size = sum(sys.getsizeof(entry.compiled) for entry in entries)
         return total_size / 1024 / 1024
 
+    @staticmethod
+    def get_file_path_filter(file_terms: List[str]) -> Q:
+        """Filter entries with file path matching any of the file terms.
+
+        Exact file paths are looked up by the file path index. File names match the end of file paths and
+        glob terms match file paths by pattern. Both use the trigram index on file paths.
+        """
+        exact_paths = [term for term in file_terms if not EntryAdapters.file_filter.is_glob(term)]
+        q_file_filter = Q(file_path__in=exact_paths) if exact_paths else Q()
+        for term in file_terms:
+            is_file_name = "/" not in term and "\\" not in term
+            if EntryAdapters.file_filter.is_glob(term) or is_file_name:
+                like_pattern = EntryAdapters.file_filter.convert_to_like_pattern(term)
+                q_file_filter |= Q(Like(F("file_path"), like_pattern))
+        return q_file_filter
+
     @staticmethod
     def apply_filters(user: KhojUser, query: str, file_type_filter: str = None, agent: Agent = None):
         q_filter_terms = Q()
 
-        word_filters = EntryAdapters.word_filter.get_filter_terms(query)
-        file_filters = EntryAdapters.file_filter.get_filter_terms(query)
-        date_filters = EntryAdapters.date_filter.get_query_date_range(query)
+        query_filters = parse_query_filters(query)
+        word_filters = query_filters.words
+        file_filters = query_filters.files
+        date_filters = query_filters.date_range
 
         owner_filter = Q()
 
@@ -1626,42 +1771,38 @@ class EntryAdapters:
         if owner_filter == Q():
             return Entry.objects.none()
 
-        if len(word_filters) == 0 and len(file_filters) == 0 and len(date_filters) == 0:
+        if not query_filters.has_filters():
             return Entry.objects.filter(owner_filter)
 
+        # Word filters match on the same UPPER(raw) expression as the trigram index on entry text. So the index serves
+        # words of 3 or more characters, instead of scanning the text of every entry
         for term in word_filters:
             if term.startswith("+"):
-                q_filter_terms &= Q(raw__icontains=term[1:])
+                q_filter_terms &= Q(Contains(Upper("raw"), term[1:].upper()))
             elif term.startswith("-"):
-                q_filter_terms &= ~Q(raw__icontains=term[1:])
-
-        q_file_filter_terms = Q()
+                q_filter_terms &= ~Q(Contains(Upper("raw"), term[1:].upper()))
 
         if len(file_filters) > 0:
-            for term in file_filters:
-                if term.startswith("-"):
-                    # Convert the glob term to a regex pattern
-                    regex_term = re.escape(term[1:]).replace(r"\*", ".*").replace(r"\?", ".")
-                    # Exclude all files that match the regex term
-                    q_file_filter_terms &= ~Q(file_path__regex=regex_term)
-                else:
-                    # Convert the glob term to a regex pattern
-                    regex_term = re.escape(term).replace(r"\*", ".*").replace(r"\?", ".")
-                    # Include any files that match the regex term
-                    q_file_filter_terms |= Q(file_path__regex=regex_term)
-
-            q_filter_terms &= q_file_filter_terms
+            included_files = [term for term in file_filters if not term.startswith("-")]
+            excluded_files = [term[1:] for term in file_filters if term.startswith("-")]
+            # Include any files that match the included file terms
+            if included_files:
+                q_filter_terms &= EntryAdapters.get_file_path_filter(included_files)
+            # Exclude all files that match the excluded file terms
+            if excluded_files:
+                q_filter_terms &= ~EntryAdapters.get_file_path_filter(excluded_files)
 
         if len(date_filters) > 0:
+            # Filter entries with date range overlapping the query date range
             min_date, max_date = date_filters
             if min_date is not None:
                 # Convert the min_date timestamp to yyyy-mm-dd format
                 formatted_min_date = date.fromtimestamp(min_date).strftime("%Y-%m-%d")
-                q_filter_terms &= Q(embeddings_dates__date__gte=formatted_min_date)
+                q_filter_terms &= Q(max_date__gte=formatted_min_date)
             if max_date is not None:
                 # Convert the max_date timestamp to yyyy-mm-dd format
                 formatted_max_date = date.fromtimestamp(max_date).strftime("%Y-%m-%d")
-                q_filter_terms &= Q(embeddings_dates__date__lte=formatted_max_date)
+                q_filter_terms &= Q(min_date__lte=formatted_max_date)
 
         relevant_entries = Entry.objects.filter(owner_filter).filter(q_filter_terms)
         if file_type_filter:
@@ -1669,15 +1810,144 @@ class EntryAdapters:
         return relevant_entries
 
     @staticmethod
-    def search_with_embeddings(
-        raw_query: str,
-        embeddings: Tensor,
-        user: KhojUser,
-        max_results: int = 10,
-        file_type_filter: str = None,
-        max_distance: float = math.inf,
-        agent: Agent = None,
+    def get_search_model_filter(search_model: SearchModelConfig) -> Q:
+        "Entries embedded with the search model. Entries indexed before search models were tracked use the default"
+        if search_model.name == "default":
+            return Q(search_model=search_model) | Q(search_model__isnull=True)
+        return Q(search_model=search_model)
+
+    @staticmethod
+    @lru_cache
+    def supports_iterative_index_scan() -> bool:
+        "Iterative index scans keep scanning the vector index until enough rows pass the filters. Added in pgvector 0.8"
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT extversion FROM pg_extension WHERE extname = 'vector'")
+            row = cursor.fetchone()
+        if row is None:
+            return False
+        version = tuple(int(part) for part in re.findall(r"\d+", row[0])[:2])
+        return version >= (0, 8)
+
+    @staticmethod
+    def get_embeddings_index_name(search_model: SearchModelConfig, num_lists: int = None) -> str:
+        index_type = search_model.vector_index_type
+        if index_type == SearchModelConfig.VectorIndexType.IVFFLAT:
+            index_type = f"{index_type}{num_lists}"
+        default_suffix = "_default" if search_model.name == "default" else ""
+        return (
+            f"entry_embeddings_{search_model.id}_{index_type}_{search_model.embeddings_dimensions}{default_suffix}_idx"
+        )
+
+    @staticmethod
+    def ensure_embeddings_index(search_model: SearchModelConfig):
+        """Create the approximate nearest neighbour index over entries embedded with the search model.
+
+        Entry embeddings have no fixed dimension as different search models produce embeddings of different sizes.
+        So a partial index is built per search model over the embeddings cast to the dimension of that model.
+        Stale indexes of the search model, from a previous index type, dimension or IVFFlat list size, and invalid
+        indexes left behind by a failed concurrent build are dropped. This runs on server start, so an IVFFlat index
+        is rebuilt with more lists on the first restart after the number of entries doubles.
+        """
+        table = Entry._meta.db_table
+        index_prefix = f"entry_embeddings_{search_model.id}_"
+        build_index = (
+            search_model.embeddings_dimensions is not None
+            and search_model.vector_index_type != SearchModelConfig.VectorIndexType.NONE
+        )
+
+        search_model_entries = Entry.objects.filter(EntryAdapters.get_search_model_filter(search_model))
+        num_lists = None
+        if build_index and search_model.vector_index_type == SearchModelConfig.VectorIndexType.IVFFLAT:
+            # Recommended number of lists for IVFFlat index is number of rows / 1000 for upto 1M rows.
+            # Round down to a power of 2 to only rebuild the index when the number of entries doubles
+            num_entries = search_model_entries.count()
+            num_lists = 2 ** int(math.log2(max(1, num_entries // 1000)))
+        index_name = EntryAdapters.get_embeddings_index_name(search_model, num_lists) if build_index else None
+
+        # Cannot build index concurrently inside a transaction, e.g when running tests
+        concurrently = "" if connection.in_atomic_block else "CONCURRENTLY "
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT index_class.relname, pg_index.indisvalid
+                FROM pg_index
+                JOIN pg_class index_class ON index_class.oid = pg_index.indexrelid
+                JOIN pg_class table_class ON table_class.oid = pg_index.indrelid
+                WHERE table_class.relname = %s AND index_class.relname LIKE %s
+                """,
+                [table, f"{index_prefix}%"],
+            )
+            index_exists = False
+            for existing_index_name, is_valid in cursor.fetchall():
+                if existing_index_name == index_name and is_valid:
+                    index_exists = True
+                    continue
+                logger.info(f"Dropping stale vector index {existing_index_name}")
+                cursor.execute(f'DROP INDEX {concurrently}IF EXISTS "{existing_index_name}"')
+
+            if not build_index or index_exists:
+                return
+
+            # Embeddings of all entries must have the dimension of the search model to be cast for the index
+            with timer(f"Verified embeddings dimensions for vector index {index_name} in", logger):
+                entry_dimensions = set(
+                    search_model_entries.annotate(
+                        dimensions=Func("embeddings", function="vector_dims", output_field=IntegerField())
+                    )
+                    .values_list("dimensions", flat=True)
+                    .distinct()[:2]
+                )
+            if entry_dimensions - {search_model.embeddings_dimensions}:
+                logger.warning(
+                    f"Skip building vector index for search model {search_model.name}. Entries have embeddings of "
+                    f"dimensions {entry_dimensions} instead of {search_model.embeddings_dimensions}. Regenerate the "
+                    f"entries with the current search model to use the vector index."
+                )
+                return
+
+            search_model_predicate = f"search_model_id = {int(search_model.id)}"
+            if search_model.name == "default":
+                search_model_predicate = f"({search_model_predicate} OR search_model_id IS NULL)"
+            index_options = f" WITH (lists = {num_lists})" if num_lists else ""
+
+            with timer(f"Built vector index {index_name} in", logger, log_level=logging.INFO):
+                cursor.execute(
+                    f'CREATE INDEX {concurrently}IF NOT EXISTS "{index_name}" ON "{table}" '
+                    f"USING {search_model.vector_index_type} "
+                    f"((embeddings::vector({int(search_model.embeddings_dimensions)})) vector_cosine_ops)"
+                    f"{index_options} WHERE {search_model_predicate}"
+                )
+
+    @staticmethod
+    def get_vector_index_queryset(
+        relevant_entries: BaseManager[Entry], embeddings: Tensor, search_model: SearchModelConfig, max_results: int
     ):
+        "Order entries by distance to embeddings cast to the dimension of the search model to use its vector index"
+        indexed_embeddings = Cast("embeddings", output_field=VectorField(dimensions=search_model.embeddings_dimensions))
+        relevant_entries = relevant_entries.filter(EntryAdapters.get_search_model_filter(search_model))
+        relevant_entries = relevant_entries.annotate(distance=CosineDistance(indexed_embeddings, embeddings))
+        return relevant_entries.order_by("distance")[:max_results]
+
+    @staticmethod
+    def set_vector_index_search_params(search_model: SearchModelConfig, num_candidates: int):
+        "Set vector index search parameters for the current transaction"
+        iterative_scan = EntryAdapters.supports_iterative_index_scan()
+        with connection.cursor() as cursor:
+            if search_model.vector_index_type == SearchModelConfig.VectorIndexType.HNSW:
+                ef_search = max(search_model.hnsw_ef_search, num_candidates)
+                cursor.execute("SELECT set_config('hnsw.ef_search', %s, true)", [str(ef_search)])
+                if iterative_scan:
+                    cursor.execute("SELECT set_config('hnsw.iterative_scan', 'relaxed_order', true)")
+            elif search_model.vector_index_type == SearchModelConfig.VectorIndexType.IVFFLAT:
+                cursor.execute("SELECT set_config('ivfflat.probes', %s, true)", [str(search_model.ivfflat_probes)])
+                if iterative_scan:
+                    cursor.execute("SELECT set_config('ivfflat.iterative_scan', 'relaxed_order', true)")
+
+    @staticmethod
+    def get_relevant_entries(
+        raw_query: str, user: KhojUser, file_type_filter: str = None, agent: Agent = None
+    ) -> BaseManager[Entry]:
+        "Entries of the owner that pass the file type and word, file and date filters in the query"
         owner_filter = Q()
 
         if user != None:
@@ -1689,15 +1959,269 @@ class EntryAdapters:
             return Entry.objects.none()
 
         relevant_entries = EntryAdapters.apply_filters(user, raw_query, file_type_filter, agent)
-        relevant_entries = relevant_entries.filter(owner_filter).annotate(
-            distance=CosineDistance("embeddings", embeddings)
-        )
-        relevant_entries = relevant_entries.filter(distance__lte=max_distance)
-
+        relevant_entries = relevant_entries.filter(owner_filter)
         if file_type_filter:
             relevant_entries = relevant_entries.filter(file_type=file_type_filter)
-        relevant_entries = relevant_entries.order_by("distance")
-        return relevant_entries[:max_results]
+        return relevant_entries
+
+    @staticmethod
+    def can_use_vector_index(
+        relevant_entries: BaseManager[Entry],
+        search_model: SearchModelConfig,
+        partition_cache_key: Optional[Tuple[str, str]] = None,
+    ) -> bool:
+        """Partition search by the number of entries relevant to the owner and query filters.
+
+        An exact search over a small partition is fast and precise. Use the vector index for large partitions.
+        The partition size check is cached per owner and filters, if partition cache key is passed. Cached checks
+        are invalidated with the search results of the owner when their entries change.
+        """
+        if (
+            search_model is None
+            or search_model.embeddings_dimensions is None
+            or search_model.vector_index_type == SearchModelConfig.VectorIndexType.NONE
+        ):
+            return False
+
+        is_large_partition = state.query_cache.get(*partition_cache_key) if partition_cache_key else None
+        if is_large_partition is None:
+            is_large_partition = (
+                relevant_entries[: EntryAdapters.vector_index_min_entries].count()
+                >= EntryAdapters.vector_index_min_entries
+            )
+            if partition_cache_key:
+                state.query_cache.set(*partition_cache_key, is_large_partition)
+        return is_large_partition
+
+    @staticmethod
+    def get_partition_cache_key(
+        filters_key: tuple, user: KhojUser, file_type_filter: str = None, agent: Agent = None
+    ) -> Optional[Tuple[str, str]]:
+        "User id and key to cache partition size check of the user by query filters"
+        if user is None:
+            return None
+        # Entries of agent change with its knowledge base, so include its cache version in the key
+        agent_key = f"{agent.slug}-{state.query_cache.get_version(f'agent:{agent.slug}')}" if agent else None
+        min_entries = EntryAdapters.vector_index_min_entries
+        return str(user.uuid), f"partition-{filters_key}-{file_type_filter}-{agent_key}-{min_entries}"
+
+    @staticmethod
+    def get_exact_search_queryset(
+        relevant_entries: BaseManager[Entry], embeddings: Tensor, max_results: int, max_distance: float = math.inf
+    ):
+        relevant_entries = relevant_entries.annotate(distance=CosineDistance("embeddings", embeddings))
+        relevant_entries = relevant_entries.filter(distance__lte=max_distance)
+        return relevant_entries.order_by("distance")[:max_results]
+
+    @staticmethod
+    def get_lexical_search_queryset(
+        relevant_entries: BaseManager[Entry], raw_query: str, embeddings: Tensor, max_results: int
+    ):
+        """Order entries matching any word of the query by full-text rank.
+
+        Uses the full-text index on entry text. Returns None if the query has no words after removing filters.
+        """
+        defiltered_query = parse_query_filters(raw_query).defiltered_query
+        words = list(dict.fromkeys(re.findall(r"\w+", defiltered_query.lower())))
+        if not words:
+            return None
+
+        search_vector = SearchVector("raw", config="simple")
+        search_query = SearchQuery(" | ".join(words), config="simple", search_type="raw")
+        relevant_entries = relevant_entries.alias(search=search_vector).filter(search=search_query)
+        # Normalize rank by log of entry length, so long entries do not rank higher just for repeating words
+        relevant_entries = relevant_entries.annotate(
+            rank=SearchRank(search_vector, search_query, normalization=1),
+            distance=CosineDistance("embeddings", embeddings),
+        )
+        return relevant_entries.order_by("-rank")[:max_results]
+
+    @staticmethod
+    def fuse_ranked_hits(hits_by_retriever: List[List[Entry]], max_results: int) -> List[Entry]:
+        "Fuse hits ranked by each retriever with reciprocal rank fusion"
+        scores: Dict[int, float] = {}
+        hits_by_id: Dict[int, Entry] = {}
+        for hits in hits_by_retriever:
+            for rank, hit in enumerate(hits, start=1):
+                scores[hit.id] = scores.get(hit.id, 0) + 1 / (EntryAdapters.rrf_k + rank)
+                hits_by_id.setdefault(hit.id, hit)
+        fused_ids = sorted(scores, key=lambda hit_id: scores[hit_id], reverse=True)[:max_results]
+        return [hits_by_id[hit_id] for hit_id in fused_ids]
+
+    @staticmethod
+    def search_with_embeddings(
+        raw_query: str,
+        embeddings: Tensor,
+        user: KhojUser,
+        max_results: int = 10,
+        file_type_filter: str = None,
+        max_distance: float = math.inf,
+        agent: Agent = None,
+        search_model: SearchModelConfig = None,
+        hybrid: bool = False,
+    ) -> List[Entry]:
+        return EntryAdapters.search_with_embeddings_batch(
+            [raw_query],
+            [embeddings],
+            user,
+            max_results=max_results,
+            file_type_filter=file_type_filter,
+            max_distance=max_distance,
+            agent=agent,
+            search_model=search_model,
+            hybrid=hybrid,
+        )[0]
+
+    @staticmethod
+    def search_with_embeddings_batch(
+        raw_queries: List[str],
+        embeddings: List[Tensor],
+        user: KhojUser,
+        max_results: int = 10,
+        file_type_filter: str = None,
+        max_distance: float = math.inf,
+        agent: Agent = None,
+        search_model: SearchModelConfig = None,
+        latencies: Dict[str, float] = None,
+        hybrid: bool = False,
+    ) -> List[List[Entry]]:
+        """Search entries relevant to each query in a single database round trip.
+
+        The search for each query is combined into one UNION ALL statement. Queries over large partitions use the
+        vector index, with candidates over-fetched for filtering. The rest use an exact search. Queries for which the
+        vector index returned too few candidates are retried with an exact search.
+        In hybrid mode, a full-text search for each query is added to the same statement. Its hits are fused with the
+        vector search hits by reciprocal rank fusion. Full-text hits are not dropped by the max distance.
+        Seconds taken to filter entries and to search them are added to latencies, if passed.
+        """
+        hits_by_query: List[List[Entry]] = [[] for _ in raw_queries]
+        if is_none_or_empty(raw_queries):
+            return hits_by_query
+        latencies = latencies if latencies is not None else {}
+        start_time = time.perf_counter()
+
+        # Build search for each query. Reuse partition size check across queries with the same filters
+        searches = []
+        indexed_queries = set()
+        can_use_vector_index_by_filters: dict[tuple, bool] = {}
+        for query_index, (raw_query, query_embeddings) in enumerate(zip(raw_queries, embeddings)):
+            relevant_entries = EntryAdapters.get_relevant_entries(raw_query, user, file_type_filter, agent)
+            if hybrid:
+                # Tag full-text searches with query index offset by number of queries to separate their hits
+                lexical_query_index = Value(len(raw_queries) + query_index, output_field=IntegerField())
+                lexical_search = EntryAdapters.get_lexical_search_queryset(
+                    relevant_entries.annotate(query_index=lexical_query_index), raw_query, query_embeddings, max_results
+                )
+                if lexical_search is not None:
+                    searches.append(lexical_search)
+            relevant_entries = relevant_entries.annotate(query_index=Value(query_index, output_field=IntegerField()))
+            if hybrid:
+                # Select same columns as the full-text searches to combine them
+                relevant_entries = relevant_entries.annotate(rank=Value(0.0, output_field=FloatField()))
+            query_filters = parse_query_filters(raw_query)
+            # Resolved date range of relative dates, like "last week", changes over time
+            filters_key = query_filters.terms + query_filters.date_range
+            if filters_key not in can_use_vector_index_by_filters:
+                partition_cache_key = EntryAdapters.get_partition_cache_key(filters_key, user, file_type_filter, agent)
+                can_use_vector_index_by_filters[filters_key] = EntryAdapters.can_use_vector_index(
+                    relevant_entries, search_model, partition_cache_key
+                )
+            if can_use_vector_index_by_filters[filters_key]:
+                indexed_queries.add(query_index)
+                num_candidates = max_results * EntryAdapters.vector_index_overfetch
+                searches.append(
+                    EntryAdapters.get_vector_index_queryset(
+                        relevant_entries, query_embeddings, search_model, num_candidates
+                    )
+                )
+            else:
+                searches.append(
+                    EntryAdapters.get_exact_search_queryset(
+                        relevant_entries, query_embeddings, max_results, max_distance
+                    )
+                )
+
+        combined_search = searches[0].union(*searches[1:], all=True) if len(searches) > 1 else searches[0]
+        latencies["filter"] = latencies.get("filter", 0) + time.perf_counter() - start_time
+        start_time = time.perf_counter()
+        try:
+            with transaction.atomic():
+                if indexed_queries:
+                    EntryAdapters.set_vector_index_search_params(
+                        search_model, max_results * EntryAdapters.vector_index_overfetch
+                    )
+                hits = list(combined_search)
+        except DataError as e:
+            # Embeddings of some entries do not have the dimension of the search model
+            logger.warning(f"Failed to search vector index of search model {search_model.name}: {e}")
+            latencies["ann"] = latencies.get("ann", 0) + time.perf_counter() - start_time
+            return EntryAdapters.search_with_embeddings_batch(
+                raw_queries,
+                embeddings,
+                user,
+                max_results,
+                file_type_filter,
+                max_distance,
+                agent,
+                search_model=None,
+                latencies=latencies,
+                hybrid=hybrid,
+            )
+
+        lexical_hits_by_query: List[List[Entry]] = [[] for _ in raw_queries]
+        for hit in hits:
+            if hit.query_index >= len(raw_queries):
+                lexical_hits_by_query[hit.query_index - len(raw_queries)].append(hit)
+            else:
+                hits_by_query[hit.query_index].append(hit)
+
+        # Retry queries for which the vector index returned too few candidates with an exact search, in one round trip
+        short_queries = [idx for idx in sorted(indexed_queries) if len(hits_by_query[idx]) < max_results]
+        if short_queries:
+            logger.debug(f"Vector index returned too few results for {len(short_queries)} queries. Use exact search.")
+            fallback_searches = []
+            for query_index in short_queries:
+                relevant_entries = EntryAdapters.get_relevant_entries(
+                    raw_queries[query_index], user, file_type_filter, agent
+                )
+                relevant_entries = relevant_entries.annotate(
+                    query_index=Value(query_index, output_field=IntegerField())
+                )
+                fallback_searches.append(
+                    EntryAdapters.get_exact_search_queryset(
+                        relevant_entries, embeddings[query_index], max_results, max_distance
+                    )
+                )
+                hits_by_query[query_index] = []
+                indexed_queries.remove(query_index)
+            fallback_search = (
+                fallback_searches[0].union(*fallback_searches[1:], all=True)
+                if len(fallback_searches) > 1
+                else fallback_searches[0]
+            )
+            for hit in fallback_search:
+                hits_by_query[hit.query_index].append(hit)
+
+        for query_index in indexed_queries:
+            # Iterative index scans return candidates in approximate order, so sort them by distance
+            query_hits = hits_by_query[query_index]
+            query_hits.sort(key=lambda hit: hit.distance)
+            hits_by_query[query_index] = [hit for hit in query_hits[:max_results] if hit.distance <= max_distance]
+
+        # Union of searches is unordered, so order hits of exact searches by distance
+        for query_index, query_hits in enumerate(hits_by_query):
+            if query_index not in indexed_queries:
+                query_hits.sort(key=lambda hit: hit.distance)
+
+        if hybrid:
+            for query_index, lexical_hits in enumerate(lexical_hits_by_query):
+                lexical_hits.sort(key=lambda hit: hit.rank, reverse=True)
+                hits_by_query[query_index] = EntryAdapters.fuse_ranked_hits(
+                    [hits_by_query[query_index], lexical_hits], max_results
+                )
+
+        latencies["ann"] = latencies.get("ann", 0) + time.perf_counter() - start_time
+        return hits_by_query
 
     @staticmethod
     @require_valid_user
@@ -251,6 +251,8 @@ class SearchModelConfigAdmin(unfold_admin.ModelAdmin):
         "name",
         "bi_encoder",
         "cross_encoder",
+        "vector_index_type",
+        "retrieval_mode",
     )
     search_fields = ("id", "name", "bi_encoder", "cross_encoder")
 
@@ -0,0 +1,36 @@
+# Made manually for use by Django 5.0.10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # The vector index over entry embeddings of each search model is built concurrently on server start.
+    # See EntryAdapters.ensure_embeddings_index
+    dependencies = [
+        ("database", "0076_rename_openaiprocessorconversationconfig_aimodelapi_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="searchmodelconfig",
+            name="embeddings_dimensions",
+            field=models.IntegerField(blank=True, default=None, null=True),
+        ),
+        migrations.AddField(
+            model_name="searchmodelconfig",
+            name="vector_index_type",
+            field=models.CharField(
+                choices=[("hnsw", "Hnsw"), ("ivfflat", "Ivfflat"), ("none", "None")], default="hnsw", max_length=20
+            ),
+        ),
+        migrations.AddField(
+            model_name="searchmodelconfig",
+            name="hnsw_ef_search",
+            field=models.IntegerField(default=40),
+        ),
+        migrations.AddField(
+            model_name="searchmodelconfig",
+            name="ivfflat_probes",
+            field=models.IntegerField(default=10),
+        ),
+    ]
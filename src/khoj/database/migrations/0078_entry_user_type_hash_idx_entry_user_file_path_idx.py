@@ -0,0 +1,24 @@
+# Made manually for use by Django 5.0.10
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Build indexes without locking writes to the entry table
+    atomic = False
+
+    dependencies = [
+        ("database", "0077_searchmodelconfig_embeddings_index"),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="entry",
+            index=models.Index(fields=["user", "file_type", "hashed_value"], name="entry_user_type_hash_idx"),
+        ),
+        AddIndexConcurrently(
+            model_name="entry",
+            index=models.Index(fields=["user", "file_path"], name="entry_user_file_path_idx"),
+        ),
+    ]
@@ -0,0 +1,89 @@
+# Made manually for use by Django 5.0.10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Keep in sync with ConversationMessage.context_fields
+CONTEXT_FIELDS = [
+    "context",
+    "onlineContext",
+    "codeContext",
+    "trainOfThought",
+    "queryFiles",
+    "renderedContext",
+    "tokenCounts",
+]
+
+
+def move_chat_to_conversation_messages(apps, schema_editor):
+    Conversation = apps.get_model("database", "Conversation")
+    ConversationMessage = apps.get_model("database", "ConversationMessage")
+
+    messages = []
+    for conversation in Conversation.objects.only("id", "conversation_log").iterator(chunk_size=100):
+        for index, log in enumerate((conversation.conversation_log or {}).get("chat", [])):
+            messages.append(
+                ConversationMessage(
+                    conversation_id=conversation.id,
+                    index=index,
+                    turn_id=log.get("turnId"),
+                    by=log.get("by") or "",
+                    data={key: value for key, value in log.items() if key not in CONTEXT_FIELDS},
+                    context={key: value for key, value in log.items() if key in CONTEXT_FIELDS},
+                )
+            )
+        # Insert messages in batches to bound memory used by migration
+        if len(messages) >= 1000:
+            ConversationMessage.objects.bulk_create(messages)
+            messages = []
+    ConversationMessage.objects.bulk_create(messages)
+
+
+def move_conversation_messages_to_chat(apps, schema_editor):
+    Conversation = apps.get_model("database", "Conversation")
+    ConversationMessage = apps.get_model("database", "ConversationMessage")
+
+    for conversation in Conversation.objects.iterator(chunk_size=100):
+        messages = ConversationMessage.objects.filter(conversation_id=conversation.id).order_by("index")
+        conversation.conversation_log = {"chat": [{**message.data, **message.context} for message in messages]}
+        conversation.save(update_fields=["conversation_log"])
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("database", "0078_entry_user_type_hash_idx_entry_user_file_path_idx"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ConversationMessage",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("index", models.IntegerField()),
+                ("turn_id", models.CharField(blank=True, default=None, max_length=200, null=True)),
+                ("by", models.CharField(max_length=200)),
+                ("data", models.JSONField(default=dict)),
+                ("context", models.JSONField(default=dict)),
+                (
+                    "conversation",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="chat_messages",
+                        to="database.conversation",
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(fields=("conversation", "index"), name="unique_conversation_message_index")
+                ],
+            },
+        ),
+        migrations.RunPython(move_chat_to_conversation_messages, move_conversation_messages_to_chat),
+        migrations.RemoveField(
+            model_name="conversation",
+            name="conversation_log",
+        ),
+    ]
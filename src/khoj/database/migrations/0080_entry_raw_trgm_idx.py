@@ -0,0 +1,28 @@
+# Made manually for use by Django 5.0.10
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.contrib.postgres.operations import AddIndexConcurrently, TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    # Build index without locking writes to the entry table
+    atomic = False
+
+    dependencies = [
+        ("database", "0079_conversationmessage_remove_conversation_conversation_log"),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        AddIndexConcurrently(
+            model_name="entry",
+            index=django.contrib.postgres.indexes.GinIndex(
+                django.contrib.postgres.indexes.OpClass(
+                    django.db.models.functions.text.Upper("raw"), name="gin_trgm_ops"
+                ),
+                name="entry_raw_trgm_idx",
+            ),
+        ),
+    ]
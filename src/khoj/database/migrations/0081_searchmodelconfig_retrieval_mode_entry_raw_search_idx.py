@@ -0,0 +1,32 @@
+# Made manually for use by Django 5.0.10
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Build index without locking writes to the entry table
+    atomic = False
+
+    dependencies = [
+        ("database", "0080_entry_raw_trgm_idx"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="searchmodelconfig",
+            name="retrieval_mode",
+            field=models.CharField(
+                choices=[("vector", "Vector"), ("hybrid", "Hybrid")], default="vector", max_length=20
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="entry",
+            index=django.contrib.postgres.indexes.GinIndex(
+                django.contrib.postgres.search.SearchVector("raw", config="simple"),
+                name="entry_raw_search_idx",
+            ),
+        ),
+    ]
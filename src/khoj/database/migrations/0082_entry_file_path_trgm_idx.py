@@ -0,0 +1,24 @@
+# Made manually for use by Django 5.0.10
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    # Build index without locking writes to the entry table
+    atomic = False
+
+    dependencies = [
+        ("database", "0081_searchmodelconfig_retrieval_mode_entry_raw_search_idx"),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="entry",
+            index=django.contrib.postgres.indexes.GinIndex(
+                django.contrib.postgres.indexes.OpClass("file_path", name="gin_trgm_ops"),
+                name="entry_file_path_trgm_idx",
+            ),
+        ),
+    ]
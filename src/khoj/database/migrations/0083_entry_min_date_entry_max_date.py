@@ -0,0 +1,42 @@
+# Made manually for use by Django 5.0.10
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+from django.db.models import Exists, Max, Min, OuterRef, Subquery
+
+
+def backfill_entry_date_range(apps, schema_editor):
+    Entry = apps.get_model("database", "Entry")
+    EntryDates = apps.get_model("database", "EntryDates")
+    entry_dates = EntryDates.objects.filter(entry=OuterRef("pk")).values("entry")
+    Entry.objects.filter(Exists(entry_dates)).update(
+        min_date=Subquery(entry_dates.annotate(min_date=Min("date")).values("min_date")),
+        max_date=Subquery(entry_dates.annotate(max_date=Max("date")).values("max_date")),
+    )
+
+
+class Migration(migrations.Migration):
+    # Build index without locking writes to the entry table
+    atomic = False
+
+    dependencies = [
+        ("database", "0082_entry_file_path_trgm_idx"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="entry",
+            name="min_date",
+            field=models.DateField(blank=True, default=None, null=True),
+        ),
+        migrations.AddField(
+            model_name="entry",
+            name="max_date",
+            field=models.DateField(blank=True, default=None, null=True),
+        ),
+        migrations.RunPython(backfill_entry_date_range, migrations.RunPython.noop),
+        AddIndexConcurrently(
+            model_name="entry",
+            index=models.Index(fields=["user", "max_date", "min_date"], name="entry_user_date_range_idx"),
+        ),
+    ]
@@ -7,8 +7,11 @@ from typing import Dict, List, Optional, Union
 
 from django.contrib.auth.models import AbstractUser
 from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVector
 from django.core.exceptions import ValidationError
-from django.db import models
+from django.db import models, transaction
+from django.db.models.functions import Upper
 from django.db.models.signals import pre_save
 from django.dispatch import receiver
 from pgvector.django import VectorField
@@ -480,6 +483,15 @@ class SearchModelConfig(DbBaseModel):
     class ModelType(models.TextChoices):
         TEXT = "text"
 
+    class VectorIndexType(models.TextChoices):
+        HNSW = "hnsw"
+        IVFFLAT = "ivfflat"
+        NONE = "none"
+
+    class RetrievalMode(models.TextChoices):
+        VECTOR = "vector"
+        HYBRID = "hybrid"
+
     # This is the model name exposed to users on their settings page
     name = models.CharField(max_length=200, default="default")
     # Type of content the model can generate embeddings for
@@ -506,6 +518,16 @@ class SearchModelConfig(DbBaseModel):
     cross_encoder_inference_endpoint_api_key = models.CharField(max_length=200, default=None, null=True, blank=True)
     # The confidence threshold of the bi_encoder model to consider the embeddings as relevant
     bi_encoder_confidence_threshold = models.FloatField(default=0.18)
+    # Dimensions of the embeddings generated by the bi-encoder. Set on server start. Required to build the vector index
+    embeddings_dimensions = models.IntegerField(default=None, null=True, blank=True)
+    # Approximate nearest neighbour index to build over the embeddings of entries indexed with this search model
+    vector_index_type = models.CharField(max_length=20, choices=VectorIndexType.choices, default=VectorIndexType.HNSW)
+    # Size of the candidate list searched by the HNSW index. Higher is more accurate but slower
+    hnsw_ef_search = models.IntegerField(default=40)
+    # Number of lists probed by the IVFFlat index. Higher is more accurate but slower
+    ivfflat_probes = models.IntegerField(default=10)
+    # Retrieve entries by vector search or fuse vector search with full-text search of entries by rank
+    retrieval_mode = models.CharField(max_length=20, choices=RetrievalMode.choices, default=RetrievalMode.VECTOR)
 
     def __str__(self):
         return self.name
@@ -578,7 +600,6 @@ class UserTextToImageModelConfig(DbBaseModel):
 
 class Conversation(DbBaseModel):
     user = models.ForeignKey(KhojUser, on_delete=models.CASCADE)
-    conversation_log = models.JSONField(default=dict)
     client = models.ForeignKey(ClientApplication, on_delete=models.CASCADE, default=None, null=True, blank=True)
 
     # Slug is an app-generated conversation identifier. Need not be unique. Used as display title essentially.
@@ -600,8 +621,72 @@ class Conversation(DbBaseModel):
             raise ValidationError(f"Invalid conversation_log format: {str(e)}")
 
     def save(self, *args, **kwargs):
-        self.clean()
-        super().save(*args, **kwargs)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            # Only save messages if the conversation log was loaded or set
+            conversation_log = getattr(self, "_conversation_log", None)
+            if conversation_log is not None:
+                self.save_messages(conversation_log.get("chat", []))
+
+    @property
+    def conversation_log(self) -> dict:
+        """Conversation messages in the conversation log format. Loaded from the conversation messages on first access"""
+        if getattr(self, "_conversation_log", None) is None:
+            if self._state.adding:
+                self._conversation_log = {}
+            else:
+                messages = self.chat_messages.order_by("index")
+                self._conversation_log = {"chat": [message.to_log() for message in messages]}
+        return self._conversation_log
+
+    @conversation_log.setter
+    def conversation_log(self, conversation_log: dict):
+        self._conversation_log = conversation_log
+
+    def save_messages(self, chat: List[dict]):
+        """Save messages in conversation log to the conversation messages table.
+
+        New messages are appended and saved messages are only updated if their fields, other than their context,
+        changed. All messages are rewritten if saved messages were removed or reordered in the conversation log.
+        """
+        saved_messages = list(self.chat_messages.order_by("index").only("id", "index", "turn_id", "by", "data"))
+        messages = [ConversationMessage.from_log(self, idx, log) for idx, log in enumerate(chat)]
+
+        is_appended = len(saved_messages) <= len(messages) and all(
+            saved.turn_id == message.turn_id
+            and saved.by == message.by
+            and saved.data.get("created") == message.data.get("created")
+            for saved, message in zip(saved_messages, messages)
+        )
+        if not is_appended:
+            self.validate_messages(chat)
+            self.chat_messages.all().delete()
+            ConversationMessage.objects.bulk_create(messages)
+            return
+
+        updated_messages = []
+        for saved, message in zip(saved_messages, messages):
+            if saved.data != message.data:
+                saved.data = message.data
+                updated_messages.append(saved)
+        new_messages = messages[len(saved_messages) :]
+        self.validate_messages([chat[message.index] for message in updated_messages + new_messages])
+
+        # Continue after index of last saved message as messages deleted by turn id leave gaps
+        next_index = saved_messages[-1].index + 1 if saved_messages else 0
+        for offset, message in enumerate(new_messages):
+            message.index = next_index + offset
+        if updated_messages:
+            ConversationMessage.objects.bulk_update(updated_messages, ["data"])
+        ConversationMessage.objects.bulk_create(new_messages)
+
+    @staticmethod
+    def validate_messages(chat: List[dict]):
+        try:
+            for msg in chat:
+                ChatMessage.model_validate(msg)
+        except Exception as e:
+            raise ValidationError(f"Invalid conversation_log format: {str(e)}")
 
     @property
     def messages(self) -> List[ChatMessage]:
@@ -622,6 +707,52 @@ class Conversation(DbBaseModel):
         return validated_messages
 
 
+class ConversationMessage(DbBaseModel):
+    """Message in a conversation.
+
+    Messages are appended to their conversation, instead of rewriting the whole conversation on every message.
+    Context used to generate a message is stored in a separate column to defer loading it when it is not needed.
+    """
+
+    # Large message fields stored in the context column
+    context_fields = [
+        "context",
+        "onlineContext",
+        "codeContext",
+        "trainOfThought",
+        "queryFiles",
+        "renderedContext",
+        "tokenCounts",
+    ]
+
+    conversation = models.ForeignKey(Conversation, on_delete=models.CASCADE, related_name="chat_messages")
+    index = models.IntegerField()
+    turn_id = models.CharField(max_length=200, default=None, null=True, blank=True)
+    by = models.CharField(max_length=200)
+    data = models.JSONField(default=dict)
+    context = models.JSONField(default=dict)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["conversation", "index"], name="unique_conversation_message_index"),
+        ]
+
+    @classmethod
+    def from_log(cls, conversation: Conversation, index: int, log: dict) -> "ConversationMessage":
+        return cls(
+            conversation=conversation,
+            index=index,
+            turn_id=log.get("turnId"),
+            by=log.get("by") or "",
+            data={key: value for key, value in log.items() if key not in cls.context_fields},
+            context={key: value for key, value in log.items() if key in cls.context_fields},
+        )
+
+    def to_log(self, include_context: bool = True) -> dict:
+        "Message in the conversation log format. Defer loading the context column when include_context is False"
+        return {**self.data, **self.context} if include_context else dict(self.data)
+
+
 class PublicConversation(DbBaseModel):
     source_owner = models.ForeignKey(KhojUser, on_delete=models.CASCADE)
     conversation_log = models.JSONField(default=dict)
@@ -688,6 +819,22 @@ class Entry(DbBaseModel):
     hashed_value = models.CharField(max_length=100)
     corpus_id = models.UUIDField(default=uuid.uuid4, editable=False)
     search_model = models.ForeignKey(SearchModelConfig, on_delete=models.SET_NULL, default=None, null=True, blank=True)
+    # Earliest and latest dates mentioned in the entry. Used to filter entries by date without joining entry dates
+    min_date = models.DateField(default=None, null=True, blank=True)
+    max_date = models.DateField(default=None, null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "file_type", "hashed_value"], name="entry_user_type_hash_idx"),
+            models.Index(fields=["user", "max_date", "min_date"], name="entry_user_date_range_idx"),
+            models.Index(fields=["user", "file_path"], name="entry_user_file_path_idx"),
+            # Trigram index to match file filters by file name or glob pattern, i.e file_path LIKE '%.org'
+            GinIndex(OpClass("file_path", name="gin_trgm_ops"), name="entry_file_path_trgm_idx"),
+            # Trigram index to match word filters, i.e UPPER(raw) LIKE UPPER('%word%'), without scanning all entries
+            GinIndex(OpClass(Upper("raw"), name="gin_trgm_ops"), name="entry_raw_trgm_idx"),
+            # Full-text index to match entries by words in query for hybrid retrieval
+            GinIndex(SearchVector("raw", config="simple"), name="entry_raw_search_idx"),
+        ]
 
     def save(self, *args, **kwargs):
         if self.user and self.agent:
@@ -93,6 +93,7 @@ locale.setlocale(locale.LC_ALL, "")
 from khoj.configure import configure_routes, initialize_server, configure_middleware
 from khoj.utils import state
 from khoj.utils.cli import cli
+from khoj.utils.http_clients import close_http_sessions
 from khoj.utils.initialization import initialization
 from khoj.database.adapters import ProcessLockAdapters
 from khoj.database.models import ProcessLock
@@ -193,6 +194,9 @@ def run(should_start_server=True):
     # Configure Middleware
     configure_middleware(app)
 
+    # Close pooled HTTP connections on server shutdown
+    app.add_event_handler("shutdown", close_http_sessions)
+
     initialize_server(args.config)
 
     # If the server is started through gunicorn (external to the script), don't start the server
@@ -0,0 +1,115 @@
+import re
+from functools import lru_cache
+from typing import List, Tuple
+
+DEFAULT_SEPARATORS = ["\n\n", "\n", "!", "?", ".", " ", "\t", ""]
+
+
+class TextChunker:
+    """Split text into chunks of at most chunk_size words.
+
+    Produces the same chunks as langchain's RecursiveCharacterTextSplitter with chunk_overlap=0, keep_separator=True
+    and the number of whitespace separated words as the length function. Prefer splitting at separators earlier in the
+    separators list. Pieces and chunks are tracked as offsets into the text. Each piece is tokenized once, when it is
+    split off, and chunks are merged by summing piece word counts instead of joining and re-tokenizing candidate chunks.
+    """
+
+    def __init__(self, text: str, chunk_size: int, separators: List[str] = DEFAULT_SEPARATORS):
+        self.text = text
+        self.chunk_size = chunk_size
+        self.separators = separators
+
+    def length(self, start: int, end: int) -> int:
+        "Number of whitespace separated words in text[start:end]"
+        return len(self.text[start:end].split())
+
+    def split(self) -> List[str]:
+        return [self.text[start:end] for start, end in self._split_span(0, len(self.text), self.separators)]
+
+    def _split_span(self, start: int, end: int, separators: List[str]) -> List[Tuple[int, int]]:
+        "Split text span at the first separator found in it. Recursively split pieces longer than the chunk size"
+        # Get first separator in span
+        separator, next_separators = separators[-1], []
+        for idx, candidate in enumerate(separators):
+            if candidate == "":
+                separator = candidate
+                break
+            if self.text.find(candidate, start, end) != -1:
+                separator, next_separators = candidate, separators[idx + 1 :]
+                break
+
+        chunks: List[Tuple[int, int]] = []
+        good_pieces: List[Tuple[int, int, int]] = []
+        for piece_start, piece_end in self._split_at_separator(start, end, separator):
+            piece_length = self.length(piece_start, piece_end)
+            if piece_length < self.chunk_size:
+                good_pieces.append((piece_start, piece_end, piece_length))
+                continue
+            if good_pieces:
+                chunks += self._merge_pieces(good_pieces)
+                good_pieces = []
+            if not next_separators:
+                chunks.append((piece_start, piece_end))
+            else:
+                chunks += self._split_span(piece_start, piece_end, next_separators)
+        if good_pieces:
+            chunks += self._merge_pieces(good_pieces)
+        return chunks
+
+    def _split_at_separator(self, start: int, end: int, separator: str) -> List[Tuple[int, int]]:
+        "Split span into non-empty pieces. Each separator is kept at the start of the piece following it"
+        if separator == "":
+            return [(idx, idx + 1) for idx in range(start, end)]
+        pieces = []
+        piece_start = start
+        separator_idx = self.text.find(separator, start, end)
+        while separator_idx != -1:
+            if separator_idx > piece_start:
+                pieces.append((piece_start, separator_idx))
+            piece_start = separator_idx
+            separator_idx = self.text.find(separator, separator_idx + len(separator), end)
+        if end > piece_start:
+            pieces.append((piece_start, end))
+        return pieces
+
+    def _merge_pieces(self, pieces: List[Tuple[int, int, int]]) -> List[Tuple[int, int]]:
+        "Merge consecutive pieces into chunks with up to chunk size words. Strip whitespace around chunks"
+        chunks = []
+        first, total = 0, 0
+        for idx, (_, _, piece_length) in enumerate(pieces):
+            if total + piece_length > self.chunk_size:
+                if idx > first:
+                    self._add_chunk(chunks, pieces[first][0], pieces[idx - 1][1])
+                    # Drop pieces from start of current chunk until it is empty
+                    while total > 0:
+                        total -= pieces[first][2]
+                        first += 1
+            total += piece_length
+        if len(pieces) > first:
+            self._add_chunk(chunks, pieces[first][0], pieces[-1][1])
+        return chunks
+
+    def _add_chunk(self, chunks: List[Tuple[int, int]], start: int, end: int):
+        # Strip whitespace around chunk and skip empty chunks
+        while start < end and self.text[start].isspace():
+            start += 1
+        while end > start and self.text[end - 1].isspace():
+            end -= 1
+        if start < end:
+            chunks.append((start, end))
+
+
+@lru_cache
+def long_word_pattern(max_word_length: int) -> re.Pattern:
+    # Only match from start of words to avoid rescanning long words from each of their characters
+    return re.compile(rf"(?<!\S)\S{{{max_word_length + 1},}}\s*")
+
+
+def split_text(text: str, chunk_size: int, separators: List[str] = DEFAULT_SEPARATORS) -> List[str]:
+    "Split text into chunks of at most chunk_size words, preferring to split at separators earlier in the list"
+    return TextChunker(text, chunk_size, separators).split()
+
+
+def remove_long_words(text: str, max_word_length: int = 500) -> str:
+    "Remove words longer than max_word_length from text, along with the whitespace following them"
+    return long_word_pattern(max_word_length).sub("", text)
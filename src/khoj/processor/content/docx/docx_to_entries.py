@@ -1,11 +1,12 @@
 import logging
-import tempfile
+from io import BytesIO
 from typing import Dict, List, Tuple
 
-from langchain_community.document_loaders import Docx2txtLoader
+import docx2txt
 
 from khoj.database.models import Entry as DbEntry
 from khoj.database.models import KhojUser
+from khoj.processor.content.extraction import extract_files
 from khoj.processor.content.text_to_entries import TextToEntries
 from khoj.utils.helpers import timer
 from khoj.utils.rawconfig import Entry
@@ -55,15 +56,15 @@ class DocxToEntries(TextToEntries):
         entries: List[str] = []
         entry_to_location_map: List[Tuple[str, str]] = []
         file_to_text_map = dict()
+        # Parse files in parallel. Collate parsed files in order of input files for a stable entry order
+        docx_texts_by_file = dict(extract_files(DocxToEntries.extract_text, {f: (docx_files[f],) for f in docx_files}))
         for docx_file in docx_files:
-            try:
-                docx_texts = DocxToEntries.extract_text(docx_files[docx_file])
-                entry_to_location_map += zip(docx_texts, [docx_file] * len(docx_texts))
-                entries.extend(docx_texts)
-                file_to_text_map[docx_file] = docx_texts
-            except Exception as e:
-                logger.warning(f"Unable to extract entries from file: {docx_file}")
-                logger.warning(e, exc_info=True)
+            if docx_file not in docx_texts_by_file:
+                continue
+            docx_texts = docx_texts_by_file[docx_file]
+            entry_to_location_map += zip(docx_texts, [docx_file] * len(docx_texts))
+            entries.extend(docx_texts)
+            file_to_text_map[docx_file] = docx_texts
         return file_to_text_map, DocxToEntries.convert_docx_entries_to_maps(entries, dict(entry_to_location_map))
 
     @staticmethod
@@ -93,19 +94,10 @@ class DocxToEntries(TextToEntries):
         """Extract text from specified DOCX file"""
         try:
             docx_entry_by_pages = []
-            # Create temp file with .docx extension that gets auto-deleted
-            with tempfile.NamedTemporaryFile(suffix=".docx", delete=True) as tmp:
-                tmp.write(docx_file)
-                tmp.flush()  # Ensure all data is written
-
-                # Load the content using Docx2txtLoader
-                loader = Docx2txtLoader(tmp.name)
-                docx_entries_per_file = loader.load()
-
-                # Convert the loaded entries into the desired format
-                docx_entry_by_pages = [page.page_content for page in docx_entries_per_file]
+            # Extract text from DOCX file content in memory
+            docx_entry_by_pages = [docx2txt.process(BytesIO(docx_file))]
         except Exception as e:
-            logger.warning(f"Unable to extract text from file: {docx_file}")
+            logger.warning("Unable to extract text from DOCX file")
             logger.warning(e, exc_info=True)
 
         return docx_entry_by_pages
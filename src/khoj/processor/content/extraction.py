@@ -0,0 +1,110 @@
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+from khoj.utils import state
+
+logger = logging.getLogger(__name__)
+
+executor_lock = threading.Lock()
+# Set KHOJ_EXTRACTION_WORKERS to the number of parser processes. Defaults to the number of cores.
+# Set it to 1 or less to parse files in the indexing thread instead.
+EXTRACTION_WORKERS = int(os.getenv("KHOJ_EXTRACTION_WORKERS", os.cpu_count() or 1))
+
+
+def initialize_extraction_worker():
+    # Parsers are defined in modules that import django models
+    import django
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "khoj.app.settings")
+    django.setup()
+
+
+def get_extraction_executor() -> Optional[ProcessPoolExecutor]:
+    """Get process pool shared by all indexing requests of this worker to parse files.
+
+    The pool has EXTRACTION_WORKERS parser processes. Returns None if files should be parsed in the indexing thread.
+    """
+    if EXTRACTION_WORKERS < 2:
+        return None
+    with executor_lock:
+        if state.extraction_executor is None:
+            # Spawn parser processes as forking a multi-threaded server process is unsafe
+            state.extraction_executor = ProcessPoolExecutor(
+                max_workers=EXTRACTION_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=initialize_extraction_worker,
+            )
+    return state.extraction_executor
+
+
+def extract_files(
+    extract_fn: Callable[..., Any], file_args: Dict[str, Tuple], min_bytes_to_parallelize: int = None
+) -> Iterator[Tuple[str, Any]]:
+    """Parse files with extract_fn. Yield file name and its parsed content as each file is parsed.
+
+    file_args maps each file name to the arguments to call extract_fn with. Its first argument should be the file
+    content. Files are parsed in parallel on the shared extraction process pool if their total size is at least
+    min_bytes_to_parallelize. Only a few files per parser process are submitted at a time, so large uploads are not
+    all pickled at once. Files that fail to parse are logged and skipped.
+    """
+    if min_bytes_to_parallelize is None:
+        min_bytes_to_parallelize = int(os.getenv("KHOJ_EXTRACTION_PARALLEL_MIN_BYTES", 1024 * 1024))
+    total_bytes = sum(len(args[0]) for args in file_args.values() if args and args[0])
+    executor = get_extraction_executor() if len(file_args) > 1 and total_bytes >= min_bytes_to_parallelize else None
+
+    # Parse small batches of files in the current thread to avoid inter-process overhead
+    if executor is None:
+        yield from extract_files_serially(extract_fn, file_args.items())
+        return
+
+    max_pending = EXTRACTION_WORKERS * 2
+    pending: Dict[Future, str] = {}
+    files_to_submit = iter(file_args.items())
+    while True:
+        # Submit files to keep the parser processes busy
+        while len(pending) < max_pending:
+            next_file = next(files_to_submit, None)
+            if next_file is None:
+                break
+            file, args = next_file
+            pending[executor.submit(extract_fn, *args)] = file
+        if not pending:
+            return
+
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            file = pending.pop(future)
+            try:
+                yield file, future.result()
+            except BrokenProcessPool as e:
+                # A parser process died. Skip files being parsed as any of them could have crashed it.
+                # Parse the remaining files on a new process pool
+                skipped_files = [file] + list(pending.values())
+                logger.error(f"Parser process died. Files {skipped_files} will not be indexed: {e}")
+                with executor_lock:
+                    if state.extraction_executor is executor:
+                        state.extraction_executor = None
+                executor.shutdown(wait=False, cancel_futures=True)
+                remaining_file_args = dict(files_to_submit)
+                if remaining_file_args:
+                    yield from extract_files(extract_fn, remaining_file_args, min_bytes_to_parallelize)
+                return
+            except Exception as e:
+                logger.warning(f"Unable to extract entries from file: {file}. This file will not be indexed.")
+                logger.warning(e, exc_info=True)
+
+
+def extract_files_serially(
+    extract_fn: Callable[..., Any], file_args: Iterable[Tuple[str, Tuple]]
+) -> Iterator[Tuple[str, Any]]:
+    for file, args in file_args:
+        try:
+            yield file, extract_fn(*args)
+        except Exception as e:
+            logger.warning(f"Unable to extract entries from file: {file}. This file will not be indexed.")
+            logger.warning(e, exc_info=True)
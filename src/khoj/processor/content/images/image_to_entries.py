@@ -1,11 +1,15 @@
 import base64
 import logging
-import os
-from datetime import datetime
-from typing import Dict, List, Tuple
+from functools import lru_cache
+from io import BytesIO
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from PIL import Image
 
 from khoj.database.models import Entry as DbEntry
 from khoj.database.models import KhojUser
+from khoj.processor.content.extraction import extract_files
 from khoj.processor.content.text_to_entries import TextToEntries
 from khoj.utils.helpers import timer
 from khoj.utils.rawconfig import Entry
@@ -13,6 +17,14 @@ from khoj.utils.rawconfig import Entry
 logger = logging.getLogger(__name__)
 
 
+@lru_cache
+def get_ocr_engine():
+    "Load OCR engine once per process"
+    from rapidocr_onnxruntime import RapidOCR
+
+    return RapidOCR()
+
+
 class ImageToEntries(TextToEntries):
     def __init__(self):
         super().__init__()
@@ -54,46 +66,41 @@ class ImageToEntries(TextToEntries):
         file_to_text_map = dict()
         entries: List[str] = []
         entry_to_location_map: List[Tuple[str, str]] = []
+        # Parse files in parallel. Collate parsed files in order of input files for a stable entry order
+        image_text_by_file = dict(
+            extract_files(ImageToEntries.extract_text, {f: (image_files[f], f) for f in image_files})
+        )
         for image_file in image_files:
-            try:
-                bytes = image_files[image_file]
-                # write the image to a temporary file
-                timestamp_now = datetime.utcnow().timestamp()
-                # use either png or jpg
-                if image_file.endswith(".png"):
-                    tmp_file = f"tmp_image_file_{timestamp_now}.png"
-                elif image_file.endswith(".jpg") or image_file.endswith(".jpeg"):
-                    tmp_file = f"tmp_image_file_{timestamp_now}.jpg"
-                elif image_file.endswith(".webp"):
-                    tmp_file = f"tmp_image_file_{timestamp_now}.webp"
-                with open(tmp_file, "wb") as f:
-                    bytes = image_files[image_file]
-                    f.write(bytes)
-                try:
-                    from rapidocr_onnxruntime import RapidOCR
-
-                    loader = RapidOCR()
-                    image_entries_per_file = ""
-                    result, _ = loader(tmp_file)
-                    if result:
-                        expanded_entries = [text[1] for text in result]
-                        image_entries_per_file = " ".join(expanded_entries)
-                except ImportError:
-                    logger.warning(
-                        f"Unable to process image or scanned file for text: {image_file}. This file will not be indexed."
-                    )
-                    continue
-                entry_to_location_map.append((image_entries_per_file, image_file))
-                entries.extend([image_entries_per_file])
-                file_to_text_map[image_file] = image_entries_per_file
-            except Exception as e:
-                logger.warning(f"Unable to process file: {image_file}. This file will not be indexed.")
-                logger.warning(e, exc_info=True)
-            finally:
-                if os.path.exists(tmp_file):
-                    os.remove(tmp_file)
+            image_entries_per_file = image_text_by_file.get(image_file)
+            if image_entries_per_file is None:
+                continue
+            entry_to_location_map.append((image_entries_per_file, image_file))
+            entries.extend([image_entries_per_file])
+            file_to_text_map[image_file] = image_entries_per_file
         return file_to_text_map, ImageToEntries.convert_image_entries_to_maps(entries, dict(entry_to_location_map))
 
+    @staticmethod
+    def extract_text(image_bytes: bytes, image_file: str) -> Optional[str]:
+        """Extract text from specified image file content in memory using OCR"""
+        try:
+            ocr_engine = get_ocr_engine()
+        except ImportError:
+            logger.warning(
+                f"Unable to process image or scanned file for text: {image_file}. This file will not be indexed."
+            )
+            return None
+
+        # Decode image into array of pixels in the BGR channel order expected by the OCR engine
+        with Image.open(BytesIO(image_bytes)) as image:
+            image_array = np.ascontiguousarray(np.asarray(image.convert("RGB"))[:, :, ::-1])
+
+        image_entries_per_file = ""
+        result, _ = ocr_engine(image_array)
+        if result:
+            expanded_entries = [text[1] for text in result]
+            image_entries_per_file = " ".join(expanded_entries)
+        return image_entries_per_file
+
     @staticmethod
     def convert_image_entries_to_maps(parsed_entries: List[str], entry_to_file_map) -> List[Entry]:
         "Convert each image entries into a dictionary"
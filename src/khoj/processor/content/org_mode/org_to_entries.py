@@ -5,6 +5,7 @@ from typing import Dict, List, Tuple
 
 from khoj.database.models import Entry as DbEntry
 from khoj.database.models import KhojUser
+from khoj.processor.content.extraction import extract_files
 from khoj.processor.content.org_mode import orgnode
 from khoj.processor.content.org_mode.orgnode import Orgnode
 from khoj.processor.content.text_to_entries import TextToEntries
@@ -67,15 +68,16 @@ class OrgToEntries(TextToEntries):
         entries: List[List[Orgnode]] = []
         entry_to_file_map: List[Tuple[Orgnode, str]] = []
         file_to_text_map = {}
+        # Parse files in parallel. Collate parsed files in order of input files for a stable entry order
+        file_args = {org_file: (org_files[org_file], org_file, [], [], max_tokens) for org_file in org_files}
+        org_nodes_by_file = dict(extract_files(OrgToEntries.process_single_org_file, file_args))
         for org_file in org_files:
-            try:
-                org_content = org_files[org_file]
-                entries, entry_to_file_map = OrgToEntries.process_single_org_file(
-                    org_content, org_file, entries, entry_to_file_map, max_tokens
-                )
-                file_to_text_map[org_file] = org_content
-            except Exception as e:
-                logger.error(f"Unable to process file: {org_file}. Skipped indexing it.\nError; {e}", exc_info=True)
+            if org_file not in org_nodes_by_file:
+                continue
+            file_entries, file_entry_to_file_map = org_nodes_by_file[org_file]
+            entries.extend(file_entries)
+            entry_to_file_map += file_entry_to_file_map
+            file_to_text_map[org_file] = org_files[org_file]
 
         return file_to_text_map, entries, dict(entry_to_file_map)
 
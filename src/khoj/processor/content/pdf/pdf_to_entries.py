@@ -1,11 +1,11 @@
 import logging
-import tempfile
-from typing import Dict, Final, List, Tuple
+from typing import Dict, Final, Iterator, List, Tuple
 
-from langchain_community.document_loaders import PyMuPDFLoader
+import fitz
 
 from khoj.database.models import Entry as DbEntry
 from khoj.database.models import KhojUser
+from khoj.processor.content.extraction import extract_files
 from khoj.processor.content.text_to_entries import TextToEntries
 from khoj.utils.helpers import timer
 from khoj.utils.rawconfig import Entry
@@ -57,15 +57,15 @@ class PdfToEntries(TextToEntries):
         file_to_text_map = dict()
         entries: List[str] = []
         entry_to_location_map: List[Tuple[str, str]] = []
+        # Parse files in parallel. Collate parsed files in order of input files for a stable entry order
+        pdf_entries_by_file = dict(extract_files(PdfToEntries.extract_text, {f: (pdf_files[f],) for f in pdf_files}))
         for pdf_file in pdf_files:
-            try:
-                pdf_entries_per_file = PdfToEntries.extract_text(pdf_files[pdf_file])
-                entry_to_location_map += zip(pdf_entries_per_file, [pdf_file] * len(pdf_entries_per_file))
-                entries.extend(pdf_entries_per_file)
-                file_to_text_map[pdf_file] = pdf_entries_per_file
-            except Exception as e:
-                logger.warning(f"Unable to extract entries from file: {pdf_file}")
-                logger.warning(e, exc_info=True)
+            if pdf_file not in pdf_entries_by_file:
+                continue
+            pdf_entries_per_file = pdf_entries_by_file[pdf_file]
+            entry_to_location_map += zip(pdf_entries_per_file, [pdf_file] * len(pdf_entries_per_file))
+            entries.extend(pdf_entries_per_file)
+            file_to_text_map[pdf_file] = pdf_entries_per_file
 
         return file_to_text_map, PdfToEntries.convert_pdf_entries_to_maps(entries, dict(entry_to_location_map))
 
@@ -94,24 +94,22 @@ class PdfToEntries(TextToEntries):
     @staticmethod
     def extract_text(pdf_file):
         """Extract text from specified PDF files"""
+        pdf_entry_by_pages = []
         try:
-            # Create temp file with .pdf extension that gets auto-deleted
-            with tempfile.NamedTemporaryFile(suffix=".pdf", delete=True) as tmpf:
-                tmpf.write(pdf_file)
-                tmpf.flush()  # Ensure all data is written
-
-                # Load the content using PyMuPDFLoader
-                loader = PyMuPDFLoader(tmpf.name)
-                pdf_entries_per_file = loader.load()
-
-                # Convert the loaded entries into the desired format
-                pdf_entry_by_pages = [PdfToEntries.clean_text(page.page_content) for page in pdf_entries_per_file]
+            pdf_entry_by_pages = list(PdfToEntries.extract_pages(pdf_file))
         except Exception as e:
-            logger.warning(f"Unable to process file: {pdf_file}. This file will not be indexed.")
+            logger.warning("Unable to process PDF file. This file will not be indexed.")
             logger.warning(e, exc_info=True)
 
         return pdf_entry_by_pages
 
+    @staticmethod
+    def extract_pages(pdf_file: bytes) -> Iterator[str]:
+        """Lazily extract text of each page from PDF file content in memory"""
+        with fitz.open(stream=pdf_file, filetype="pdf") as pdf:
+            for page in pdf:
+                yield PdfToEntries.clean_text(page.get_text())
+
     @staticmethod
     def clean_text(text: str) -> str:
         """Clean PDF text by removing null bytes and invalid Unicode characters."""
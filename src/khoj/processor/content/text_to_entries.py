@@ -1,12 +1,11 @@
 import hashlib
 import logging
-import re
 import uuid
 from abc import ABC, abstractmethod
-from itertools import repeat
-from typing import Any, Callable, List, Set, Tuple
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Iterator, List, Optional, Set, Tuple
 
-from langchain.text_splitter import RecursiveCharacterTextSplitter
 from tqdm import tqdm
 
 from khoj.database.adapters import (
@@ -15,7 +14,8 @@ from khoj.database.adapters import (
     get_default_search_model,
 )
 from khoj.database.models import Entry as DbEntry
-from khoj.database.models import EntryDates, KhojUser
+from khoj.database.models import EntryDates, KhojUser, SearchModelConfig
+from khoj.processor.content.chunker import remove_long_words, split_text
 from khoj.search_filter.date_filter import DateFilter
 from khoj.utils import state
 from khoj.utils.helpers import batcher, is_none_or_empty, timer
@@ -25,6 +25,9 @@ logger = logging.getLogger(__name__)
 
 
 class TextToEntries(ABC):
+    # Number of entries to embed and add to database at a time
+    index_batch_size = 200
+
     def __init__(self, config: Any = None):
         self.embeddings_model = state.embeddings_model
         self.config = config
@@ -41,18 +44,7 @@ class TextToEntries(ABC):
     @staticmethod
     def remove_long_words(text: str, max_word_length: int = 500) -> str:
         "Remove words longer than max_word_length from text."
-        # Split the string by words, keeping the delimiters
-        splits = re.split(r"(\s+)", text) + [""]
-        words_with_delimiters = list(zip(splits[::2], splits[1::2]))
-
-        # Filter out long words while preserving delimiters in text
-        filtered_text = [
-            f"{word}{delimiter}"
-            for word, delimiter in words_with_delimiters
-            if not word.strip() or len(word.strip()) <= max_word_length
-        ]
-
-        return "".join(filtered_text)
+        return remove_long_words(text, max_word_length)
 
     @staticmethod
     def tokenizer(text: str) -> List[str]:
@@ -71,14 +63,7 @@ class TextToEntries(ABC):
 
             # Split entry into chunks of max_tokens
             # Use chunking preference order: paragraphs > sentences > words > characters
-            text_splitter = RecursiveCharacterTextSplitter(
-                chunk_size=max_tokens,
-                separators=["\n\n", "\n", "!", "?", ".", " ", "\t", ""],
-                keep_separator=True,
-                length_function=lambda chunk: len(TextToEntries.tokenizer(chunk)),
-                chunk_overlap=0,
-            )
-            chunked_entry_chunks = text_splitter.split_text(entry.compiled)
+            chunked_entry_chunks = split_text(entry.compiled, chunk_size=max_tokens)
             corpus_id = uuid.uuid4()
 
             # Create heading prefixed entry from each chunk
@@ -126,10 +111,11 @@ class TextToEntries(ABC):
     ):
         with timer("Constructed current entry hashes in", logger):
             hashes_by_file = dict[str, set[str]]()
-            current_entry_hashes = list(map(TextToEntries.hash_func(key), current_entries))
-            hash_to_current_entries = dict(zip(current_entry_hashes, current_entries))
+            hash_to_current_entries: dict[str, Entry] = dict()
             for entry in tqdm(current_entries, desc="Hashing Entries"):
-                hashes_by_file.setdefault(entry.file, set()).add(TextToEntries.hash_func(key)(entry))
+                entry_hash = TextToEntries.hash_func(key)(entry)
+                hash_to_current_entries[entry_hash] = entry
+                hashes_by_file.setdefault(entry.file, set()).add(entry_hash)
 
         num_deleted_entries = 0
         if regenerate:
@@ -138,62 +124,53 @@ class TextToEntries(ABC):
                 num_deleted_entries = EntryAdapters.delete_all_entries(user, file_type=file_type)
 
         hashes_to_process = set()
-        with timer("Identified entries to add to database in", logger):
-            for file in tqdm(hashes_by_file, desc="Identify new entries"):
-                hashes_for_file = hashes_by_file[file]
-                existing_entries = DbEntry.objects.filter(
-                    user=user, hashed_value__in=hashes_for_file, file_type=file_type
-                )
-                existing_entry_hashes = set([entry.hashed_value for entry in existing_entries])
+        to_delete_entry_hashes = set()
+        with timer("Identified entries to add, delete from database in", logger):
+            # Get hashes of all existing entries of file type in a single query
+            existing_entry_hashes = set()
+            existing_hashes_by_file = dict[str, set[str]]()
+            for file_path, hashed_value in EntryAdapters.get_existing_entry_hashes_by_file_type(user, file_type):
+                existing_entry_hashes.add(hashed_value)
+                if file_path in hashes_by_file:
+                    existing_hashes_by_file.setdefault(file_path, set()).add(hashed_value)
+
+            # Add current entries not in database. Delete entries of current files not in current entries
+            for file, hashes_for_file in hashes_by_file.items():
                 hashes_to_process |= hashes_for_file - existing_entry_hashes
+                to_delete_entry_hashes |= existing_hashes_by_file.get(file, set()) - hashes_for_file
+            # Entries are deleted by hash. Do not delete entries moved to other current files
+            to_delete_entry_hashes -= hash_to_current_entries.keys()
 
-        embeddings = []
+        # Embed and add new entries to database in batches to bound memory used by embeddings to the batch size.
+        # Embed the next batch on a background thread while the current batch is written to the database
         model = get_default_search_model()
-        with timer("Generated embeddings for entries to add to database in", logger):
-            entries_to_process = [hash_to_current_entries[hashed_val] for hashed_val in hashes_to_process]
-            data_to_embed = [getattr(entry, key) for entry in entries_to_process]
-            embeddings += self.embeddings_model[model.name].embed_documents(data_to_embed)
-
-        added_entries: list[DbEntry] = []
-        with timer("Added entries to database in", logger):
-            num_items = len(hashes_to_process)
-            assert num_items == len(embeddings)
-            batch_size = min(200, num_items)
-            entry_batches = zip(hashes_to_process, embeddings)
-
-            for entry_batch in tqdm(batcher(entry_batches, batch_size), desc="Add entries to database"):
-                batch_embeddings_to_create: List[DbEntry] = []
-                for entry_hash, new_entry in entry_batch:
-                    entry = hash_to_current_entries[entry_hash]
-                    batch_embeddings_to_create.append(
-                        DbEntry(
-                            user=user,
-                            embeddings=new_entry,
-                            raw=entry.raw,
-                            compiled=entry.compiled,
-                            heading=entry.heading[:1000],  # Truncate to max chars of field allowed
-                            file_path=entry.file,
-                            file_source=file_source,
-                            file_type=file_type,
-                            hashed_value=entry_hash,
-                            corpus_id=entry.corpus_id,
-                            search_model=model,
+        num_added_entries = 0
+        modified_files: set[str] = set()
+        with timer("Embedded and added entries to database in", logger):
+            # Process new entries in order of current entries to add entries of a file together
+            entries_to_process = (
+                entry_hash for entry_hash in hash_to_current_entries if entry_hash in hashes_to_process
+            )
+            entry_batches = batcher(entries_to_process, self.index_batch_size)
+            with ThreadPoolExecutor(max_workers=1, thread_name_prefix="embed_entries") as executor:
+                next_batch = self._embed_next_batch(executor, entry_batches, hash_to_current_entries, model, key)
+                with tqdm(total=len(hashes_to_process), desc="Add entries to database") as pbar:
+                    while next_batch:
+                        batch_hashes, batch_embeddings = next_batch
+                        embeddings = batch_embeddings.result()
+                        next_batch = self._embed_next_batch(
+                            executor, entry_batches, hash_to_current_entries, model, key
                         )
-                    )
-                try:
-                    added_entries += DbEntry.objects.bulk_create(batch_embeddings_to_create)
-                except Exception as e:
-                    batch_indexing_error = "\n\n".join(
-                        f"file: {entry.file_path}\nheading: {entry.heading}\ncompiled: {entry.compiled[:100]}\nraw: {entry.raw[:100]}"
-                        for entry in batch_embeddings_to_create
-                    )
-                    logger.error(f"Error adding entries to database:\n{batch_indexing_error}\n---\n{e}", exc_info=True)
-            logger.debug(f"Added {len(added_entries)} {file_type} entries to database")
+                        added_entries = self._add_entries_to_database(
+                            user, batch_hashes, embeddings, hash_to_current_entries, file_type, file_source, model
+                        )
+                        num_added_entries += len(added_entries)
+                        modified_files |= {entry.file_path for entry in added_entries}
+                        pbar.update(len(batch_hashes))
+            logger.debug(f"Added {num_added_entries} {file_type} entries to database")
 
         if file_to_text_map:
             with timer("Indexed text of modified file in", logger):
-                # get the set of modified files from added_entries
-                modified_files = {entry.file_path for entry in added_entries}
                 # create or update text of each updated file indexed on DB
                 for modified_file in modified_files:
                     raw_text = file_to_text_map[modified_file]
@@ -203,33 +180,91 @@ class TextToEntries(ABC):
                     else:
                         FileObjectAdapters.create_file_object(user, modified_file, raw_text)
 
-        new_dates = []
-        with timer("Indexed dates from added entries in", logger):
-            for added_entry in added_entries:
-                dates_in_entries = zip(self.date_filter.extract_dates(added_entry.compiled), repeat(added_entry))
-                dates_to_create = [
-                    EntryDates(date=date, entry=added_entry)
-                    for date, added_entry in dates_in_entries
-                    if not is_none_or_empty(date)
-                ]
-                new_dates += EntryDates.objects.bulk_create(dates_to_create)
-            logger.debug(f"Indexed {len(new_dates)} dates from added {file_type} entries")
-
         with timer("Deleted entries identified by server from database in", logger):
-            for file in hashes_by_file:
-                existing_entry_hashes = EntryAdapters.get_existing_entry_hashes_by_file(user, file)
-                to_delete_entry_hashes = set(existing_entry_hashes) - hashes_by_file[file]
+            if to_delete_entry_hashes:
                 num_deleted_entries += len(to_delete_entry_hashes)
-                EntryAdapters.delete_entry_by_hash(user, hashed_values=list(to_delete_entry_hashes))
+                EntryAdapters.delete_entries_by_hashes(user, hashed_values=list(to_delete_entry_hashes))
 
         with timer("Deleted entries requested by clients from database in", logger):
-            if deletion_filenames is not None:
-                for file_path in deletion_filenames:
-                    deleted_count = EntryAdapters.delete_entry_by_file(user, file_path)
-                    num_deleted_entries += deleted_count
-                    FileObjectAdapters.delete_file_object_by_name(user, file_path)
+            if deletion_filenames:
+                num_deleted_entries += EntryAdapters.delete_entries_by_filenames(user, list(deletion_filenames))
+                FileObjectAdapters.delete_file_objects_by_names(user, list(deletion_filenames))
 
-        return len(added_entries), num_deleted_entries
+        # Invalidate cached search results of user
+        state.query_cache.invalidate(str(user.uuid))
+
+        return num_added_entries, num_deleted_entries
+
+    def _embed_next_batch(
+        self,
+        executor: ThreadPoolExecutor,
+        entry_batches: Iterator,
+        hash_to_current_entries: dict[str, Entry],
+        model: SearchModelConfig,
+        key: str,
+    ) -> Optional[Tuple[List[str], Future]]:
+        "Start embedding the next batch of entries in the background. Returns its entry hashes and embeddings future"
+        batch_hashes = list(next(entry_batches, []))
+        if not batch_hashes:
+            return None
+        data_to_embed = [getattr(hash_to_current_entries[entry_hash], key) for entry_hash in batch_hashes]
+        return batch_hashes, executor.submit(self.embeddings_model[model.name].embed_documents, data_to_embed)
+
+    def _add_entries_to_database(
+        self,
+        user: KhojUser,
+        batch_hashes: List[str],
+        embeddings: List[List[float]],
+        hash_to_current_entries: dict[str, Entry],
+        file_type: str,
+        file_source: str,
+        model: SearchModelConfig,
+    ) -> List[DbEntry]:
+        "Add batch of entries with their embeddings and dates to database"
+        assert len(batch_hashes) == len(embeddings)
+        batch_embeddings_to_create: List[DbEntry] = []
+        batch_dates: List[List[datetime]] = []
+        for entry_hash, new_entry in zip(batch_hashes, embeddings):
+            entry = hash_to_current_entries[entry_hash]
+            entry_dates = [
+                date for date in self.date_filter.extract_dates(entry.compiled) if not is_none_or_empty(date)
+            ]
+            batch_dates.append(entry_dates)
+            batch_embeddings_to_create.append(
+                DbEntry(
+                    user=user,
+                    embeddings=new_entry,
+                    raw=entry.raw,
+                    compiled=entry.compiled,
+                    heading=entry.heading[:1000],  # Truncate to max chars of field allowed
+                    file_path=entry.file,
+                    file_source=file_source,
+                    file_type=file_type,
+                    hashed_value=entry_hash,
+                    corpus_id=entry.corpus_id,
+                    search_model=model,
+                    min_date=min(entry_dates).date() if entry_dates else None,
+                    max_date=max(entry_dates).date() if entry_dates else None,
+                )
+            )
+        try:
+            added_entries = DbEntry.objects.bulk_create(batch_embeddings_to_create)
+        except Exception as e:
+            batch_indexing_error = "\n\n".join(
+                f"file: {entry.file_path}\nheading: {entry.heading}\ncompiled: {entry.compiled[:100]}\nraw: {entry.raw[:100]}"
+                for entry in batch_embeddings_to_create
+            )
+            logger.error(f"Error adding entries to database:\n{batch_indexing_error}\n---\n{e}", exc_info=True)
+            return []
+
+        # Index dates in added entries
+        dates_to_create = [
+            EntryDates(date=date, entry=added_entry)
+            for added_entry, entry_dates in zip(added_entries, batch_dates)
+            for date in entry_dates
+        ]
+        EntryDates.objects.bulk_create(dates_to_create)
+        return added_entries
 
     @staticmethod
     def mark_entries_for_update(
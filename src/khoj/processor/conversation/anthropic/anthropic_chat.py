@@ -231,8 +231,6 @@ def converse_anthropic(
     # Get Response from Claude
     return anthropic_chat_completion_with_backoff(
         messages=messages,
-        compiled_references=references,
-        online_results=online_results,
         model_name=model,
         temperature=0,
         api_key=api_key,
@@ -1,21 +1,21 @@
 import logging
-from threading import Thread
-from typing import Dict, List
+from typing import AsyncIterator, Dict, List
 
 import anthropic
 from langchain.schema import ChatMessage
 from tenacity import (
     before_sleep_log,
     retry,
+    retry_if_exception_type,
     stop_after_attempt,
     wait_exponential,
     wait_random_exponential,
 )
 
 from khoj.processor.conversation.utils import (
-    ThreadedGenerator,
     commit_conversation_trace,
     get_image_from_url,
+    stream_chat_response,
 )
 from khoj.utils import state
 from khoj.utils.helpers import (
@@ -28,6 +28,7 @@ from khoj.utils.helpers import (
 logger = logging.getLogger(__name__)
 
 anthropic_clients: Dict[str, anthropic.Anthropic] = {}
+anthropic_async_clients: Dict[str, anthropic.AsyncAnthropic] = {}
 
 
 DEFAULT_MAX_TOKENS_ANTHROPIC = 3000
@@ -95,16 +96,8 @@ def anthropic_completion_with_backoff(
     return aggregated_response
 
 
-@retry(
-    wait=wait_exponential(multiplier=1, min=4, max=10),
-    stop=stop_after_attempt(2),
-    before_sleep=before_sleep_log(logger, logging.DEBUG),
-    reraise=True,
-)
 def anthropic_chat_completion_with_backoff(
     messages,
-    compiled_references,
-    online_results,
     model_name,
     temperature,
     api_key,
@@ -113,33 +106,51 @@ def anthropic_chat_completion_with_backoff(
     completion_func=None,
     model_kwargs=None,
     tracer={},
-):
-    g = ThreadedGenerator(compiled_references, online_results, completion_func=completion_func)
-    t = Thread(
-        target=anthropic_llm_thread,
-        args=(g, messages, system_prompt, model_name, temperature, api_key, max_prompt_size, model_kwargs, tracer),
+) -> AsyncIterator[str]:
+    "Stream chat response from Anthropic API on the event loop"
+    return stream_chat_response(
+        anthropic_llm_stream(
+            messages, system_prompt, model_name, temperature, api_key, max_prompt_size, model_kwargs, tracer
+        ),
+        completion_func=completion_func,
     )
-    t.start()
-    return g
 
 
-def anthropic_llm_thread(
-    g, messages, system_prompt, model_name, temperature, api_key, max_prompt_size=None, model_kwargs=None, tracer={}
-):
+@retry(
+    retry=(
+        retry_if_exception_type(anthropic.APITimeoutError)
+        | retry_if_exception_type(anthropic.APIError)
+        | retry_if_exception_type(anthropic.APIConnectionError)
+        | retry_if_exception_type(anthropic.RateLimitError)
+        | retry_if_exception_type(anthropic.APIStatusError)
+    ),
+    wait=wait_exponential(multiplier=1, min=4, max=10),
+    stop=stop_after_attempt(2),
+    before_sleep=before_sleep_log(logger, logging.DEBUG),
+    reraise=True,
+)
+async def create_anthropic_chat_stream(
+    client: anthropic.AsyncAnthropic, **kwargs
+) -> anthropic.AsyncStream[anthropic.types.MessageStreamEvent]:
+    return await client.messages.create(stream=True, **kwargs)
+
+
+async def anthropic_llm_stream(
+    messages, system_prompt, model_name, temperature, api_key, max_prompt_size=None, model_kwargs=None, tracer={}
+) -> AsyncIterator[str]:
     try:
-        if api_key not in anthropic_clients:
-            client: anthropic.Anthropic = anthropic.Anthropic(api_key=api_key)
-            anthropic_clients[api_key] = client
+        if api_key not in anthropic_async_clients:
+            client: anthropic.AsyncAnthropic = anthropic.AsyncAnthropic(api_key=api_key)
+            anthropic_async_clients[api_key] = client
         else:
-            client: anthropic.Anthropic = anthropic_clients[api_key]
+            client: anthropic.AsyncAnthropic = anthropic_async_clients[api_key]
 
         formatted_messages: List[anthropic.types.MessageParam] = [
             anthropic.types.MessageParam(role=message.role, content=message.content) for message in messages
         ]
 
-        aggregated_response = ""
-        final_message = None
-        with client.messages.stream(
+        stream = await create_anthropic_chat_stream(
+            client,
             messages=formatted_messages,
             model=model_name,  # type: ignore
             temperature=temperature,
@@ -147,15 +158,20 @@ def anthropic_llm_thread(
             timeout=20,
             max_tokens=DEFAULT_MAX_TOKENS_ANTHROPIC,
             **(model_kwargs or dict()),
-        ) as stream:
-            for text in stream.text_stream:
-                aggregated_response += text
-                g.send(text)
-            final_message = stream.get_final_message()
+        )
+
+        aggregated_response = ""
+        input_tokens, output_tokens = 0, 0
+        async for event in stream:
+            if event.type == "message_start":
+                input_tokens = event.message.usage.input_tokens
+            elif event.type == "message_delta":
+                output_tokens = event.usage.output_tokens
+            elif event.type == "content_block_delta" and event.delta.type == "text_delta":
+                aggregated_response += event.delta.text
+                yield event.delta.text
 
         # Calculate cost of chat
-        input_tokens = final_message.usage.input_tokens
-        output_tokens = final_message.usage.output_tokens
         tracer["usage"] = get_chat_usage_metrics(model_name, input_tokens, output_tokens, tracer.get("usage"))
 
         # Save conversation trace
@@ -164,9 +180,7 @@ def anthropic_llm_thread(
         if is_promptrace_enabled():
             commit_conversation_trace(messages, aggregated_response, tracer)
     except Exception as e:
-        logger.error(f"Error in anthropic_llm_thread: {e}", exc_info=True)
-    finally:
-        g.close()
+        logger.error(f"Error in anthropic_llm_stream: {e}", exc_info=True)
 
 
 def format_messages_for_anthropic(messages: list[ChatMessage], system_prompt=None):
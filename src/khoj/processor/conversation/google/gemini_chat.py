@@ -242,8 +242,6 @@ def converse_gemini(
     # Get Response from Google AI
     return gemini_chat_completion_with_backoff(
         messages=messages,
-        compiled_references=references,
-        online_results=online_results,
         model_name=model,
         temperature=temperature,
         api_key=api_key,
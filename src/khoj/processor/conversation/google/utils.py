@@ -1,6 +1,6 @@
 import logging
 import random
-from threading import Thread
+from typing import AsyncIterator
 
 import google.generativeai as genai
 from google.generativeai.types.answer_types import FinishReason
@@ -20,9 +20,9 @@ from tenacity import (
 )
 
 from khoj.processor.conversation.utils import (
-    ThreadedGenerator,
     commit_conversation_trace,
     get_image_from_url,
+    stream_chat_response,
 )
 from khoj.utils import state
 from khoj.utils.helpers import (
@@ -95,16 +95,8 @@ def gemini_completion_with_backoff(
     return response_text
 
 
-@retry(
-    wait=wait_exponential(multiplier=1, min=4, max=10),
-    stop=stop_after_attempt(2),
-    before_sleep=before_sleep_log(logger, logging.DEBUG),
-    reraise=True,
-)
 def gemini_chat_completion_with_backoff(
     messages,
-    compiled_references,
-    online_results,
     model_name,
     temperature,
     api_key,
@@ -112,19 +104,29 @@ def gemini_chat_completion_with_backoff(
     completion_func=None,
     model_kwargs=None,
     tracer: dict = {},
-):
-    g = ThreadedGenerator(compiled_references, online_results, completion_func=completion_func)
-    t = Thread(
-        target=gemini_llm_thread,
-        args=(g, messages, system_prompt, model_name, temperature, api_key, model_kwargs, tracer),
+) -> AsyncIterator[str]:
+    "Stream chat response from Gemini API on the event loop"
+    return stream_chat_response(
+        gemini_llm_stream(messages, system_prompt, model_name, temperature, api_key, model_kwargs, tracer),
+        completion_func=completion_func,
     )
-    t.start()
-    return g
 
 
-def gemini_llm_thread(
-    g, messages, system_prompt, model_name, temperature, api_key, model_kwargs=None, tracer: dict = {}
-):
+@retry(
+    wait=wait_exponential(multiplier=1, min=4, max=10),
+    stop=stop_after_attempt(2),
+    before_sleep=before_sleep_log(logger, logging.DEBUG),
+    reraise=True,
+)
+async def create_gemini_chat_stream(
+    chat_session: genai.ChatSession, content, **kwargs
+) -> genai.types.AsyncGenerateContentResponse:
+    return await chat_session.send_message_async(content, stream=True, **kwargs)
+
+
+async def gemini_llm_stream(
+    messages, system_prompt, model_name, temperature, api_key, model_kwargs=None, tracer: dict = {}
+) -> AsyncIterator[str]:
     try:
         genai.configure(api_key=api_key)
         model_kwargs = model_kwargs or dict()
@@ -149,11 +151,12 @@ def gemini_llm_thread(
         # all messages up to the last are considered to be part of the chat history
         chat_session = model.start_chat(history=formatted_messages[0:-1])
         # the last message is considered to be the current prompt
-        for chunk in chat_session.send_message(formatted_messages[-1]["parts"], stream=True):
+        response = await create_gemini_chat_stream(chat_session, formatted_messages[-1]["parts"])
+        async for chunk in response:
             message, stopped = handle_gemini_response(chunk.candidates, chunk.prompt_feedback)
             message = message or chunk.text
             aggregated_response += message
-            g.send(message)
+            yield message
             if stopped:
                 raise StopCandidateException(message)
 
@@ -173,9 +176,7 @@ def gemini_llm_thread(
             + f"Last Message by {messages[-1].role}: {messages[-1].content}"
         )
     except Exception as e:
-        logger.error(f"Error in gemini_llm_thread: {e}", exc_info=True)
-    finally:
-        g.close()
+        logger.error(f"Error in gemini_llm_stream: {e}", exc_info=True)
 
 
 def handle_gemini_response(candidates, prompt_feedback=None):
@@ -231,8 +231,6 @@ def converse_openai(
     # Get Response from GPT
     return chat_completion_with_backoff(
         messages=messages,
-        compiled_references=references,
-        online_results=online_results,
         model_name=model,
         temperature=temperature,
         openai_api_key=api_key,
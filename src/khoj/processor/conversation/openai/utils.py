@@ -1,7 +1,6 @@
 import logging
 import os
-from threading import Thread
-from typing import Dict
+from typing import AsyncIterator, Dict
 
 import openai
 from openai.types.chat.chat_completion import ChatCompletion
@@ -16,14 +15,15 @@ from tenacity import (
 )
 
 from khoj.processor.conversation.utils import (
-    ThreadedGenerator,
     commit_conversation_trace,
+    stream_chat_response,
 )
 from khoj.utils.helpers import get_chat_usage_metrics, is_promptrace_enabled
 
 logger = logging.getLogger(__name__)
 
 openai_clients: Dict[str, openai.OpenAI] = {}
+openai_async_clients: Dict[str, openai.AsyncOpenAI] = {}
 
 
 @retry(
@@ -102,6 +102,23 @@ def completion_with_backoff(
     return aggregated_response
 
 
+def chat_completion_with_backoff(
+    messages,
+    model_name,
+    temperature,
+    openai_api_key=None,
+    api_base_url=None,
+    completion_func=None,
+    model_kwargs=None,
+    tracer: dict = {},
+) -> AsyncIterator[str]:
+    "Stream chat response from OpenAI compatible API on the event loop"
+    return stream_chat_response(
+        llm_stream(messages, model_name, temperature, openai_api_key, api_base_url, model_kwargs, tracer),
+        completion_func=completion_func,
+    )
+
+
 @retry(
     retry=(
         retry_if_exception_type(openai._exceptions.APITimeoutError)
@@ -115,29 +132,11 @@ def completion_with_backoff(
     before_sleep=before_sleep_log(logger, logging.DEBUG),
     reraise=True,
 )
-def chat_completion_with_backoff(
-    messages,
-    compiled_references,
-    online_results,
-    model_name,
-    temperature,
-    openai_api_key=None,
-    api_base_url=None,
-    completion_func=None,
-    model_kwargs=None,
-    tracer: dict = {},
-):
-    g = ThreadedGenerator(compiled_references, online_results, completion_func=completion_func)
-    t = Thread(
-        target=llm_thread,
-        args=(g, messages, model_name, temperature, openai_api_key, api_base_url, model_kwargs, tracer),
-    )
-    t.start()
-    return g
+async def create_chat_stream(client: openai.AsyncOpenAI, **kwargs) -> openai.AsyncStream[ChatCompletionChunk]:
+    return await client.chat.completions.create(**kwargs)
 
 
-def llm_thread(
-    g,
+async def llm_stream(
     messages,
     model_name,
     temperature,
@@ -145,20 +144,20 @@ def llm_thread(
     api_base_url=None,
     model_kwargs=None,
     tracer: dict = {},
-):
+) -> AsyncIterator[str]:
     try:
         client_key = f"{openai_api_key}--{api_base_url}"
-        if client_key not in openai_clients:
-            client = openai.OpenAI(
+        if client_key not in openai_async_clients:
+            client = openai.AsyncOpenAI(
                 api_key=openai_api_key,
                 base_url=api_base_url,
             )
-            openai_clients[client_key] = client
+            openai_async_clients[client_key] = client
         else:
-            client = openai_clients[client_key]
+            client = openai_async_clients[client_key]
 
         formatted_messages = [{"role": message.role, "content": message.content} for message in messages]
-        stream = True
+        model_kwargs = model_kwargs or dict()
 
         # Update request parameters for compatability with o1 model series
         # Refer: https://platform.openai.com/docs/guides/reasoning/beta-limitations
@@ -170,34 +169,31 @@ def llm_thread(
         if os.getenv("KHOJ_LLM_SEED"):
             model_kwargs["seed"] = int(os.getenv("KHOJ_LLM_SEED"))
 
-        chat: ChatCompletion | openai.Stream[ChatCompletionChunk] = client.chat.completions.create(
+        chat = await create_chat_stream(
+            client,
             messages=formatted_messages,
-            model=model_name,  # type: ignore
-            stream=stream,
-            stream_options={"include_usage": True} if stream else {},
+            model=model_name,
+            stream=True,
+            stream_options={"include_usage": True},
             temperature=temperature,
             timeout=20,
-            **(model_kwargs or dict()),
+            **model_kwargs,
         )
 
         aggregated_response = ""
-        if not stream:
-            chunk = chat
-            aggregated_response = chunk.choices[0].message.content
-            g.send(aggregated_response)
-        else:
-            for chunk in chat:
-                if len(chunk.choices) == 0:
-                    continue
-                delta_chunk = chunk.choices[0].delta
-                text_chunk = ""
-                if isinstance(delta_chunk, str):
-                    text_chunk = delta_chunk
-                elif delta_chunk.content:
-                    text_chunk = delta_chunk.content
-                if text_chunk:
-                    aggregated_response += text_chunk
-                    g.send(text_chunk)
+        chunk = None
+        async for chunk in chat:
+            if len(chunk.choices) == 0:
+                continue
+            delta_chunk = chunk.choices[0].delta
+            text_chunk = ""
+            if isinstance(delta_chunk, str):
+                text_chunk = delta_chunk
+            elif delta_chunk.content:
+                text_chunk = delta_chunk.content
+            if text_chunk:
+                aggregated_response += text_chunk
+                yield text_chunk
 
         # Calculate cost of chat
         input_tokens = chunk.usage.prompt_tokens if hasattr(chunk, "usage") and chunk.usage else 0
@@ -210,6 +206,4 @@ def llm_thread(
         if is_promptrace_enabled():
             commit_conversation_trace(messages, aggregated_response, tracer)
     except Exception as e:
-        logger.error(f"Error in llm_thread: {e}", exc_info=True)
-    finally:
-        g.close()
+        logger.error(f"Error in llm_stream: {e}", exc_info=True)
@@ -615,7 +615,7 @@ Create a multi-step plan and intelligently iterate on the plan based on the retr
 {personality_context}
 
 # Instructions
-- Ask highly diverse, detailed queries to the tool AIs, one tool AI at a time, to discover required information or run calculations. Their response will be shown to you in the next iteration.
+- Ask highly diverse, detailed queries to the tool AIs, {tool_calls_per_iteration}, to discover required information or run calculations. Their response will be shown to you in the next iteration.
 - Break down your research process into independent, self-contained steps that can be executed sequentially using the available tool AIs to answer the user's query. Write your step-by-step plan in the scratchpad.
 - Always ask a new query that was not asked to the tool AI in a previous iteration. Build on the results of the previous iterations.
 - Ensure that all required context is passed to the tool AIs for successful execution. They only know the context provided in your query.
@@ -654,9 +654,23 @@ Which of the tool AIs listed below would you use to answer the user's question?
 # Chat History:
 {chat_history}
 
+{response_instructions}
+""".strip()
+)
+
+plan_function_execution_next_tool = """
 Return the next tool AI to use and the query to ask it. Your response should always be a valid JSON object. Do not say anything else.
 Response format:
-{{"scratchpad": "<your_scratchpad_to_reason_about_which_tool_to_use>", "query": "<your_detailed_query_for_the_tool_ai>", "tool": "<name_of_tool_ai>"}}
+{"scratchpad": "<your_scratchpad_to_reason_about_which_tool_to_use>", "query": "<your_detailed_query_for_the_tool_ai>", "tool": "<name_of_tool_ai>"}
+""".strip()
+
+plan_function_execution_next_tools = PromptTemplate.from_template(
+    """
+Return the next tool AIs to use and the queries to ask them. Only ask multiple tool AIs in an iteration if their queries are independent of each other's results.
+Stop when you have the required information by returning an empty "tool_calls" list.
+Your response should always be a valid JSON object. Do not say anything else.
+Response format:
+{{"scratchpad": "<your_scratchpad_to_reason_about_which_tools_to_use>", "tool_calls": [{{"query": "<your_detailed_query_for_the_tool_ai>", "tool": "<name_of_tool_ai>"}}, ...upto {max_parallel_tools} tool calls]}}
 """.strip()
 )
 
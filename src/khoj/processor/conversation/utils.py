@@ -1,4 +1,5 @@
 import base64
+import hashlib
 import json
 import logging
 import math
@@ -6,19 +7,22 @@ import mimetypes
 import os
 import queue
 import re
+import threading
 import uuid
+from collections import OrderedDict
 from dataclasses import dataclass
 from datetime import datetime
 from enum import Enum
 from io import BytesIO
 from time import perf_counter
-from typing import Any, Callable, Dict, List, Optional
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
 
 import PIL.Image
 import pyjson5
 import requests
 import tiktoken
 import yaml
+from asgiref.sync import sync_to_async
 from langchain.schema import ChatMessage
 from llama_cpp.llama import Llama
 from transformers import AutoTokenizer
@@ -27,10 +31,7 @@ from khoj.database.adapters import ConversationAdapters
 from khoj.database.models import ChatModelOptions, ClientApplication, KhojUser
 from khoj.processor.conversation import prompts
 from khoj.processor.conversation.offline.utils import download_model, infer_max_tokens
-from khoj.search_filter.base_filter import BaseFilter
-from khoj.search_filter.date_filter import DateFilter
-from khoj.search_filter.file_filter import FileFilter
-from khoj.search_filter.word_filter import WordFilter
+from khoj.search_filter.query_parser import parse_query_filters
 from khoj.utils import state
 from khoj.utils.helpers import (
     ConversationCommand,
@@ -71,6 +72,10 @@ model_to_prompt_size = {
     "Qwen/Qwen2.5-14B-Instruct-GGUF": 20000,
 }
 model_to_tokenizer: Dict[str, str] = {}
+tokenizer_lock = threading.Lock()
+# Token counts of recent chat messages per tokenizer
+token_counts: OrderedDict[Tuple[str, bytes], int] = OrderedDict()
+max_token_counts = 4096
 
 
 class ThreadedGenerator:
@@ -109,6 +114,28 @@ class ThreadedGenerator:
         self.queue.put(StopIteration)
 
 
+async def stream_chat_response(response_chunks: AsyncIterator[str], completion_func=None) -> AsyncIterator[str]:
+    """Stream chat response chunks from chat model. Async equivalent of the ThreadedGenerator.
+
+    The completion func is called with the aggregated response once the response is streamed.
+    It is expected to save the response to the conversation history.
+    """
+    start_time = perf_counter()
+    response = ""
+    try:
+        async for chunk in response_chunks:
+            if response == "":
+                time_to_first_response = perf_counter() - start_time
+                logger.info(f"First response took: {time_to_first_response:.3f} seconds")
+            response += chunk
+            yield chunk
+    finally:
+        time_to_response = perf_counter() - start_time
+        logger.info(f"Chat streaming took: {time_to_response:.3f} seconds")
+        if completion_func:
+            await sync_to_async(completion_func)(chat_response=response)
+
+
 class InformationCollectionIteration:
     def __init__(
         self,
@@ -227,6 +254,7 @@ def message_to_log(
     user_message_metadata={},
     khoj_message_metadata={},
     conversation_log=[],
+    chat_model: ChatModelOptions = None,
 ):
     """Create json logs from messages, metadata for conversation log"""
     default_khoj_message_metadata = {
@@ -246,6 +274,12 @@ def message_to_log(
     khoj_log = merge_dicts(khoj_message_metadata, default_khoj_message_metadata)
     khoj_log = merge_dicts({"message": chat_response, "by": "khoj", "created": khoj_response_time}, khoj_log)
 
+    # Render context and count tokens once, when saved, as past messages are sent to the chat model every turn
+    for log in [human_log, khoj_log]:
+        log["renderedContext"] = render_turn_context(log)
+        if chat_model:
+            log["tokenCounts"] = count_turn_tokens(log, chat_model)
+
     conversation_log.extend([human_log, khoj_log])
     return conversation_log
 
@@ -271,6 +305,7 @@ def save_to_conversation_log(
     generated_excalidraw_diagram: str = None,
     train_of_thought: List[Any] = [],
     tracer: Dict[str, Any] = {},
+    chat_model: ChatModelOptions = None,
 ):
     user_message_time = user_message_time or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     turn_id = tracer.get("mid") or str(uuid.uuid4())
@@ -301,6 +336,7 @@ def save_to_conversation_log(
         user_message_metadata=user_message_metadata,
         khoj_message_metadata=khoj_message_metadata,
         conversation_log=meta_log.get("chat", []),
+        chat_model=chat_model or ConversationAdapters.get_conversation_config(user),
     )
     ConversationAdapters.save_conversation(
         user,
@@ -369,6 +405,113 @@ def gather_raw_query_files(
     return f"I have attached the following files:\n\n{contextual_data}"
 
 
+def render_turn_context(chat: dict) -> str:
+    """Render notes and online context of a chat turn into the context message to send to the chat model"""
+    message_context = ""
+    if not is_none_or_empty(chat.get("context")):
+        references = "\n\n".join(
+            {
+                f"# File: {item['file']}\n## {item['compiled']}\n"
+                for item in chat.get("context") or []
+                if isinstance(item, dict)
+            }
+        )
+        message_context += f"{prompts.notes_conversation.format(references=references)}\n\n"
+
+    if not is_none_or_empty(chat.get("onlineContext")):
+        message_context += f"{prompts.online_search_conversation.format(online_results=chat.get('onlineContext'))}"
+
+    return message_context
+
+
+def chat_turn_to_chatml(chat: dict, user_message: str, model_type: str, vision_enabled: bool) -> List[ChatMessage]:
+    """Convert a message in the conversation log to chat messages, in chronological order"""
+    messages: List[ChatMessage] = []
+    generated_assets = {}
+
+    chat_message = chat.get("message")
+    role = "user" if chat["by"] == "you" else "assistant"
+
+    # Legacy code to handle excalidraw diagrams prior to Dec 2024
+    if chat["by"] == "khoj" and "excalidraw" in chat["intent"].get("type", ""):
+        chat_message = chat["intent"].get("inferred-queries")[0]
+
+    # Context is rendered when the message is saved. Render it for messages saved before
+    message_context = chat["renderedContext"] if "renderedContext" in chat else render_turn_context(chat)
+    if not is_none_or_empty(message_context):
+        messages.append(ChatMessage(content=message_context, role="user"))
+
+    if chat.get("queryFiles"):
+        query_files_dict = {file["name"]: file["content"] for file in chat.get("queryFiles")}
+        messages.append(ChatMessage(content=gather_raw_query_files(query_files_dict), role=role))
+
+    message_content = construct_structured_message(
+        chat_message, chat.get("images") if role == "user" else [], model_type, vision_enabled
+    )
+    messages.append(ChatMessage(content=message_content, role=role))
+
+    if not is_none_or_empty(chat.get("images")) and role == "assistant":
+        generated_assets["image"] = {
+            "query": chat.get("intent", {}).get("inferred-queries", [user_message])[0],
+        }
+
+    if not is_none_or_empty(chat.get("excalidrawDiagram")) and role == "assistant":
+        generated_assets["diagram"] = {
+            "query": chat.get("intent", {}).get("inferred-queries", [user_message])[0],
+        }
+
+    if not is_none_or_empty(generated_assets):
+        messages.append(
+            ChatMessage(
+                content=f"{prompts.generated_assets_context.format(generated_assets=yaml_dump(generated_assets))}\n",
+                role="user",
+            )
+        )
+
+    return messages
+
+
+def get_turn_token_counts(
+    chat: dict, messages: List[ChatMessage], tokenizer_key: str, encoder: Any
+) -> List[Optional[int]]:
+    """Get token counts of chat messages of a conversation log message.
+
+    Token counts are saved with the conversation log message for the tokenizer of the chat model it was created with.
+    Count tokens of messages saved before or with another tokenizer. Do not write these counts back into the message,
+    as changing past messages would re-save them with every new message.
+    Saved counts are also added to the token counts memoized for truncating messages to avoid re-encoding them.
+    """
+    token_counts = chat.get("tokenCounts", {}).get(tokenizer_key)
+    is_stale = token_counts is None or len(token_counts) != len(messages)
+    if not is_stale:
+        is_stale = any(type(m.content) == str and count is None for m, count in zip(messages, token_counts))
+    if is_stale:
+        token_counts = [
+            count_tokens(tokenizer_key, encoder, message.content) if type(message.content) == str else None
+            for message in messages
+        ]
+    else:
+        for message, count in zip(messages, token_counts):
+            if type(message.content) == str:
+                remember_token_count(tokenizer_key, message.content, count)
+    return token_counts
+
+
+def count_turn_tokens(chat: dict, chat_model: ChatModelOptions) -> Dict[str, List[Optional[int]]]:
+    "Count tokens of chat messages of a conversation log message with the tokenizer of the chat model"
+    loaded_model = None
+    if chat_model.model_type == ChatModelOptions.ModelType.OFFLINE and state.offline_chat_processor_config:
+        loaded_model = state.offline_chat_processor_config.loaded_model
+    tokenizer_key = get_tokenizer_key(chat_model.chat_model, loaded_model, chat_model.tokenizer)
+    encoder = get_encoder(tokenizer_key, chat_model.chat_model, loaded_model, chat_model.tokenizer)
+    messages = chat_turn_to_chatml(chat, chat.get("message"), chat_model.model_type, chat_model.vision_enabled)
+    token_counts = [
+        count_tokens(tokenizer_key, encoder, message.content) if type(message.content) == str else None
+        for message in messages
+    ]
+    return {tokenizer_key: token_counts}
+
+
 def generate_chatml_messages_with_context(
     user_message,
     system_message=None,
@@ -398,72 +541,21 @@ def generate_chatml_messages_with_context(
     lookback_turns = max_prompt_size // 750
 
     # Extract Chat History for Context
+    # Pick most recent messages from conversation history that fit within max prompt size using their cached token counts
+    tokenizer_key = get_tokenizer_key(model_name, loaded_model, tokenizer_name)
+    encoder = get_encoder(tokenizer_key, model_name, loaded_model, tokenizer_name)
     chatml_messages: List[ChatMessage] = []
-    for chat in conversation_log.get("chat", []):
-        message_context = ""
-        message_attached_files = ""
-
-        generated_assets = {}
-
-        chat_message = chat.get("message")
-        role = "user" if chat["by"] == "you" else "assistant"
-
-        # Legacy code to handle excalidraw diagrams prior to Dec 2024
-        if chat["by"] == "khoj" and "excalidraw" in chat["intent"].get("type", ""):
-            chat_message = chat["intent"].get("inferred-queries")[0]
-
-        if not is_none_or_empty(chat.get("context")):
-            references = "\n\n".join(
-                {
-                    f"# File: {item['file']}\n## {item['compiled']}\n"
-                    for item in chat.get("context") or []
-                    if isinstance(item, dict)
-                }
-            )
-            message_context += f"{prompts.notes_conversation.format(references=references)}\n\n"
-
-        if chat.get("queryFiles"):
-            raw_query_files = chat.get("queryFiles")
-            query_files_dict = dict()
-            for file in raw_query_files:
-                query_files_dict[file["name"]] = file["content"]
-
-            message_attached_files = gather_raw_query_files(query_files_dict)
-            chatml_messages.append(ChatMessage(content=message_attached_files, role=role))
-
-        if not is_none_or_empty(chat.get("onlineContext")):
-            message_context += f"{prompts.online_search_conversation.format(online_results=chat.get('onlineContext'))}"
-
-        if not is_none_or_empty(message_context):
-            reconstructed_context_message = ChatMessage(content=message_context, role="user")
-            chatml_messages.insert(0, reconstructed_context_message)
-
-        if not is_none_or_empty(chat.get("images")) and role == "assistant":
-            generated_assets["image"] = {
-                "query": chat.get("intent", {}).get("inferred-queries", [user_message])[0],
-            }
-
-        if not is_none_or_empty(chat.get("excalidrawDiagram")) and role == "assistant":
-            generated_assets["diagram"] = {
-                "query": chat.get("intent", {}).get("inferred-queries", [user_message])[0],
-            }
-
-        if not is_none_or_empty(generated_assets):
-            chatml_messages.append(
-                ChatMessage(
-                    content=f"{prompts.generated_assets_context.format(generated_assets=yaml_dump(generated_assets))}\n",
-                    role="user",
-                )
-            )
-
-        message_content = construct_structured_message(
-            chat_message, chat.get("images") if role == "user" else [], model_type, vision_enabled
-        )
-
-        reconstructed_message = ChatMessage(content=message_content, role=role)
-        chatml_messages.insert(0, reconstructed_message)
-
-        if len(chatml_messages) >= 3 * lookback_turns:
+    history_tokens = 0
+    for chat in reversed(conversation_log.get("chat", [])):
+        turn_messages = chat_turn_to_chatml(chat, user_message, model_type, vision_enabled)
+        turn_tokens = get_turn_token_counts(chat, turn_messages, tokenizer_key, encoder)
+        for message, message_tokens in reversed(list(zip(turn_messages, turn_tokens))):
+            # Reserves 4 tokens to demarcate each message
+            history_tokens += (message_tokens or 0) + 4
+            if history_tokens > max_prompt_size:
+                break
+            chatml_messages.append(message)
+        if history_tokens > max_prompt_size or len(chatml_messages) >= 3 * lookback_turns:
             break
 
     messages = []
@@ -510,6 +602,76 @@ def generate_chatml_messages_with_context(
     return messages[::-1]
 
 
+def get_tokenizer_key(model_name: str, loaded_model: Optional[Llama] = None, tokenizer_name: str = None) -> str:
+    "Key of the tokenizer to count tokens for the chat model with"
+    if loaded_model:
+        return f"llama:{model_name}"
+    elif model_name.startswith("gpt-") or model_name.startswith("o1"):
+        # as tiktoken doesn't recognize o1 model series yet
+        return f"tiktoken:{'gpt-4o' if model_name.startswith('o1') else model_name}"
+    elif tokenizer_name:
+        return f"pretrained:{tokenizer_name}"
+    else:
+        return f"offline:{model_name}"
+
+
+def get_encoder(
+    tokenizer_key: str, model_name: str, loaded_model: Optional[Llama] = None, tokenizer_name: str = None
+) -> Any:
+    """Get tokenizer from the process-wide tokenizer registry. Load it on first use"""
+    # Tokenizer of loaded chat model is already in memory
+    if loaded_model:
+        return loaded_model.tokenizer()
+
+    if tokenizer_key in state.pretrained_tokenizers:
+        return state.pretrained_tokenizers[tokenizer_key]
+
+    with tokenizer_lock:
+        if tokenizer_key in state.pretrained_tokenizers:
+            return state.pretrained_tokenizers[tokenizer_key]
+
+        default_tokenizer = "gpt-4o"
+        try:
+            if tokenizer_key.startswith("tiktoken:"):
+                encoder = tiktoken.encoding_for_model(tokenizer_key.removeprefix("tiktoken:"))
+            elif tokenizer_name:
+                encoder = AutoTokenizer.from_pretrained(tokenizer_name)
+            else:
+                encoder = download_model(model_name).tokenizer()
+        except:
+            encoder = tiktoken.encoding_for_model(default_tokenizer)
+            logger.debug(
+                f"Fallback to default chat model tokenizer: {default_tokenizer}.\nConfigure tokenizer for model: {model_name} in Khoj settings to improve context stuffing."
+            )
+        # Also remember fallback tokenizer to not retry loading unavailable tokenizers on every chat message
+        state.pretrained_tokenizers[tokenizer_key] = encoder
+    return encoder
+
+
+def count_tokens(tokenizer_key: str, encoder: Any, content: Any) -> int:
+    """Count tokens in message content. Counts are memoized per tokenizer as past messages are re-sent every turn"""
+    # TODO: Handle truncation of multi-part message.content, i.e when message.content is a list[dict] rather than a string
+    if type(content) != str:
+        return 0
+    key = (tokenizer_key, hashlib.blake2b(content.encode(), digest_size=16).digest())
+    with tokenizer_lock:
+        if key in token_counts:
+            token_counts.move_to_end(key)
+            return token_counts[key]
+    count = len(encoder.encode(content))
+    remember_token_count(tokenizer_key, content, count)
+    return count
+
+
+def remember_token_count(tokenizer_key: str, content: str, count: int):
+    key = (tokenizer_key, hashlib.blake2b(content.encode(), digest_size=16).digest())
+    with tokenizer_lock:
+        token_counts[key] = count
+        token_counts.move_to_end(key)
+        if len(token_counts) > max_token_counts:
+            token_counts.popitem(last=False)
+
+
 def truncate_messages(
     messages: list[ChatMessage],
     max_prompt_size: int,
@@ -518,27 +680,8 @@ def truncate_messages(
     tokenizer_name=None,
 ) -> list[ChatMessage]:
     """Truncate messages to fit within max prompt size supported by model"""
-    default_tokenizer = "gpt-4o"
-
-    try:
-        if loaded_model:
-            encoder = loaded_model.tokenizer()
-        elif model_name.startswith("gpt-") or model_name.startswith("o1"):
-            # as tiktoken doesn't recognize o1 model series yet
-            encoder = tiktoken.encoding_for_model("gpt-4o" if model_name.startswith("o1") else model_name)
-        elif tokenizer_name:
-            if tokenizer_name in state.pretrained_tokenizers:
-                encoder = state.pretrained_tokenizers[tokenizer_name]
-            else:
-                encoder = AutoTokenizer.from_pretrained(tokenizer_name)
-                state.pretrained_tokenizers[tokenizer_name] = encoder
-        else:
-            encoder = download_model(model_name).tokenizer()
-    except:
-        encoder = tiktoken.encoding_for_model(default_tokenizer)
-        logger.debug(
-            f"Fallback to default chat model tokenizer: {default_tokenizer}.\nConfigure tokenizer for model: {model_name} in Khoj settings to improve context stuffing."
-        )
+    tokenizer_key = get_tokenizer_key(model_name, loaded_model, tokenizer_name)
+    encoder = get_encoder(tokenizer_key, model_name, loaded_model, tokenizer_name)
 
     # Extract system message from messages
     system_message = None
@@ -547,18 +690,17 @@ def truncate_messages(
             system_message = messages.pop(idx)
             break
 
-    # TODO: Handle truncation of multi-part message.content, i.e when message.content is a list[dict] rather than a string
-    system_message_tokens = (
-        len(encoder.encode(system_message.content)) if system_message and type(system_message.content) == str else 0
-    )
+    system_message_tokens = count_tokens(tokenizer_key, encoder, system_message.content) if system_message else 0
 
-    tokens = sum([len(encoder.encode(message.content)) for message in messages if type(message.content) == str])
+    # Encode each message once. Track total tokens of remaining messages as older messages are dropped
+    message_tokens = [count_tokens(tokenizer_key, encoder, message.content) for message in messages]
+    tokens = sum(message_tokens)
 
     # Drop older messages until under max supported prompt size by model
     # Reserves 4 tokens to demarcate each message (e.g <|im_start|>user, <|im_end|>, <|endoftext|> etc.)
     while (tokens + system_message_tokens + 4 * len(messages)) > max_prompt_size and len(messages) > 1:
         messages.pop()
-        tokens = sum([len(encoder.encode(message.content)) for message in messages if type(message.content) == str])
+        tokens -= message_tokens.pop()
 
     # Truncate current message if still over max supported prompt size by model
     if (tokens + system_message_tokens) > max_prompt_size:
@@ -643,11 +785,7 @@ def load_complex_json(json_str):
 
 def defilter_query(query: str):
     """Remove any query filters in query"""
-    defiltered_query = query
-    filters: List[BaseFilter] = [WordFilter(), FileFilter(), DateFilter()]
-    for filter in filters:
-        defiltered_query = filter.defilter(defiltered_query)
-    return defiltered_query
+    return parse_query_filters(query).defiltered_query
 
 
 @dataclass
@@ -1,5 +1,5 @@
 import logging
-from typing import List
+from typing import List, Tuple
 
 import requests
 import tqdm
@@ -13,7 +13,10 @@ from tenacity import (
 )
 from torch import nn
 
+from khoj.utils.batching import MicroBatcher
+from khoj.utils.cache import create_embeddings_cache
 from khoj.utils.helpers import fix_json_dict, get_device, merge_dicts, timer
+from khoj.utils.http_clients import get_sync_http_session
 from khoj.utils.rawconfig import SearchResponse
 
 logger = logging.getLogger(__name__)
@@ -37,16 +40,50 @@ class EmbeddingsModel:
         self.model_name = model_name
         self.inference_endpoint = embeddings_inference_endpoint
         self.api_key = embeddings_inference_endpoint_api_key
+        self.query_cache = create_embeddings_cache()
+        self.query_batcher = MicroBatcher(f"{self.model_name} embeddings", self.embed_queries)
         with timer(f"Loaded embedding model {self.model_name}", logger):
             self.embeddings_model = SentenceTransformer(self.model_name, **self.model_kwargs)
 
     def inference_server_enabled(self) -> bool:
         return self.api_key is not None and self.inference_endpoint is not None
 
+    def embeddings_dimensions(self) -> int:
+        return self.embeddings_model.get_sentence_embedding_dimension()
+
     def embed_query(self, query):
-        if self.inference_server_enabled():
-            return self.embed_with_api([query])[0]
-        return self.embeddings_model.encode([query], **self.query_encode_kwargs)[0]
+        return self.embed_queries([query])[0]
+
+    def embed_queries(self, queries: List[str]):
+        "Embed multiple queries in a single batch. Only embed queries not in the query embeddings cache"
+        if not queries:
+            return []
+        cache_keys = [self.query_cache.cache_key(self.model_name, query, self.query_encode_kwargs) for query in queries]
+        embeddings = [self.query_cache.get(cache_key) for cache_key in cache_keys]
+
+        # Embed each uncached query once, even if it is repeated in the batch
+        uncached = {
+            cache_key: query
+            for cache_key, query, embedding in zip(cache_keys, queries, embeddings)
+            if embedding is None
+        }
+        if uncached:
+            if self.inference_server_enabled():
+                new_embeddings = self.embed_with_api(list(uncached.values()))
+            else:
+                new_embeddings = self.embeddings_model.encode(list(uncached.values()), **self.query_encode_kwargs)
+            new_embeddings_by_key = dict(zip(uncached.keys(), new_embeddings))
+            for cache_key, embedding in new_embeddings_by_key.items():
+                self.query_cache.set(cache_key, embedding)
+            embeddings = [
+                new_embeddings_by_key[cache_key] if embedding is None else embedding
+                for cache_key, embedding in zip(cache_keys, embeddings)
+            ]
+        return embeddings
+
+    async def aembed_queries(self, queries: List[str]):
+        "Embed queries in batches with queries of concurrent requests, without blocking the event loop"
+        return await self.query_batcher.asubmit_many(queries)
 
     @retry(
         retry=retry_if_exception_type(requests.exceptions.HTTPError),
@@ -61,7 +98,7 @@ class EmbeddingsModel:
             "Content-Type": "application/json",
         }
         try:
-            response = requests.post(self.inference_endpoint, json=payload, headers=headers)
+            response = get_sync_http_session().post(self.inference_endpoint, json=payload, headers=headers)
             response.raise_for_status()
         except requests.exceptions.HTTPError as e:
             logger.error(
@@ -102,6 +139,7 @@ class CrossEncoderModel:
         self.inference_endpoint = cross_encoder_inference_endpoint
         self.api_key = cross_encoder_inference_endpoint_api_key
         self.model_kwargs = merge_dicts(model_kwargs, {"device": get_device()})
+        self.predict_batcher = MicroBatcher(f"{self.model_name} cross-encoder", self.predict_requests)
         with timer(f"Loaded cross-encoder model {self.model_name}", logger):
             self.cross_encoder_model = CrossEncoder(model_name=self.model_name, **self.model_kwargs)
 
@@ -113,10 +151,47 @@ class CrossEncoderModel:
             target_url = f"{self.inference_endpoint}"
             payload = {"inputs": {"query": query, "passages": [hit.additional[key] for hit in hits]}}
             headers = {"Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json"}
-            response = requests.post(target_url, json=payload, headers=headers)
+            response = get_sync_http_session().post(target_url, json=payload, headers=headers)
             response.raise_for_status()
             return response.json()["scores"]
 
         cross_inp = [[query, hit.additional[key]] for hit in hits]
         cross_scores = self.cross_encoder_model.predict(cross_inp, activation_fct=nn.Sigmoid())
         return cross_scores
+
+    def predict_batch(self, queries: List[str], hits_by_query: List[List[SearchResponse]], key: str = "compiled"):
+        "Score hits of each query against that query in a single batch"
+        if self.inference_server_enabled() and "huggingface" in self.inference_endpoint:
+            # Inference endpoint scores passages against a single query per request
+            return [self.predict(query, hits, key) for query, hits in zip(queries, hits_by_query)]
+
+        cross_inp = [[query, hit.additional[key]] for query, hits in zip(queries, hits_by_query) for hit in hits]
+        if not cross_inp:
+            return [[] for _ in queries]
+        cross_scores = self.cross_encoder_model.predict(cross_inp, activation_fct=nn.Sigmoid())
+
+        # Split flattened scores back by query
+        scores_by_query, start = [], 0
+        for hits in hits_by_query:
+            scores_by_query.append(cross_scores[start : start + len(hits)])
+            start += len(hits)
+        return scores_by_query
+
+    def predict_requests(self, requests: List[Tuple[str, List[SearchResponse], str]]):
+        "Score hits of each (query, hits, key) request. Requests with the same key are scored in a single batch"
+        scores: List = [None] * len(requests)
+        for key in {key for _, _, key in requests}:
+            indices = [idx for idx, request in enumerate(requests) if request[2] == key]
+            queries = [requests[idx][0] for idx in indices]
+            hits_by_query = [requests[idx][1] for idx in indices]
+            for idx, query_scores in zip(indices, self.predict_batch(queries, hits_by_query, key)):
+                scores[idx] = query_scores
+        return scores
+
+    async def apredict_batch(
+        self, queries: List[str], hits_by_query: List[List[SearchResponse]], key: str = "compiled"
+    ):
+        "Score hits of each query in batches with hits of concurrent requests, without blocking the event loop"
+        return await self.predict_batcher.asubmit_many(
+            [(query, hits, key) for query, hits in zip(queries, hits_by_query)]
+        )
@@ -13,6 +13,7 @@ from khoj.routers.helpers import ChatEvent, generate_better_image_prompt
 from khoj.routers.storage import upload_image
 from khoj.utils import state
 from khoj.utils.helpers import convert_image_to_webp, timer
+from khoj.utils.http_clients import get_sync_http_session
 from khoj.utils.rawconfig import LocationData
 
 logger = logging.getLogger(__name__)
@@ -152,7 +153,7 @@ def generate_image_with_stability(
     "Generate image using Stability AI"
 
     # Call Stability AI API to generate image
-    response = requests.post(
+    response = get_sync_http_session().post(
         f"https://api.stability.ai/v2beta/stable-image/generate/sd3",
         headers={"authorization": f"Bearer {text_to_image_config.api_key}", "accept": "image/*"},
         files={"none": ""},
@@ -188,18 +189,18 @@ def generate_image_with_replicate(
             "output_quality": 100,
         }
     }
-    create_prediction = requests.post(replicate_create_prediction_url, headers=headers, json=json).json()
+    create_prediction = get_sync_http_session().post(replicate_create_prediction_url, headers=headers, json=json).json()
 
     # Get status of image generation task
     get_prediction_url = create_prediction["urls"]["get"]
-    get_prediction = requests.get(get_prediction_url, headers=headers).json()
+    get_prediction = get_sync_http_session().get(get_prediction_url, headers=headers).json()
     status = get_prediction["status"]
     retry_count = 1
 
     # Poll the image generation task for completion status
     while status not in ["succeeded", "failed", "canceled"] and retry_count < 20:
         time.sleep(2)
-        get_prediction = requests.get(get_prediction_url, headers=headers).json()
+        get_prediction = get_sync_http_session().get(get_prediction_url, headers=headers).json()
         status = get_prediction["status"]
         retry_count += 1
 
@@ -212,4 +213,4 @@ def generate_image_with_replicate(
 
     # Get the generated image
     image_url = get_prediction["output"][0] if isinstance(get_prediction["output"], list) else get_prediction["output"]
-    return io.BytesIO(requests.get(image_url).content).getvalue()
+    return io.BytesIO(get_sync_http_session().get(image_url).content).getvalue()
@@ -2,11 +2,11 @@ import asyncio
 import json
 import logging
 import os
+import time
 import urllib.parse
 from collections import defaultdict
 from typing import Any, Callable, Dict, List, Optional, Set, Tuple, Union
 
-import aiohttp
 from bs4 import BeautifulSoup
 from markdownify import markdownify
 
@@ -19,6 +19,8 @@ from khoj.routers.helpers import (
     generate_online_subqueries,
     infer_webpage_urls,
 )
+from khoj.utils import state
+from khoj.utils.cache import WebPage
 from khoj.utils.helpers import (
     is_env_var_true,
     is_internal_url,
@@ -26,6 +28,7 @@ from khoj.utils.helpers import (
     is_none_or_empty,
     timer,
 )
+from khoj.utils.http_clients import get_http_session
 from khoj.utils.rawconfig import LocationData
 
 logger = logging.getLogger(__name__)
@@ -56,6 +59,12 @@ OLOSTEP_QUERY_PARAMS = {
 DEFAULT_MAX_WEBPAGES_TO_READ = 1
 MAX_WEBPAGES_TO_INFER = 10
 
+WEBSCRAPERS_CACHE_TTL = float(os.getenv("KHOJ_WEBSCRAPERS_CACHE_TTL", "60"))  # seconds
+enabled_webscrapers: Tuple[float, List[WebScraper]] = (0, [])
+
+# Reads of web pages in progress, to share them between concurrent requests for the same page
+webpage_reads: Dict[str, asyncio.Future] = dict()
+
 
 async def search_online(
     query: str,
@@ -153,20 +162,18 @@ async def search_with_google(query: str, location: LocationData) -> Tuple[str, D
     payload = json.dumps({"q": query, "gl": country_code})
     headers = {"X-API-KEY": SERPER_DEV_API_KEY, "Content-Type": "application/json"}
 
-    async with aiohttp.ClientSession() as session:
-        async with session.post(SERPER_DEV_URL, headers=headers, data=payload) as response:
-            if response.status != 200:
-                logger.error(await response.text())
-                return query, {}
-            json_response = await response.json()
-            extraction_fields = ["organic", "answerBox", "peopleAlsoAsk", "knowledgeGraph"]
-            extracted_search_result = {
-                field: json_response[field]
-                for field in extraction_fields
-                if not is_none_or_empty(json_response.get(field))
-            }
+    session = get_http_session()
+    async with session.post(SERPER_DEV_URL, headers=headers, data=payload) as response:
+        if response.status != 200:
+            logger.error(await response.text())
+            return query, {}
+        json_response = await response.json()
+        extraction_fields = ["organic", "answerBox", "peopleAlsoAsk", "knowledgeGraph"]
+        extracted_search_result = {
+            field: json_response[field] for field in extraction_fields if not is_none_or_empty(json_response.get(field))
+        }
 
-            return query, extracted_search_result
+        return query, extracted_search_result
 
 
 async def read_webpages(
@@ -217,14 +224,51 @@ async def read_webpage(
 ) -> Tuple[str | None, str | None]:
     if scraper_type == WebScraper.WebScraperType.FIRECRAWL and FIRECRAWL_USE_LLM_EXTRACT:
         return None, await query_webpage_with_firecrawl(url, subqueries, api_key, api_url, agent)
-    elif scraper_type == WebScraper.WebScraperType.FIRECRAWL:
-        return await read_webpage_with_firecrawl(url, api_key, api_url), None
+
+    # Use cached web page content while fresh
+    cache_key = state.webpage_cache.cache_key(scraper_type or WebScraper.WebScraperType.DIRECT, url)
+    cached_page = state.webpage_cache.get(cache_key)
+    if cached_page and state.webpage_cache.is_fresh(cached_page):
+        return cached_page.content, None
+
+    # Share read of web page with concurrent requests for it
+    async def read_and_cache_webpage() -> WebPage:
+        page = await fetch_webpage(url, scraper_type, api_key, api_url, cached_page)
+        if not is_none_or_empty(page.content):
+            state.webpage_cache.set(cache_key, page)
+        return page
+
+    read_task = webpage_reads.get(cache_key)
+    if read_task is None or read_task.get_loop() is not asyncio.get_running_loop():
+        read_task = asyncio.ensure_future(read_and_cache_webpage())
+        webpage_reads[cache_key] = read_task
+        read_task.add_done_callback(
+            lambda task: webpage_reads.pop(cache_key) if webpage_reads.get(cache_key) is task else None
+        )
+    page = await asyncio.shield(read_task)
+    return page.content, None
+
+
+async def fetch_webpage(url, scraper_type=None, api_key=None, api_url=None, cached_page: WebPage = None) -> WebPage:
+    if scraper_type == WebScraper.WebScraperType.FIRECRAWL:
+        content = await read_webpage_with_firecrawl(url, api_key, api_url)
     elif scraper_type == WebScraper.WebScraperType.OLOSTEP:
-        return await read_webpage_with_olostep(url, api_key, api_url), None
+        content = await read_webpage_with_olostep(url, api_key, api_url)
     elif scraper_type == WebScraper.WebScraperType.JINA:
-        return await read_webpage_with_jina(url, api_key, api_url), None
+        content = await read_webpage_with_jina(url, api_key, api_url)
     else:
-        return await read_webpage_at_url(url), None
+        return await fetch_webpage_at_url(url, cached_page)
+    return WebPage(content, fetched_at=time.time())
+
+
+async def get_enabled_webscrapers() -> List[WebScraper]:
+    "Get enabled web scrapers. Cache them in memory to not query the database for each web page read"
+    global enabled_webscrapers
+    cached_at, web_scrapers = enabled_webscrapers
+    if time.time() - cached_at > WEBSCRAPERS_CACHE_TTL:
+        web_scrapers = await ConversationAdapters.aget_enabled_webscrapers()
+        enabled_webscrapers = (time.time(), web_scrapers)
+    return web_scrapers
 
 
 async def read_webpage_and_extract_content(
@@ -236,7 +280,7 @@ async def read_webpage_and_extract_content(
     tracer: dict = {},
 ) -> Tuple[set[str], str, Union[None, str]]:
     # Select the web scrapers to use for reading the web page
-    web_scrapers = await ConversationAdapters.aget_enabled_webscrapers()
+    web_scrapers = await get_enabled_webscrapers()
     # Only use the direct web scraper for internal URLs
     if is_internal_url(url):
         web_scrapers = [scraper for scraper in web_scrapers if scraper.type == WebScraper.WebScraperType.DIRECT]
@@ -272,17 +316,33 @@ async def read_webpage_and_extract_content(
 
 
 async def read_webpage_at_url(web_url: str) -> str:
+    return (await fetch_webpage_at_url(web_url)).content
+
+
+async def fetch_webpage_at_url(web_url: str, cached_page: WebPage = None) -> WebPage:
+    "Read web page at url. Revalidate cached page, if any, with a conditional request"
     headers = {
         "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_5) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/83.0.4103.97 Safari/537.36",
     }
-
-    async with aiohttp.ClientSession() as session:
-        async with session.get(web_url, headers=headers, timeout=30) as response:
-            response.raise_for_status()
-            html = await response.text()
-            parsed_html = BeautifulSoup(html, "html.parser")
-            body = parsed_html.body.get_text(separator="\n", strip=True)
-            return markdownify(body)
+    if cached_page and cached_page.etag:
+        headers["If-None-Match"] = cached_page.etag
+    if cached_page and cached_page.last_modified:
+        headers["If-Modified-Since"] = cached_page.last_modified
+
+    session = get_http_session()
+    async with session.get(web_url, headers=headers, timeout=30) as response:
+        if response.status == 304 and cached_page:
+            return cached_page._replace(fetched_at=time.time())
+        response.raise_for_status()
+        html = await response.text()
+        parsed_html = BeautifulSoup(html, "html.parser")
+        body = parsed_html.body.get_text(separator="\n", strip=True)
+        return WebPage(
+            markdownify(body),
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified"),
+            fetched_at=time.time(),
+        )
 
 
 async def read_webpage_with_olostep(web_url: str, api_key: str, api_url: str) -> str:
@@ -290,11 +350,11 @@ async def read_webpage_with_olostep(web_url: str, api_key: str, api_url: str) ->
     web_scraping_params: Dict[str, Union[str, int, bool]] = OLOSTEP_QUERY_PARAMS.copy()  # type: ignore
     web_scraping_params["url"] = web_url
 
-    async with aiohttp.ClientSession() as session:
-        async with session.get(api_url, params=web_scraping_params, headers=headers) as response:
-            response.raise_for_status()
-            response_json = await response.json()
-            return response_json["markdown_content"]
+    session = get_http_session()
+    async with session.get(api_url, params=web_scraping_params, headers=headers) as response:
+        response.raise_for_status()
+        response_json = await response.json()
+        return response_json["markdown_content"]
 
 
 async def read_webpage_with_jina(web_url: str, api_key: str, api_url: str) -> str:
@@ -303,11 +363,11 @@ async def read_webpage_with_jina(web_url: str, api_key: str, api_url: str) -> st
     if api_key:
         headers["Authorization"] = f"Bearer {api_key}"
 
-    async with aiohttp.ClientSession() as session:
-        async with session.get(jina_reader_api_url, headers=headers) as response:
-            response.raise_for_status()
-            response_json = await response.json()
-            return response_json["data"]["content"]
+    session = get_http_session()
+    async with session.get(jina_reader_api_url, headers=headers) as response:
+        response.raise_for_status()
+        response_json = await response.json()
+        return response_json["data"]["content"]
 
 
 async def read_webpage_with_firecrawl(web_url: str, api_key: str, api_url: str) -> str:
@@ -315,11 +375,11 @@ async def read_webpage_with_firecrawl(web_url: str, api_key: str, api_url: str)
     headers = {"Content-Type": "application/json", "Authorization": f"Bearer {api_key}"}
     params = {"url": web_url, "formats": ["markdown"], "excludeTags": ["script", ".ad"]}
 
-    async with aiohttp.ClientSession() as session:
-        async with session.post(firecrawl_api_url, json=params, headers=headers) as response:
-            response.raise_for_status()
-            response_json = await response.json()
-            return response_json["data"]["markdown"]
+    session = get_http_session()
+    async with session.post(firecrawl_api_url, json=params, headers=headers) as response:
+        response.raise_for_status()
+        response_json = await response.json()
+        return response_json["data"]["markdown"]
 
 
 async def query_webpage_with_firecrawl(
@@ -351,11 +411,11 @@ Collate only relevant information from the website to answer the target query an
 
     params = {"url": web_url, "formats": ["extract"], "extract": {"systemPrompt": system_prompt, "schema": schema}}
 
-    async with aiohttp.ClientSession() as session:
-        async with session.post(firecrawl_api_url, json=params, headers=headers) as response:
-            response.raise_for_status()
-            response_json = await response.json()
-            return response_json["data"]["extract"]["relevant_extract"]
+    session = get_http_session()
+    async with session.post(firecrawl_api_url, json=params, headers=headers) as response:
+        response.raise_for_status()
+        response_json = await response.json()
+        return response_json["data"]["extract"]["relevant_extract"]
 
 
 async def search_with_jina(query: str, location: LocationData) -> Tuple[str, Dict[str, List[Dict]]]:
@@ -382,25 +442,25 @@ async def search_with_jina(query: str, location: LocationData) -> Tuple[str, Dic
     if api_key:
         headers["Authorization"] = f"Bearer {api_key}"
 
-    async with aiohttp.ClientSession() as session:
-        async with session.get(jina_search_api_url, headers=headers) as response:
-            if response.status != 200:
-                error_text = await response.text()
-                logger.error(f"Jina search failed: {error_text}")
-                return query, {}
-            response_json = await response.json()
-            parsed_response = [
-                {
-                    "title": item["title"],
-                    "content": item.get("content"),
-                    # rename description -> snippet for consistency
-                    "snippet": item["description"],
-                    # rename url -> link for consistency
-                    "link": item["url"],
-                }
-                for item in response_json["data"]
-            ]
-            return query, {"organic": parsed_response}
+    session = get_http_session()
+    async with session.get(jina_search_api_url, headers=headers) as response:
+        if response.status != 200:
+            error_text = await response.text()
+            logger.error(f"Jina search failed: {error_text}")
+            return query, {}
+        response_json = await response.json()
+        parsed_response = [
+            {
+                "title": item["title"],
+                "content": item.get("content"),
+                # rename description -> snippet for consistency
+                "snippet": item["description"],
+                # rename url -> link for consistency
+                "link": item["url"],
+            }
+            for item in response_json["data"]
+        ]
+        return query, {"organic": parsed_response}
 
 
 def deduplicate_organic_results(online_results: dict) -> dict:
@@ -6,8 +6,6 @@ import os
 from pathlib import Path
 from typing import Any, Callable, List, NamedTuple, Optional
 
-import aiohttp
-
 from khoj.database.adapters import FileObjectAdapters
 from khoj.database.models import Agent, FileObject, KhojUser
 from khoj.processor.conversation import prompts
@@ -19,6 +17,7 @@ from khoj.processor.conversation.utils import (
 )
 from khoj.routers.helpers import send_message_to_model_wrapper
 from khoj.utils.helpers import is_none_or_empty, timer, truncate_code_context
+from khoj.utils.http_clients import get_http_session
 from khoj.utils.rawconfig import LocationData
 
 logger = logging.getLogger(__name__)
@@ -156,24 +155,24 @@ async def execute_sandboxed_python(code: str, input_data: list[dict], sandbox_ur
     cleaned_code = clean_code_python(code)
     data = {"code": cleaned_code, "files": input_data}
 
-    async with aiohttp.ClientSession() as session:
-        async with session.post(sandbox_url, json=data, headers=headers) as response:
-            if response.status == 200:
-                result: dict[str, Any] = await response.json()
-                result["code"] = cleaned_code
-                # Store decoded output files
-                result["output_files"] = result.get("output_files", [])
-                for output_file in result["output_files"]:
-                    # Decode text files as UTF-8
-                    if mimetypes.guess_type(output_file["filename"])[0].startswith("text/") or Path(
-                        output_file["filename"]
-                    ).suffix in [".org", ".md", ".json"]:
-                        output_file["b64_data"] = base64.b64decode(output_file["b64_data"]).decode("utf-8")
-                return result
-            else:
-                return {
-                    "code": cleaned_code,
-                    "success": False,
-                    "std_err": f"Failed to execute code with {response.status}",
-                    "output_files": [],
-                }
+    session = get_http_session()
+    async with session.post(sandbox_url, json=data, headers=headers) as response:
+        if response.status == 200:
+            result: dict[str, Any] = await response.json()
+            result["code"] = cleaned_code
+            # Store decoded output files
+            result["output_files"] = result.get("output_files", [])
+            for output_file in result["output_files"]:
+                # Decode text files as UTF-8
+                if mimetypes.guess_type(output_file["filename"])[0].startswith("text/") or Path(
+                    output_file["filename"]
+                ).suffix in [".org", ".md", ".json"]:
+                    output_file["b64_data"] = base64.b64decode(output_file["b64_data"]).decode("utf-8")
+            return result
+        else:
+            return {
+                "code": cleaned_code,
+                "success": False,
+                "std_err": f"Failed to execute code with {response.status}",
+                "output_files": [],
+            }
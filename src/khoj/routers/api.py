@@ -1,4 +1,3 @@
-import concurrent.futures
 import json
 import logging
 import math
@@ -6,7 +5,7 @@ import os
 import threading
 import time
 import uuid
-from typing import Any, Callable, List, Optional, Set, Union
+from typing import Any, Callable, Dict, List, Optional, Set, Union
 
 import cron_descriptor
 import pytz
@@ -25,7 +24,7 @@ from khoj.database.adapters import (
     AutomationAdapters,
     ConversationAdapters,
     EntryAdapters,
-    get_default_search_model,
+    aget_default_search_model,
     get_user_photo,
 )
 from khoj.database.models import (
@@ -54,9 +53,7 @@ from khoj.routers.helpers import (
     schedule_automation,
     update_telemetry_state,
 )
-from khoj.search_filter.date_filter import DateFilter
-from khoj.search_filter.file_filter import FileFilter
-from khoj.search_filter.word_filter import WordFilter
+from khoj.search_filter.query_parser import parse_query_filters
 from khoj.search_type import text_search
 from khoj.utils import state
 from khoj.utils.config import OfflineChatProcessorModel
@@ -83,6 +80,7 @@ async def search(
     r: Optional[bool] = False,
     max_distance: Optional[Union[float, None]] = None,
     dedupe: Optional[bool] = True,
+    hybrid: Optional[bool] = None,
 ):
     user = request.user.object
 
@@ -94,6 +92,7 @@ async def search(
         r=r,
         max_distance=max_distance or math.inf,
         dedupe=dedupe,
+        hybrid=hybrid,
     )
 
     update_telemetry_state(
@@ -115,9 +114,45 @@ async def execute_search(
     max_distance: Optional[Union[float, None]] = None,
     dedupe: Optional[bool] = True,
     agent: Optional[Agent] = None,
+    hybrid: Optional[bool] = None,
 ):
+    if q is None or q == "":
+        logger.warning(f"No query param (q) passed in API call to initiate search")
+        return []
+
+    results = await execute_search_batch(
+        user=user,
+        queries=[q],
+        n=n,
+        t=t,
+        r=r,
+        max_distance=max_distance,
+        dedupe=dedupe,
+        agent=agent,
+        hybrid=hybrid,
+    )
+    return results[0]
+
+
+async def execute_search_batch(
+    user: KhojUser,
+    queries: List[str],
+    n: Optional[int] = 5,
+    t: Optional[SearchType] = SearchType.All,
+    r: Optional[bool] = False,
+    max_distance: Optional[Union[float, None]] = None,
+    dedupe: Optional[bool] = True,
+    agent: Optional[Agent] = None,
+    hybrid: Optional[bool] = None,
+) -> List[List[SearchResponse]]:
+    """Search for results of each query in one batch.
+
+    Encode all queries in one batch, search the database for all queries in one round trip
+    and rerank all retrieved results in one cross-encoder pass.
+    Set hybrid to override the retrieval mode of the search model for this search.
+    """
     # Run validation checks
-    results: List[SearchResponse] = []
+    results: List[List[SearchResponse]] = [[] for _ in queries]
 
     start_time = time.time()
 
@@ -126,74 +161,81 @@ async def execute_search(
         logger.error(f"Agent {agent.slug} is not accessible by user {user}")
         return results
 
-    if q is None or q == "":
-        logger.warning(f"No query param (q) passed in API call to initiate search")
-        return results
-
     # initialize variables
-    user_query = q.strip()
+    user_queries = [q.strip() for q in queries]
     results_count = n or 5
-    search_futures: List[concurrent.futures.Future] = []
 
     # return cached results, if available
-    if user:
-        query_cache_key = f"{user_query}-{n}-{t}-{r}-{max_distance}-{dedupe}"
-        if query_cache_key in state.query_cache[user.uuid]:
+    # Cached results with agent are invalidated when agent knowledge base changes
+    agent_cache_key = f"{agent.slug}-{state.query_cache.get_version(f'agent:{agent.slug}')}" if agent else None
+    query_cache_keys = [
+        f"{user_query}-{n}-{t}-{r}-{max_distance}-{dedupe}-{hybrid}-{agent_cache_key}" for user_query in user_queries
+    ]
+    uncached_indices = []
+    for idx, (user_query, query_cache_key) in enumerate(zip(user_queries, query_cache_keys)):
+        if is_none_or_empty(user_query):
+            continue
+        cached_results = state.query_cache.get(str(user.uuid), query_cache_key) if user else None
+        if cached_results is not None:
             logger.debug(f"Return response from query cache")
-            return state.query_cache[user.uuid][query_cache_key]
-
-    # Encode query with filter terms removed
-    defiltered_query = user_query
-    for filter in [DateFilter(), WordFilter(), FileFilter()]:
-        defiltered_query = filter.defilter(defiltered_query)
-
-    encoded_asymmetric_query = None
-    if t != SearchType.Image:
-        with timer("Encoding query took", logger=logger):
-            search_model = await sync_to_async(get_default_search_model)()
-            encoded_asymmetric_query = state.embeddings_model[search_model.name].embed_query(defiltered_query)
-
-    with concurrent.futures.ThreadPoolExecutor() as executor:
-        if t in [
-            SearchType.All,
-            SearchType.Org,
-            SearchType.Markdown,
-            SearchType.Github,
-            SearchType.Notion,
-            SearchType.Plaintext,
-            SearchType.Pdf,
-        ]:
-            # query markdown notes
-            search_futures += [
-                executor.submit(
-                    text_search.query,
-                    user_query,
-                    user,
-                    t,
-                    question_embedding=encoded_asymmetric_query,
-                    max_distance=max_distance,
-                    agent=agent,
-                )
-            ]
-
-        # Query across each requested content types in parallel
-        with timer("Query took", logger):
-            for search_future in concurrent.futures.as_completed(search_futures):
-                hits = await search_future.result()
-                # Collate results
-                results += text_search.collate_results(hits, dedupe=dedupe)
-
-                # Sort results across all content types and take top results
-                results = text_search.rerank_and_sort_results(
-                    results, query=defiltered_query, rank_results=r, search_model_name=search_model.name
-                )[:results_count]
-
-    # Cache results
-    if user:
-        state.query_cache[user.uuid][query_cache_key] = results
+            results[idx] = cached_results
+        else:
+            uncached_indices.append(idx)
+
+    if not uncached_indices or t not in [
+        SearchType.All,
+        SearchType.Org,
+        SearchType.Markdown,
+        SearchType.Github,
+        SearchType.Notion,
+        SearchType.Plaintext,
+        SearchType.Pdf,
+    ]:
+        return results
+
+    # Encode queries with filter terms removed
+    raw_queries = [user_queries[idx] for idx in uncached_indices]
+    defiltered_queries = [parse_query_filters(user_query).defiltered_query for user_query in raw_queries]
+
+    latencies: Dict[str, float] = {}
+    search_model = await aget_default_search_model()
+    stage_start_time = time.perf_counter()
+    encoded_asymmetric_queries = await state.embeddings_model[search_model.name].aembed_queries(defiltered_queries)
+    latencies["encode"] = time.perf_counter() - stage_start_time
+
+    # Query all requested content types for all queries in a single round trip
+    hits_by_query = await text_search.query_batch(
+        raw_queries,
+        user,
+        t,
+        question_embeddings=encoded_asymmetric_queries,
+        max_distance=max_distance,
+        agent=agent,
+        latencies=latencies,
+        hybrid=hybrid,
+    )
+
+    # Collate results
+    collated_results = [list(text_search.collate_results(hits, dedupe=dedupe)) for hits in hits_by_query]
+
+    # Sort results and take top results
+    stage_start_time = time.perf_counter()
+    ranked_results = await text_search.rerank_and_sort_results_batch(
+        collated_results, queries=defiltered_queries, rank_results=r, search_model_name=search_model.name
+    )
+    latencies["rerank"] = time.perf_counter() - stage_start_time
+
+    for idx, query_results in zip(uncached_indices, ranked_results):
+        results[idx] = query_results[:results_count]
+        # Cache results
+        if user:
+            state.query_cache.set(str(user.uuid), query_cache_keys[idx], results[idx])
 
     end_time = time.time()
-    logger.debug(f"🔍 Search took: {end_time - start_time:.3f} seconds")
+    stage_latencies = ", ".join(f"{stage}: {latency:.3f}" for stage, latency in latencies.items())
+    logger.debug(
+        f"🔍 Search for {len(queries)} queries took: {end_time - start_time:.3f} seconds. Stages: {stage_latencies}"
+    )
 
     return results
 
@@ -490,20 +532,19 @@ async def extract_references_and_questions(
             inferred_queries_str = "\n- " + "\n- ".join(inferred_queries)
             async for event in send_status_func(f"**Searching Documents for:** {inferred_queries_str}"):
                 yield {ChatEvent.STATUS: event}
-        for query in inferred_queries:
-            n_items = min(n, 3) if using_offline_chat else n
-            search_results.extend(
-                await execute_search(
-                    user if not should_limit_to_agent_knowledge else None,
-                    f"{query} {filters_in_query}",
-                    n=n_items,
-                    t=SearchType.All,
-                    r=True,
-                    max_distance=d,
-                    dedupe=False,
-                    agent=agent,
-                )
-            )
+        n_items = min(n, 3) if using_offline_chat else n
+        search_results_by_query = await execute_search_batch(
+            user if not should_limit_to_agent_knowledge else None,
+            [f"{query} {filters_in_query}" for query in inferred_queries],
+            n=n_items,
+            t=SearchType.All,
+            r=True,
+            max_distance=d,
+            dedupe=False,
+            agent=agent,
+        )
+        for query_search_results in search_results_by_query:
+            search_results.extend(query_search_results)
         search_results = text_search.deduplicated_search_responses(search_results)
         compiled_references = [
             {"query": q, "compiled": item.additional["compiled"], "file": item.additional["file"]}
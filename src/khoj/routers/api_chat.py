@@ -6,7 +6,7 @@ import time
 import uuid
 from datetime import datetime
 from functools import partial
-from typing import Any, Dict, List, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional
 from urllib.parse import unquote
 
 from asgiref.sync import sync_to_async
@@ -203,6 +203,9 @@ def chat_history(
     common: CommonQueryParams,
     conversation_id: Optional[str] = None,
     n: Optional[int] = None,
+    before_turn_id: Optional[str] = None,
+    limit: Optional[int] = None,
+    include_context: bool = False,
 ):
     user = request.user.object
     validate_conversation_config(user)
@@ -232,7 +235,14 @@ def chat_history(
                 "persona": conversation.agent.personality,
             }
 
-    meta_log = conversation.conversation_log
+    # Only load requested window of messages, without their context by default, when paginating
+    if before_turn_id or limit:
+        chat, has_more = ConversationAdapters.get_conversation_messages(
+            conversation, before_turn_id=before_turn_id, limit=limit or 50, include_context=include_context
+        )
+        meta_log = {"chat": chat, "has_more": has_more}
+    else:
+        meta_log = conversation.conversation_log
     meta_log.update(
         {
             "conversation_id": conversation.id,
@@ -241,7 +251,7 @@ def chat_history(
         }
     )
 
-    if n:
+    if n and not (before_turn_id or limit):
         # Get latest N messages if N > 0
         if n > 0 and meta_log.get("chat"):
             meta_log["chat"] = meta_log["chat"][-n:]
@@ -259,6 +269,36 @@ def chat_history(
     return {"status": "ok", "response": meta_log}
 
 
+@api_chat.get("/history/context")
+@requires(["authenticated"])
+def chat_history_context(
+    request: Request,
+    common: CommonQueryParams,
+    conversation_id: str,
+    turn_id: str,
+):
+    "Get context of messages in a conversation turn. Chat history windows omit message context by default"
+    user = request.user.object
+
+    conversation = ConversationAdapters.get_conversation_by_user(
+        user=user, client_application=request.user.client_app, conversation_id=conversation_id
+    )
+    if conversation is None:
+        return Response(
+            content=json.dumps({"status": "error", "message": f"Conversation: {conversation_id} not found"}),
+            status_code=404,
+        )
+
+    update_telemetry_state(
+        request=request,
+        telemetry_type="api",
+        api="chat_history_context",
+        **common.__dict__,
+    )
+
+    return {"status": "ok", "response": ConversationAdapters.get_conversation_turn_context(conversation, turn_id)}
+
+
 @api_chat.get("/share/history")
 def get_shared_chat(
     request: Request,
@@ -1230,18 +1270,14 @@ async def chat(
             yield result
 
         continue_stream = True
-        iterator = AsyncIteratorWrapper(llm_response)
+        # Online chat models stream their response on the event loop. Offline chat models stream it from a thread
+        if isinstance(llm_response, AsyncIterator):
+            iterator = llm_response
+        else:
+            iterator = AsyncIteratorWrapper(llm_response)
         async for item in iterator:
             if item is None:
-                async for result in send_event(ChatEvent.END_LLM_RESPONSE, ""):
-                    yield result
-                # Send Usage Metadata once llm interactions are complete
-                async for event in send_event(ChatEvent.USAGE, tracer.get("usage")):
-                    yield event
-                async for result in send_event(ChatEvent.END_RESPONSE, ""):
-                    yield result
-                logger.debug("Finished streaming response")
-                return
+                break
             if not connection_alive or not continue_stream:
                 continue
             try:
@@ -1251,6 +1287,15 @@ async def chat(
                 continue_stream = False
                 logger.info(f"User {user} disconnected. Emitting rest of responses to clear thread: {e}")
 
+        async for result in send_event(ChatEvent.END_LLM_RESPONSE, ""):
+            yield result
+        # Send Usage Metadata once llm interactions are complete
+        async for event in send_event(ChatEvent.USAGE, tracer.get("usage")):
+            yield event
+        async for result in send_event(ChatEvent.END_RESPONSE, ""):
+            yield result
+        logger.debug("Finished streaming response")
+
     ## Stream Text Response
     if stream:
         return StreamingResponse(event_generator(q, images=raw_images), media_type="text/plain")
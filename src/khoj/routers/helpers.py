@@ -15,6 +15,8 @@ from typing import (
     Annotated,
     Any,
     AsyncGenerator,
+    AsyncIterator,
+    Awaitable,
     Callable,
     Dict,
     Iterator,
@@ -46,6 +48,7 @@ from khoj.database.adapters import (
     ConversationAdapters,
     EntryAdapters,
     FileObjectAdapters,
+    aget_default_search_model,
     ais_user_subscribed,
     create_khoj_token,
     get_khoj_tokens,
@@ -107,7 +110,6 @@ from khoj.search_type import text_search
 from khoj.utils import state
 from khoj.utils.config import OfflineChatProcessorModel
 from khoj.utils.helpers import (
-    LRU,
     ConversationCommand,
     get_file_type,
     is_none_or_empty,
@@ -598,19 +600,22 @@ async def extract_relevant_info(
         prompts.personality_context.format(personality=agent.personality) if agent and agent.personality else ""
     )
 
-    extract_relevant_information = prompts.extract_relevant_information.format(
-        query=", ".join(qs),
-        corpus=corpus.strip(),
-        personality_context=personality_context,
-    )
+    async def extract() -> str:
+        extract_relevant_information = prompts.extract_relevant_information.format(
+            query=", ".join(sorted(qs)),
+            corpus=corpus.strip(),
+            personality_context=personality_context,
+        )
 
-    response = await send_message_to_model_wrapper(
-        extract_relevant_information,
-        prompts.system_prompt_extract_relevant_information,
-        user=user,
-        tracer=tracer,
-    )
-    return response.strip()
+        response = await send_message_to_model_wrapper(
+            extract_relevant_information,
+            prompts.system_prompt_extract_relevant_information,
+            user=user,
+            tracer=tracer,
+        )
+        return response.strip()
+
+    return await extract_with_cache(qs, extract, [corpus.strip(), personality_context], user=user)
 
 
 async def extract_relevant_summary(
@@ -635,22 +640,59 @@ async def extract_relevant_summary(
 
     chat_history = construct_chat_history(conversation_history)
 
-    extract_relevant_information = prompts.extract_relevant_summary.format(
-        query=q,
-        chat_history=chat_history,
-        corpus=corpus.strip(),
-        personality_context=personality_context,
-    )
-
-    with timer("Chat actor: Extract relevant information from data", logger):
-        response = await send_message_to_model_wrapper(
-            extract_relevant_information,
-            prompts.system_prompt_extract_relevant_summary,
-            user=user,
-            query_images=query_images,
-            tracer=tracer,
+    async def extract() -> str:
+        extract_relevant_information = prompts.extract_relevant_summary.format(
+            query=q,
+            chat_history=chat_history,
+            corpus=corpus.strip(),
+            personality_context=personality_context,
         )
-    return response.strip()
+
+        with timer("Chat actor: Extract relevant information from data", logger):
+            response = await send_message_to_model_wrapper(
+                extract_relevant_information,
+                prompts.system_prompt_extract_relevant_summary,
+                user=user,
+                query_images=query_images,
+                tracer=tracer,
+            )
+        return response.strip()
+
+    context = [corpus.strip(), chat_history, personality_context, query_images]
+    return await extract_with_cache(q, extract, context, user=user)
+
+
+async def extract_with_cache(
+    queries: str | Set[str],
+    extract: Callable[[], Awaitable[str]],
+    context: List[Any],
+    user: KhojUser = None,
+) -> str:
+    """
+    Reuse information previously extracted by the chat model for the same, or a similar, query from the same context
+    """
+    conversation_config = await ConversationAdapters.aget_default_conversation_config(user)
+    cache = state.extractions_cache
+    context_key = cache.context_key(conversation_config.chat_model if conversation_config else None, *context)
+    extraction = cache.get(context_key, queries)
+    if extraction is not None:
+        return extraction
+
+    # Reuse extraction for a similar query, if enabled
+    query_embedding = None
+    if cache.similarity_threshold is not None and state.embeddings_model:
+        search_model = await aget_default_search_model()
+        if search_model.name in state.embeddings_model:
+            normalized_queries = cache.normalize_queries(queries)
+            embeddings_model = state.embeddings_model[search_model.name]
+            query_embedding = (await embeddings_model.aembed_queries([normalized_queries]))[0]
+            extraction = cache.get_similar(context_key, query_embedding)
+            if extraction is not None:
+                return extraction
+
+    extraction = await extract()
+    cache.set(context_key, queries, extraction, query_embedding)
+    return extraction
 
 
 async def generate_summary_from_files(
@@ -1194,7 +1236,7 @@ def generate_chat_response(
     program_execution_context: List[str] = [],
     generated_asset_results: Dict[str, Dict] = {},
     tracer: dict = {},
-) -> Tuple[Union[ThreadedGenerator, Iterator[str]], Dict[str, str]]:
+) -> Tuple[Union[ThreadedGenerator, Iterator[str], AsyncIterator[str]], Dict[str, str]]:
     # Initialize Variables
     chat_response = None
     logger.debug(f"Conversation Types: {conversation_commands}")
@@ -1202,6 +1244,7 @@ def generate_chat_response(
     metadata = {}
     agent = AgentAdapters.get_conversation_agent_by_id(conversation.agent.id) if conversation.agent else None
     try:
+        conversation_config = ConversationAdapters.get_valid_conversation_config(user, conversation)
         partial_completion = partial(
             save_to_conversation_log,
             q,
@@ -1220,6 +1263,7 @@ def generate_chat_response(
             raw_generated_files=raw_generated_files,
             generated_excalidraw_diagram=generated_excalidraw_diagram,
             tracer=tracer,
+            chat_model=conversation_config,
         )
 
         query_to_run = q
@@ -1229,7 +1273,6 @@ def generate_chat_response(
             online_results = {}
             code_results = {}
 
-        conversation_config = ConversationAdapters.get_valid_conversation_config(user, conversation)
         vision_available = conversation_config.vision_enabled
         if not vision_available and query_images:
             vision_enabled_config = ConversationAdapters.get_vision_enabled_config()
@@ -2164,7 +2207,7 @@ def configure_content(
 
     # Invalidate Query Cache
     if user:
-        state.query_cache[user.uuid] = LRU()
+        state.query_cache.invalidate(str(user.uuid))
 
     return success
 
@@ -1,6 +1,8 @@
+import asyncio
 import logging
+import os
 from datetime import datetime
-from typing import Callable, Dict, List, Optional
+from typing import AsyncGenerator, Callable, Dict, List, Optional
 
 import yaml
 from fastapi import Request
@@ -33,6 +35,17 @@ from khoj.utils.rawconfig import LocationData
 
 logger = logging.getLogger(__name__)
 
+# Set KHOJ_RESEARCH_MAX_PARALLEL_TOOLS above 1 to let the planner call multiple independent tools per iteration
+MAX_PARALLEL_TOOLS = int(os.getenv("KHOJ_RESEARCH_MAX_PARALLEL_TOOLS", "1"))
+TOOL_TIMEOUT = float(os.getenv("KHOJ_RESEARCH_TOOL_TIMEOUT", "300"))  # seconds
+RESEARCH_TOOLS = [
+    ConversationCommand.Notes,
+    ConversationCommand.Online,
+    ConversationCommand.Webpage,
+    ConversationCommand.Code,
+    ConversationCommand.Summarize,
+]
+
 
 async def apick_next_tool(
     query: str,
@@ -47,8 +60,12 @@ async def apick_next_tool(
     send_status_func: Optional[Callable] = None,
     tracer: dict = {},
     query_files: str = None,
+    max_parallel_tools: int = 1,
 ):
-    """Given a query, determine which of the available tools the agent should use in order to answer appropriately."""
+    """Given a query, determine which of the available tools the agent should use in order to answer appropriately.
+
+    Yields an iteration per tool call. Up to max_parallel_tools independent tool calls may be picked at once.
+    """
 
     # Construct tool options for the agent to choose from
     tool_options = dict()
@@ -72,8 +89,17 @@ async def apick_next_tool(
         prompts.personality_context.format(personality=agent.personality) if agent and agent.personality else ""
     )
 
+    if max_parallel_tools > 1:
+        tool_calls_per_iteration = f"upto {max_parallel_tools} independent tool AI calls at a time"
+        response_instructions = prompts.plan_function_execution_next_tools.format(max_parallel_tools=max_parallel_tools)
+    else:
+        tool_calls_per_iteration = "one tool AI at a time"
+        response_instructions = prompts.plan_function_execution_next_tool
+
     function_planning_prompt = prompts.plan_function_execution.format(
         tools=tool_options_str,
+        tool_calls_per_iteration=tool_calls_per_iteration,
+        response_instructions=response_instructions,
         chat_history=chat_history,
         personality_context=personality_context,
         current_date=today.strftime("%Y-%m-%d"),
@@ -106,29 +132,34 @@ async def apick_next_tool(
 
     try:
         response = load_complex_json(response)
-        selected_tool = response.get("tool", None)
-        generated_query = response.get("query", None)
+        tool_calls = response.get("tool_calls")
+        if tool_calls is None:
+            tool_calls = [{"tool": response.get("tool", None), "query": response.get("query", None)}]
+        tool_calls = tool_calls[:max_parallel_tools] or [{"tool": None, "query": None}]
         scratchpad = response.get("scratchpad", None)
-        warning = None
         logger.info(f"Response for determining relevant tools: {response}")
 
         # Detect selection of previously used query, tool combination.
         previous_tool_query_combinations = {(i.tool, i.query) for i in previous_iterations if i.warning is None}
-        if (selected_tool, generated_query) in previous_tool_query_combinations:
-            warning = f"Repeated tool, query combination detected. Skipping iteration. Try something different."
+        iterations = []
+        for tool_call in tool_calls:
+            selected_tool = tool_call.get("tool", None)
+            generated_query = tool_call.get("query", None)
+            warning = None
+            if (selected_tool, generated_query) in previous_tool_query_combinations:
+                warning = f"Repeated tool, query combination detected. Skipping iteration. Try something different."
+            previous_tool_query_combinations.add((selected_tool, generated_query))
+            iterations.append(
+                InformationCollectionIteration(tool=selected_tool, query=generated_query, warning=warning)
+            )
+
         # Only send client status updates if we'll execute this iteration
-        elif send_status_func:
-            determined_tool_message = "**Determined Tool**: "
-            determined_tool_message += f"{selected_tool}({generated_query})." if selected_tool else "respond."
-            determined_tool_message += f"\nReason: {scratchpad}" if scratchpad else ""
+        if send_status_func and any(iteration.warning is None for iteration in iterations):
             async for event in send_status_func(f"{scratchpad}"):
                 yield {ChatEvent.STATUS: event}
 
-        yield InformationCollectionIteration(
-            tool=selected_tool,
-            query=generated_query,
-            warning=warning,
-        )
+        for iteration in iterations:
+            yield iteration
     except Exception as e:
         logger.error(f"Invalid response for determining relevant tools: {response}. {e}", exc_info=True)
         yield InformationCollectionIteration(
@@ -138,6 +169,74 @@ async def apick_next_tool(
         )
 
 
+async def run_tools_in_parallel(
+    iterations: List[InformationCollectionIteration],
+    run_tool: Callable[[InformationCollectionIteration], AsyncGenerator],
+    timeout: float = TOOL_TIMEOUT,
+):
+    """Run tool of each iteration concurrently. Yield their status events as they are sent.
+
+    Tools that do not finish within timeout seconds are cancelled and a warning is set on their iteration.
+    All running tools are cancelled if the caller stops iterating over the status events.
+    """
+    events: asyncio.Queue = asyncio.Queue()
+    done = object()
+
+    async def run(iteration: InformationCollectionIteration):
+        async def consume_events():
+            async for event in run_tool(iteration):
+                await events.put(event)
+
+        try:
+            await asyncio.wait_for(consume_events(), timeout)
+        except asyncio.TimeoutError:
+            iteration.warning = f"Timed out running {iteration.tool} tool after {timeout} seconds."
+            logger.warning(f"Research mode: {iteration.warning}")
+        except Exception as e:
+            iteration.warning = f"Error running {iteration.tool} tool: {e}"
+            logger.error(iteration.warning, exc_info=True)
+        finally:
+            events.put_nowait(done)
+
+    tasks = [asyncio.create_task(run(iteration)) for iteration in iterations]
+    try:
+        pending = len(tasks)
+        while pending:
+            event = await events.get()
+            if event is done:
+                pending -= 1
+            else:
+                yield event
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+def format_iteration_results(
+    iteration_index: int,
+    iteration: InformationCollectionIteration,
+    document_results: List[Dict[str, str]] = None,
+    online_results: Dict = None,
+    code_results: Dict = None,
+    summarize_files: str = None,
+) -> str:
+    results_data = (
+        f"\n<iteration>{iteration_index}\n<tool>{iteration.tool}</tool>\n<query>{iteration.query}</query>\n<results>"
+    )
+    if document_results:
+        results_data += f"\n<document_references>\n{yaml.dump(document_results, allow_unicode=True, sort_keys=False, default_flow_style=False)}\n</document_references>"
+    if online_results:
+        results_data += f"\n<online_results>\n{yaml.dump(online_results, allow_unicode=True, sort_keys=False, default_flow_style=False)}\n</online_results>"
+    if code_results:
+        results_data += f"\n<code_results>\n{yaml.dump(truncate_code_context(code_results), allow_unicode=True, sort_keys=False, default_flow_style=False)}\n</code_results>"
+    if summarize_files:
+        results_data += f"\n<summarized_files>\n{yaml.dump(summarize_files, allow_unicode=True, sort_keys=False, default_flow_style=False)}\n</summarized_files>"
+    if iteration.warning:
+        results_data += f"\n<warning>\n{iteration.warning}\n</warning>"
+    results_data += "\n</results>\n</iteration>"
+    return results_data
+
+
 async def execute_information_collection(
     request: Request,
     user: KhojUser,
@@ -156,39 +255,16 @@ async def execute_information_collection(
     current_iteration = 0
     MAX_ITERATIONS = 5
     previous_iterations: List[InformationCollectionIteration] = []
-    while current_iteration < MAX_ITERATIONS:
+
+    async def run_tool(this_iteration: InformationCollectionIteration):
+        "Run tool of iteration. Yield its status events and store its results in the iteration"
         online_results: Dict = dict()
         code_results: Dict = dict()
         document_results: List[Dict[str, str]] = []
         summarize_files: str = ""
-        this_iteration = InformationCollectionIteration(tool=None, query=query)
 
-        async for result in apick_next_tool(
-            query,
-            conversation_history,
-            user,
-            query_images,
-            location,
-            user_name,
-            agent,
-            previous_iterations,
-            MAX_ITERATIONS,
-            send_status_func,
-            tracer=tracer,
-            query_files=query_files,
-        ):
-            if isinstance(result, dict) and ChatEvent.STATUS in result:
-                yield result[ChatEvent.STATUS]
-            elif isinstance(result, InformationCollectionIteration):
-                this_iteration = result
-
-        # Skip running iteration if warning present in iteration
-        if this_iteration.warning:
-            logger.warning(f"Research mode: {this_iteration.warning}.")
-
-        elif this_iteration.tool == ConversationCommand.Notes:
+        if this_iteration.tool == ConversationCommand.Notes:
             this_iteration.context = []
-            document_results = []
             previous_inferred_queries = {
                 c["query"] for iteration in previous_iterations if iteration.context for c in iteration.context
             }
@@ -337,28 +413,55 @@ async def execute_information_collection(
                 this_iteration.warning = f"Error summarizing files: {e}"
                 logger.error(this_iteration.warning, exc_info=True)
 
-        else:
+        if document_results or online_results or code_results or summarize_files or this_iteration.warning:
+            # intermediate_result = await extract_relevant_info(this_iteration.query, results_data, agent)
+            this_iteration.summarizedResult = format_iteration_results(
+                current_iteration, this_iteration, document_results, online_results, code_results, summarize_files
+            )
+
+    while current_iteration < MAX_ITERATIONS:
+        this_iterations: List[InformationCollectionIteration] = []
+
+        async for result in apick_next_tool(
+            query,
+            conversation_history,
+            user,
+            query_images,
+            location,
+            user_name,
+            agent,
+            previous_iterations,
+            MAX_ITERATIONS,
+            send_status_func,
+            tracer=tracer,
+            query_files=query_files,
+            max_parallel_tools=MAX_PARALLEL_TOOLS,
+        ):
+            if isinstance(result, dict) and ChatEvent.STATUS in result:
+                yield result[ChatEvent.STATUS]
+            elif isinstance(result, InformationCollectionIteration):
+                this_iterations.append(result)
+        this_iterations = this_iterations or [InformationCollectionIteration(tool=None, query=query)]
+
+        # Skip running iterations with warnings, like repeated tool calls
+        for this_iteration in this_iterations:
+            if this_iteration.warning:
+                logger.warning(f"Research mode: {this_iteration.warning}.")
+        tool_iterations = [i for i in this_iterations if not i.warning and i.tool in RESEARCH_TOOLS]
+
+        if not tool_iterations and not any(i.warning for i in this_iterations):
             # No valid tools. This is our exit condition.
             current_iteration = MAX_ITERATIONS
 
         current_iteration += 1
 
-        if document_results or online_results or code_results or summarize_files or this_iteration.warning:
-            results_data = f"\n<iteration>{current_iteration}\n<tool>{this_iteration.tool}</tool>\n<query>{this_iteration.query}</query>\n<results>"
-            if document_results:
-                results_data += f"\n<document_references>\n{yaml.dump(document_results, allow_unicode=True, sort_keys=False, default_flow_style=False)}\n</document_references>"
-            if online_results:
-                results_data += f"\n<online_results>\n{yaml.dump(online_results, allow_unicode=True, sort_keys=False, default_flow_style=False)}\n</online_results>"
-            if code_results:
-                results_data += f"\n<code_results>\n{yaml.dump(truncate_code_context(code_results), allow_unicode=True, sort_keys=False, default_flow_style=False)}\n</code_results>"
-            if summarize_files:
-                results_data += f"\n<summarized_files>\n{yaml.dump(summarize_files, allow_unicode=True, sort_keys=False, default_flow_style=False)}\n</summarized_files>"
-            if this_iteration.warning:
-                results_data += f"\n<warning>\n{this_iteration.warning}\n</warning>"
-            results_data += "\n</results>\n</iteration>"
-
-            # intermediate_result = await extract_relevant_info(this_iteration.query, results_data, agent)
-            this_iteration.summarizedResult = results_data
+        # Run the independent tool calls of this iteration concurrently
+        async for event in run_tools_in_parallel(tool_iterations, run_tool):
+            yield event
 
-        previous_iterations.append(this_iteration)
-        yield this_iteration
+        # Collect results of iteration in the order of its tool calls
+        for this_iteration in this_iterations:
+            if this_iteration.warning and not this_iteration.summarizedResult:
+                this_iteration.summarizedResult = format_iteration_results(current_iteration, this_iteration)
+            previous_iterations.append(this_iteration)
+            yield this_iteration
@@ -10,7 +10,7 @@ import dateparser as dtparse
 from dateutil.relativedelta import relativedelta
 
 from khoj.search_filter.base_filter import BaseFilter
-from khoj.utils.helpers import LRU, merge_dicts, timer
+from khoj.utils.helpers import merge_dicts, timer
 
 logger = logging.getLogger(__name__)
 
@@ -26,7 +26,6 @@ class DateFilter(BaseFilter):
     def __init__(self, entry_key="compiled"):
         self.entry_key = entry_key
         self.date_to_entry_ids = defaultdict(set)
-        self.cache = LRU()
         self.dtparser_regexes = self.compile_date_regexes()
         self.dtparser_ordinal_suffixes = re.compile(r"(st|nd|rd|th)")
         self.dtparser_settings = {
@@ -126,8 +125,9 @@ class DateFilter(BaseFilter):
         # e.g. today maps to (start_of_day, start_of_tomorrow)
         date_ranges_from_filter = []
         for cmp, date_str in date_range_matches:
-            if self.parse(date_str):
-                dt_start, dt_end = self.parse(date_str)
+            parsed_date_range = self.parse(date_str)
+            if parsed_date_range:
+                dt_start, dt_end = parsed_date_range
                 date_ranges_from_filter += [[cmp, (dt_start.timestamp(), dt_end.timestamp())]]
 
         # Combine dates with their comparators to form date range intervals
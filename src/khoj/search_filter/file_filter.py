@@ -4,7 +4,6 @@ from collections import defaultdict
 from typing import List
 
 from khoj.search_filter.base_filter import BaseFilter
-from khoj.utils.helpers import LRU
 
 logger = logging.getLogger(__name__)
 
@@ -16,7 +15,6 @@ class FileFilter(BaseFilter):
     def __init__(self, entry_key="file"):
         self.entry_key = entry_key
         self.file_to_entry_map = defaultdict(set)
-        self.cache = LRU()
 
     def get_filter_terms(self, query: str) -> List[str]:
         "Get all filter terms in query"
@@ -28,5 +26,14 @@ class FileFilter(BaseFilter):
         "Convert file filter to regex"
         return file_filter.replace(".", r"\.").replace("*", r".*")
 
+    def is_glob(self, file_filter: str) -> bool:
+        "Check if file filter has wildcards"
+        return "*" in file_filter or "?" in file_filter
+
+    def convert_to_like_pattern(self, file_filter: str) -> str:
+        "Convert file filter to SQL LIKE pattern matching the end of file paths"
+        pattern = file_filter.replace("\\", "\\\\").replace("%", r"\%").replace("_", r"\_")
+        return "%" + pattern.replace("*", "%").replace("?", "_")
+
     def defilter(self, query: str) -> str:
         return re.sub(self.file_filter_regex, "", query).strip()
@@ -0,0 +1,60 @@
+import logging
+from datetime import date
+from functools import lru_cache
+from typing import NamedTuple, Optional, Tuple
+
+from khoj.search_filter.date_filter import DateFilter
+from khoj.search_filter.file_filter import FileFilter
+from khoj.search_filter.word_filter import WordFilter
+
+logger = logging.getLogger(__name__)
+
+# Filters shared by all queries. Their regexes are compiled once per process
+word_filter = WordFilter()
+file_filter = FileFilter()
+date_filter = DateFilter()
+
+
+class QueryFilters(NamedTuple):
+    "Filters in a query and the query text without them"
+
+    # Required (+) and blocked (-) word filter terms
+    words: Tuple[str, ...]
+    # Included and excluded (-) file filter terms
+    files: Tuple[str, ...]
+    # Date filter terms and the timestamp range they resolve to. Range is empty if query has no valid date filters
+    dates: Tuple[str, ...]
+    date_range: Tuple[Optional[float], ...]
+    # Query with filters removed, to encode and rank by
+    defiltered_query: str
+
+    @property
+    def terms(self) -> Tuple[str, ...]:
+        "All filter terms in query"
+        return self.words + self.files + self.dates
+
+    def has_filters(self) -> bool:
+        return len(self.words) > 0 or len(self.files) > 0 or len(self.date_range) > 0
+
+
+def parse_query_filters(query: str) -> QueryFilters:
+    """Parse filters in query once for encoding and searching the query.
+
+    Parsed filters are cached by query and day, as relative dates in date filters, like "last week", change daily.
+    """
+    return _parse_query_filters(query, date.today())
+
+
+@lru_cache(maxsize=1024)
+def _parse_query_filters(query: str, day: date) -> QueryFilters:
+    defiltered_query = query
+    for search_filter in [word_filter, file_filter, date_filter]:
+        defiltered_query = search_filter.defilter(defiltered_query)
+
+    return QueryFilters(
+        words=tuple(word_filter.get_filter_terms(query)),
+        files=tuple(file_filter.get_filter_terms(query)),
+        dates=tuple(date_filter.get_filter_terms(query)),
+        date_range=tuple(date_filter.get_query_date_range(query)),
+        defiltered_query=defiltered_query,
+    )
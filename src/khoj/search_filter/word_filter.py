@@ -4,7 +4,6 @@ from collections import defaultdict
 from typing import List
 
 from khoj.search_filter.base_filter import BaseFilter
-from khoj.utils.helpers import LRU
 
 logger = logging.getLogger(__name__)
 
@@ -17,7 +16,6 @@ class WordFilter(BaseFilter):
     def __init__(self, entry_key="raw"):
         self.entry_key = entry_key
         self.word_to_entry_index = defaultdict(set)
-        self.cache = LRU()
 
     def get_filter_terms(self, query: str) -> List[str]:
         "Get all filter terms in query"
@@ -1,17 +1,24 @@
+import asyncio
 import logging
 import math
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from pathlib import Path
-from typing import List, Optional, Tuple, Type, Union
+from typing import Callable, Dict, List, Optional, Tuple, Type, TypeVar, Union
 
 import requests
 import torch
-from asgiref.sync import sync_to_async
+from django.db import connection
+from django.db.utils import InterfaceError, OperationalError
 from sentence_transformers import util
 
-from khoj.database.adapters import EntryAdapters, get_default_search_model
+from khoj.database.adapters import EntryAdapters, aget_default_search_model
 from khoj.database.models import Agent
 from khoj.database.models import Entry as DbEntry
-from khoj.database.models import KhojUser
+from khoj.database.models import KhojUser, SearchModelConfig
 from khoj.processor.content.text_to_entries import TextToEntries
 from khoj.utils import state
 from khoj.utils.helpers import get_absolute_path, timer
@@ -22,6 +29,9 @@ from khoj.utils.state import SearchType
 
 logger = logging.getLogger(__name__)
 
+executor_lock = threading.Lock()
+T = TypeVar("T")
+
 search_type_to_embeddings_type = {
     SearchType.Org.value: DbEntry.EntryType.ORG,
     SearchType.Markdown.value: DbEntry.EntryType.MARKDOWN,
@@ -104,39 +114,93 @@ async def query(
     question_embedding: Union[torch.Tensor, None] = None,
     max_distance: float = None,
     agent: Optional[Agent] = None,
+    hybrid: Optional[bool] = None,
 ) -> Tuple[List[dict], List[Entry]]:
     "Search for entries that answer the query"
+    question_embeddings = [question_embedding] if question_embedding is not None else None
+    hits_by_query = await query_batch([raw_query], user, type, question_embeddings, max_distance, agent, hybrid=hybrid)
+    return hits_by_query[0]
+
 
+async def query_batch(
+    raw_queries: List[str],
+    user: KhojUser,
+    type: SearchType = SearchType.All,
+    question_embeddings: Optional[List[torch.Tensor]] = None,
+    max_distance: float = None,
+    agent: Optional[Agent] = None,
+    latencies: Dict[str, float] = None,
+    hybrid: Optional[bool] = None,
+) -> List[List[DbEntry]]:
+    """Search for entries that answer each query in a single database round trip.
+
+    Fuse vector search with full-text search of entries if hybrid. Defaults to retrieval mode of the search model.
+    Seconds taken by each search stage are added to latencies, if passed.
+    """
+    latencies = latencies if latencies is not None else {}
     file_type = search_type_to_embeddings_type[type.value]
 
-    query = raw_query
-    search_model = await sync_to_async(get_default_search_model)()
+    search_model = await aget_default_search_model()
     if not max_distance:
         if search_model.bi_encoder_confidence_threshold:
             max_distance = search_model.bi_encoder_confidence_threshold
         else:
             max_distance = math.inf
+    if hybrid is None:
+        hybrid = search_model.retrieval_mode == SearchModelConfig.RetrievalMode.HYBRID
 
-    # Encode the query using the bi-encoder
-    if question_embedding is None:
-        with timer("Query Encode Time", logger, state.device):
-            question_embedding = state.embeddings_model[search_model.name].embed_query(query)
+    # Encode the queries using the bi-encoder
+    if question_embeddings is None:
+        start_time = time.perf_counter()
+        question_embeddings = await state.embeddings_model[search_model.name].aembed_queries(raw_queries)
+        latencies["encode"] = time.perf_counter() - start_time
 
-    # Find relevant entries for the query
+    # Find relevant entries for the queries
     top_k = 10
-    with timer("Search Time", logger, state.device):
-        hits = EntryAdapters.search_with_embeddings(
-            raw_query=raw_query,
-            embeddings=question_embedding,
-            max_results=top_k,
-            file_type_filter=file_type,
-            max_distance=max_distance,
-            user=user,
-            agent=agent,
-        ).all()
-        hits = await sync_to_async(list)(hits)  # type: ignore[call-arg]
+    hits_by_query = await run_in_search_executor(
+        EntryAdapters.search_with_embeddings_batch,
+        raw_queries=raw_queries,
+        embeddings=question_embeddings,
+        max_results=top_k,
+        file_type_filter=file_type,
+        max_distance=max_distance,
+        user=user,
+        agent=agent,
+        search_model=search_model,
+        latencies=latencies,
+        hybrid=hybrid,
+    )
+
+    return hits_by_query
+
+
+def get_search_executor() -> ThreadPoolExecutor:
+    """Get thread pool shared by all search requests of this worker to query the database.
+
+    Set KHOJ_SEARCH_WORKERS to bound the number of concurrent database searches. Defaults to 8.
+    Each search thread reuses its own database connection.
+    """
+    with executor_lock:
+        if state.search_executor is None:
+            max_workers = int(os.getenv("KHOJ_SEARCH_WORKERS", "8"))
+            state.search_executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="search")
+    return state.search_executor
+
+
+def run_database_query(query_fn: Callable[..., T], *args, **kwargs) -> T:
+    try:
+        return query_fn(*args, **kwargs)
+    except (InterfaceError, OperationalError) as e:
+        # Reconnect and retry once if the database connection of this search thread broke, e.g on database restart
+        logger.warning(f"Retrying search with new database connection: {e}")
+        connection.close()
+        return query_fn(*args, **kwargs)
 
-    return hits
+
+async def run_in_search_executor(query_fn: Callable[..., T], *args, **kwargs) -> T:
+    "Run database query on the shared search thread pool without blocking the event loop"
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_search_executor(), partial(run_database_query, query_fn, *args, **kwargs))
 
 
 def collate_results(hits, dedupe=True):
@@ -204,6 +268,23 @@ def rerank_and_sort_results(hits, query, rank_results, search_model_name):
     return hits
 
 
+async def rerank_and_sort_results_batch(hits_by_query, queries, rank_results, search_model_name):
+    "Rerank results of each query with a single cross-encoder pass over all query, hit pairs"
+    rank_results = rank_results or state.cross_encoder_model[search_model_name].inference_server_enabled()
+    queries_to_rank = [idx for idx, hits in enumerate(hits_by_query) if rank_results and len(hits) > 1]
+
+    # Score all retrieved entries of queries to rank using the cross-encoder
+    if queries_to_rank:
+        await cross_encoder_score_batch(
+            [queries[idx] for idx in queries_to_rank],
+            [hits_by_query[idx] for idx in queries_to_rank],
+            search_model_name,
+        )
+
+    # Sort results by cross-encoder score followed by bi-encoder score
+    return [sort_results(rank_results=idx in queries_to_rank, hits=hits) for idx, hits in enumerate(hits_by_query)]
+
+
 def setup(
     text_to_entries: Type[TextToEntries],
     files: dict[str, str],
@@ -246,6 +327,27 @@ def cross_encoder_score(query: str, hits: List[SearchResponse], search_model_nam
     return hits
 
 
+async def cross_encoder_score_batch(
+    queries: List[str], hits_by_query: List[List[SearchResponse]], search_model_name: str
+) -> List[List[SearchResponse]]:
+    """Score all retrieved entries of each query using the cross-encoder"""
+    try:
+        with timer("Cross-Encoder Batch Predict Time", logger, state.device):
+            cross_scores_by_query = await state.cross_encoder_model[search_model_name].apredict_batch(
+                queries, hits_by_query
+            )
+    except requests.exceptions.HTTPError as e:
+        logger.error(f"Failed to rerank documents using the inference endpoint. Error: {e}.", exc_info=True)
+        cross_scores_by_query = [[0.0] * len(hits) for hits in hits_by_query]
+
+    # Convert cross-encoder scores to distances and pass in hits for reranking
+    for hits, cross_scores in zip(hits_by_query, cross_scores_by_query):
+        for idx in range(len(cross_scores)):
+            hits[idx]["cross_score"] = 1 - cross_scores[idx]
+
+    return hits_by_query
+
+
 def sort_results(rank_results: bool, hits: List[dict]) -> List[dict]:
     """Order results by cross-encoder score followed by bi-encoder score"""
     with timer("Rank Time", logger, state.device):
@@ -0,0 +1,112 @@
+import asyncio
+import logging
+import os
+import queue
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    """Batch concurrent requests to a model into a single model call.
+
+    Requests are collected for up to max_wait_ms or until max_batch_size requests are queued. The batch is then run
+    with batch_fn on a dedicated thread, so the event loop is never blocked by model inference, and the result for
+    each request is returned to its caller. batch_fn should take a list of requests and return their results in order.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        batch_fn: Callable[[List[Any]], List[Any]],
+        max_batch_size: int = None,
+        max_wait_ms: float = None,
+        report_interval: float = 300,
+    ):
+        self.name = name
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size or int(os.getenv("KHOJ_MODEL_BATCH_MAX_SIZE", "32"))
+        self.max_wait = (
+            max_wait_ms if max_wait_ms is not None else float(os.getenv("KHOJ_MODEL_BATCH_MAX_WAIT_MS", "5"))
+        ) / 1000
+        self.report_interval = report_interval
+        self.queue_delays: deque = deque(maxlen=10000)
+        self.batch_sizes: Counter = Counter()
+        self._queue: queue.Queue[Tuple[Any, float, Future]] = queue.Queue()
+        self._thread: threading.Thread = None
+        self._lock = threading.Lock()
+        self._last_report = time.monotonic()
+
+    def submit(self, request: Any) -> Future:
+        "Queue request to run in the next batch. Returns a future that resolves to the result of the request"
+        self._start()
+        future: Future = Future()
+        self._queue.put((request, time.monotonic(), future))
+        return future
+
+    async def asubmit(self, request: Any) -> Any:
+        return await asyncio.wrap_future(self.submit(request))
+
+    async def asubmit_many(self, requests: List[Any]) -> List[Any]:
+        return await asyncio.gather(*[self.asubmit(request) for request in requests])
+
+    def _start(self):
+        # Start batching thread lazily, on first request
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=f"{self.name} batcher", daemon=True)
+                self._thread.start()
+
+    def _next_batch(self) -> List[Tuple[Any, float, Future]]:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            # Skip requests cancelled by their caller while queued
+            batch = [item for item in batch if item[2].set_running_or_notify_cancel()]
+            if not batch:
+                continue
+
+            start_time = time.monotonic()
+            self.queue_delays.extend(start_time - enqueued_at for _, enqueued_at, _ in batch)
+            self.batch_sizes[len(batch)] += 1
+            try:
+                results = self.batch_fn([request for request, _, _ in batch])
+                for (_, _, future), result in zip(batch, results):
+                    future.set_result(result)
+            except Exception as e:
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+            if start_time - self._last_report >= self.report_interval:
+                self._last_report = start_time
+                logger.info(f"{self.name} batcher stats: {self.stats()}")
+
+    def stats(self) -> Dict[str, Any]:
+        "Queueing delay percentiles in milliseconds and histogram of batch sizes"
+        delays = sorted(self.queue_delays)
+
+        def percentile(p: float) -> float:
+            return round(delays[min(len(delays) - 1, int(p * len(delays)))] * 1000, 2) if delays else 0.0
+
+        return {
+            "queue_delay_p50_ms": percentile(0.50),
+            "queue_delay_p99_ms": percentile(0.99),
+            "batch_sizes": dict(sorted(self.batch_sizes.items())),
+        }
@@ -0,0 +1,482 @@
+import hashlib
+import json
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import unicodedata
+import urllib.parse
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from khoj.utils.helpers import resolve_absolute_path
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryCache:
+    """In-process LRU cache bounded by the total size of its values in bytes, with a time to live per item"""
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, ttl: float = 3600):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.size = 0
+        self.evictions = 0
+        self._items: OrderedDict[str, Tuple[bytes, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at < time.time():
+                self._remove(key)
+                return None
+            self._items.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes):
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._items:
+                self._remove(key)
+            self._items[key] = (value, time.time() + self.ttl)
+            self.size += len(value)
+            # Evict least recently used items until cache is within its size limit
+            while self.size > self.max_bytes:
+                self._remove(next(iter(self._items)))
+                self.evictions += 1
+
+    def _remove(self, key: str):
+        value, _ = self._items.pop(key)
+        self.size -= len(value)
+
+
+class SqliteCache:
+    """Cache shared by all workers on a host, stored in a SQLite file. Items expire after their time to live"""
+
+    def __init__(self, path: Path, ttl: float = 3600):
+        self.path = resolve_absolute_path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self._local = threading.local()
+        with self._connection() as connection:
+            connection.execute("CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB, expires_at REAL)")
+
+    def _connection(self) -> sqlite3.Connection:
+        # SQLite connections cannot be shared across threads
+        if getattr(self._local, "connection", None) is None:
+            self._local.connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            self._local.connection.execute("PRAGMA journal_mode=WAL")
+        return self._local.connection
+
+    def get(self, key: str) -> Optional[bytes]:
+        row = (
+            self._connection()
+            .execute("SELECT value FROM cache WHERE key = ? AND expires_at >= ?", (key, time.time()))
+            .fetchone()
+        )
+        return row[0] if row else None
+
+    def set(self, key: str, value: bytes, ttl: float = None):
+        self._connection().execute(
+            "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, value, time.time() + (ttl or self.ttl)),
+        )
+
+    def delete_expired(self):
+        self._connection().execute("DELETE FROM cache WHERE expires_at < ?", (time.time(),))
+
+
+class SearchResultsCache:
+    """Cache of search results per user.
+
+    Results are cached in a memory bounded in-process tier and, if configured, in a tier shared across workers.
+    Cache keys include a version per user. Re-indexing or deleting entries of a user bumps their version to
+    invalidate their cached results. Versions are stored in the shared tier, if configured, to invalidate results
+    cached by all workers. Otherwise results cached by other workers expire after their time to live.
+    """
+
+    def __init__(self, max_bytes: int, ttl: float, shared_cache: Optional[SqliteCache] = None):
+        self.memory_cache = MemoryCache(max_bytes=max_bytes, ttl=ttl)
+        self.shared_cache = shared_cache
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self._versions: Dict[str, int] = dict()
+
+    def _version_key(self, user_id: str) -> str:
+        return f"version:{user_id}"
+
+    def get_version(self, user_id: str) -> int:
+        if self.shared_cache:
+            try:
+                version = self.shared_cache.get(self._version_key(user_id))
+                return int(version) if version else 0
+            except sqlite3.Error as e:
+                logger.warning(f"Failed to read version of user from shared search cache: {e}")
+        return self._versions.get(user_id, 0)
+
+    def invalidate(self, user_id: str):
+        "Bump version of the user to invalidate their cached search results"
+        version = str(time.time_ns()).encode()
+        self._versions[user_id] = int(version)
+        if self.shared_cache:
+            try:
+                self.shared_cache.delete_expired()
+                # Versions should outlive cached results they invalidate
+                self.shared_cache.set(self._version_key(user_id), version, ttl=self.shared_cache.ttl * 2)
+            except sqlite3.Error as e:
+                logger.warning(f"Failed to invalidate shared search cache of user: {e}")
+
+    def _cache_key(self, user_id: str, key: str) -> str:
+        return f"{user_id}:{self.get_version(user_id)}:{key}"
+
+    def get(self, user_id: str, key: str) -> Optional[Any]:
+        cache_key = self._cache_key(user_id, key)
+        value = self.memory_cache.get(cache_key)
+        if value is not None:
+            self.hits += 1
+            return pickle.loads(value)
+
+        if self.shared_cache:
+            try:
+                value = self.shared_cache.get(cache_key)
+            except sqlite3.Error as e:
+                logger.warning(f"Failed to read from shared search cache: {e}")
+            if value is not None:
+                self.shared_hits += 1
+                self.memory_cache.set(cache_key, value)
+                return pickle.loads(value)
+
+        self.misses += 1
+        return None
+
+    def set(self, user_id: str, key: str, value: Any):
+        cache_key = self._cache_key(user_id, key)
+        serialized_value = pickle.dumps(value)
+        self.memory_cache.set(cache_key, serialized_value)
+        if self.shared_cache:
+            try:
+                self.shared_cache.set(cache_key, serialized_value)
+            except sqlite3.Error as e:
+                logger.warning(f"Failed to write to shared search cache: {e}")
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "evictions": self.memory_cache.evictions,
+            "size_bytes": self.memory_cache.size,
+        }
+
+
+class EmbeddingsCache:
+    """Cache of query embeddings keyed by model name, normalized query text and encode kwargs.
+
+    Embeddings are stored as compact numpy arrays in a memory bounded in-process LRU tier and, if configured,
+    in an on-disk tier of memory-mapped .npy files. The on-disk tier is shared by workers and survives restarts.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 16 * 1024 * 1024,
+        ttl: float = 86400,
+        dtype: str = "float32",
+        path: Optional[Path] = None,
+    ):
+        self.memory_cache = MemoryCache(max_bytes=max_bytes, ttl=ttl)
+        self.ttl = ttl
+        self.dtype = np.dtype(dtype)
+        self.path = resolve_absolute_path(path) if path else None
+        if self.path:
+            self.path.mkdir(parents=True, exist_ok=True)
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        "Normalize unicode and whitespace of text. Casing is kept as embedding models can be case sensitive"
+        return " ".join(unicodedata.normalize("NFC", text).split())
+
+    def cache_key(self, model_name: str, text: str, encode_kwargs: dict = {}) -> str:
+        # Progress bar does not change the embeddings
+        kwargs = {k: v for k, v in encode_kwargs.items() if k != "show_progress_bar"}
+        key = json.dumps([model_name, self.normalize(text), kwargs], sort_keys=True, default=str)
+        return hashlib.sha256(key.encode()).hexdigest()
+
+    def _disk_path(self, key: str) -> Path:
+        return self.path / key[:2] / f"{key}.npy"
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        value = self.memory_cache.get(key)
+        if value is not None:
+            self.hits += 1
+            return np.frombuffer(value, dtype=self.dtype).astype(np.float32)
+
+        if self.path:
+            disk_path = self._disk_path(key)
+            try:
+                if time.time() - disk_path.stat().st_mtime <= self.ttl:
+                    embedding = np.load(disk_path, mmap_mode="r")
+                    self.disk_hits += 1
+                    self.memory_cache.set(key, np.asarray(embedding, dtype=self.dtype).tobytes())
+                    return np.asarray(embedding, dtype=np.float32)
+            except FileNotFoundError:
+                pass
+            except (OSError, ValueError) as e:
+                logger.warning(f"Failed to read embedding from on-disk embeddings cache: {e}")
+
+        self.misses += 1
+        return None
+
+    def set(self, key: str, embedding):
+        embedding = np.asarray(embedding, dtype=self.dtype)
+        self.memory_cache.set(key, embedding.tobytes())
+        if self.path:
+            disk_path = self._disk_path(key)
+            try:
+                disk_path.parent.mkdir(exist_ok=True)
+                # Write to temporary file and rename to not expose partially written embeddings to other workers
+                temp_path = disk_path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+                with open(temp_path, "wb") as f:
+                    np.save(f, embedding)
+                os.replace(temp_path, disk_path)
+            except OSError as e:
+                logger.warning(f"Failed to write embedding to on-disk embeddings cache: {e}")
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.memory_cache.evictions,
+            "size_bytes": self.memory_cache.size,
+        }
+
+
+class WebPage(NamedTuple):
+    content: str
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    fetched_at: float = 0
+
+
+class WebPageCache:
+    """Cache of web page content read by web scrapers, keyed by scraper type and normalized URL.
+
+    Pages are stored zlib compressed in a memory bounded in-process LRU tier and are fresh for their time to live.
+    Stale pages are kept for up to stale_ttl seconds more, to revalidate them with a conditional request if their
+    server sent an ETag or Last-Modified header.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, ttl: float = 3600, stale_ttl: float = 86400):
+        self.memory_cache = MemoryCache(max_bytes=max_bytes, ttl=ttl + stale_ttl)
+        self.ttl = ttl
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def normalize_url(url: str) -> str:
+        "Normalize casing of scheme and host, default ports and empty path of url. Drop its fragment"
+        parts = urllib.parse.urlsplit(url.strip())
+        scheme = parts.scheme.lower()
+        netloc = parts.netloc.lower()
+        if (scheme, parts.port) in [("http", 80), ("https", 443)]:
+            netloc = netloc.rsplit(":", 1)[0]
+        return urllib.parse.urlunsplit((scheme, netloc, parts.path or "/", parts.query, ""))
+
+    def cache_key(self, scraper_type: str, url: str) -> str:
+        return f"{scraper_type}:{self.normalize_url(url)}"
+
+    def is_fresh(self, page: WebPage) -> bool:
+        return time.time() - page.fetched_at <= self.ttl
+
+    def get(self, key: str) -> Optional[WebPage]:
+        "Get cached page, if any. Check if it is fresh before use"
+        value = self.memory_cache.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        page = WebPage(*pickle.loads(zlib.decompress(value)))
+        if self.is_fresh(page):
+            self.hits += 1
+        else:
+            self.stale_hits += 1
+        return page
+
+    def set(self, key: str, page: WebPage):
+        self.memory_cache.set(key, zlib.compress(pickle.dumps(tuple(page))))
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "evictions": self.memory_cache.evictions,
+            "size_bytes": self.memory_cache.size,
+        }
+
+
+class ExtractionsCache:
+    """Cache of information extracted by chat models from documents, like web pages, for queries.
+
+    Extractions are keyed by a hash of their context, like the chat model and document, and by the normalized query.
+    If a similarity threshold is set, the extraction for a similar query on the same context can be reused. Queries are
+    similar if the cosine similarity of their embeddings is above the threshold.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 16 * 1024 * 1024,
+        ttl: float = 86400,
+        similarity_threshold: Optional[float] = None,
+        max_contexts: int = 1024,
+        max_queries_per_context: int = 32,
+    ):
+        self.memory_cache = MemoryCache(max_bytes=max_bytes, ttl=ttl)
+        self.similarity_threshold = similarity_threshold
+        self.max_contexts = max_contexts
+        self.max_queries_per_context = max_queries_per_context
+        self.hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+        # Normalized query and its embedding of extractions by context, to find extractions for similar queries
+        self._query_embeddings: OrderedDict[str, List[Tuple[str, np.ndarray]]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def normalize_queries(queries) -> str:
+        "Normalize unicode, casing and whitespace of queries. Ignore their order and duplicates"
+        queries = [queries] if isinstance(queries, str) else queries
+        return "\n".join(sorted({" ".join(unicodedata.normalize("NFC", q).lower().split()) for q in queries}))
+
+    @staticmethod
+    def context_key(*context: str) -> str:
+        return hashlib.sha256(json.dumps(context, default=str).encode()).hexdigest()
+
+    def get(self, context_key: str, query: str) -> Optional[str]:
+        value = self.memory_cache.get(f"{context_key}:{self.normalize_queries(query)}")
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return value.decode()
+
+    def get_similar(self, context_key: str, query_embedding) -> Optional[str]:
+        "Get extraction for the most similar query on the same context, if it is similar enough"
+        if self.similarity_threshold is None:
+            return None
+        with self._lock:
+            candidates = list(self._query_embeddings.get(context_key, []))
+        if not candidates:
+            return None
+        query_embedding = np.asarray(query_embedding, dtype=np.float32)
+        embeddings = np.stack([embedding for _, embedding in candidates])
+        similarities = (
+            embeddings @ query_embedding / (np.linalg.norm(embeddings, axis=1) * np.linalg.norm(query_embedding) + 1e-9)
+        )
+        best = int(np.argmax(similarities))
+        if similarities[best] < self.similarity_threshold:
+            return None
+        value = self.memory_cache.get(f"{context_key}:{candidates[best][0]}")
+        if value is None:
+            return None
+        self.similar_hits += 1
+        return value.decode()
+
+    def set(self, context_key: str, query: str, extraction: str, query_embedding=None):
+        if not extraction:
+            return
+        normalized_query = self.normalize_queries(query)
+        self.memory_cache.set(f"{context_key}:{normalized_query}", extraction.encode())
+        if self.similarity_threshold is None or query_embedding is None:
+            return
+        with self._lock:
+            queries = self._query_embeddings.pop(context_key, [])
+            queries = [(q, e) for q, e in queries if q != normalized_query]
+            queries.append((normalized_query, np.asarray(query_embedding, dtype=np.float32)))
+            self._query_embeddings[context_key] = queries[-self.max_queries_per_context :]
+            while len(self._query_embeddings) > self.max_contexts:
+                self._query_embeddings.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "similar_hits": self.similar_hits,
+            "misses": self.misses,
+            "evictions": self.memory_cache.evictions,
+            "size_bytes": self.memory_cache.size,
+        }
+
+
+def create_embeddings_cache() -> EmbeddingsCache:
+    """Create query embeddings cache from environment variables.
+
+    Set KHOJ_EMBEDDINGS_CACHE_PATH to a directory to share the cache across workers and restarts.
+    Set KHOJ_EMBEDDINGS_CACHE_MAX_MB, KHOJ_EMBEDDINGS_CACHE_TTL to bound its size in memory and time to live in seconds.
+    Set KHOJ_EMBEDDINGS_CACHE_DTYPE to float16 to halve the size of cached embeddings.
+    """
+    max_bytes = int(float(os.getenv("KHOJ_EMBEDDINGS_CACHE_MAX_MB", "16")) * 1024 * 1024)
+    ttl = float(os.getenv("KHOJ_EMBEDDINGS_CACHE_TTL", "86400"))
+    dtype = os.getenv("KHOJ_EMBEDDINGS_CACHE_DTYPE", "float32")
+    path = os.getenv("KHOJ_EMBEDDINGS_CACHE_PATH")
+    try:
+        return EmbeddingsCache(max_bytes=max_bytes, ttl=ttl, dtype=dtype, path=path)
+    except (OSError, TypeError) as e:
+        logger.error(f"Failed to create embeddings cache with configured options. Using defaults: {e}")
+        return EmbeddingsCache(max_bytes=max_bytes, ttl=ttl)
+
+
+def create_search_results_cache() -> SearchResultsCache:
+    """Create search results cache from environment variables.
+
+    Set KHOJ_SEARCH_CACHE_PATH to a file path to share the cache across workers.
+    Set KHOJ_SEARCH_CACHE_MAX_MB, KHOJ_SEARCH_CACHE_TTL to bound its size in memory and time to live in seconds.
+    """
+    max_bytes = int(float(os.getenv("KHOJ_SEARCH_CACHE_MAX_MB", "64")) * 1024 * 1024)
+    ttl = float(os.getenv("KHOJ_SEARCH_CACHE_TTL", "3600"))
+    shared_cache = None
+    if os.getenv("KHOJ_SEARCH_CACHE_PATH"):
+        try:
+            shared_cache = SqliteCache(os.getenv("KHOJ_SEARCH_CACHE_PATH"), ttl=ttl)
+        except sqlite3.Error as e:
+            logger.error(f"Failed to open shared search cache. Using in-process cache only: {e}")
+    return SearchResultsCache(max_bytes=max_bytes, ttl=ttl, shared_cache=shared_cache)
+
+
+def create_webpage_cache() -> WebPageCache:
+    """Create web page cache from environment variables.
+
+    Set KHOJ_WEBPAGE_CACHE_MAX_MB, KHOJ_WEBPAGE_CACHE_TTL to bound its size in memory and time to live in seconds.
+    Set KHOJ_WEBPAGE_CACHE_STALE_TTL to the seconds to keep expired pages for revalidation.
+    """
+    max_bytes = int(float(os.getenv("KHOJ_WEBPAGE_CACHE_MAX_MB", "64")) * 1024 * 1024)
+    ttl = float(os.getenv("KHOJ_WEBPAGE_CACHE_TTL", "3600"))
+    stale_ttl = float(os.getenv("KHOJ_WEBPAGE_CACHE_STALE_TTL", "86400"))
+    return WebPageCache(max_bytes=max_bytes, ttl=ttl, stale_ttl=stale_ttl)
+
+
+def create_extractions_cache() -> ExtractionsCache:
+    """Create cache of information extracted by chat models from environment variables.
+
+    Set KHOJ_EXTRACTIONS_CACHE_MAX_MB, KHOJ_EXTRACTIONS_CACHE_TTL to bound its size in memory and time to live in seconds.
+    Set KHOJ_EXTRACTIONS_CACHE_SIMILARITY to a cosine similarity, like 0.95, to reuse extractions for similar queries.
+    """
+    max_bytes = int(float(os.getenv("KHOJ_EXTRACTIONS_CACHE_MAX_MB", "16")) * 1024 * 1024)
+    ttl = float(os.getenv("KHOJ_EXTRACTIONS_CACHE_TTL", "86400"))
+    similarity = os.getenv("KHOJ_EXTRACTIONS_CACHE_SIMILARITY")
+    similarity_threshold = float(similarity) if similarity else None
+    return ExtractionsCache(max_bytes=max_bytes, ttl=ttl, similarity_threshold=similarity_threshold)
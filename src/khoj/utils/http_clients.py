@@ -0,0 +1,81 @@
+import asyncio
+import logging
+import os
+import threading
+from typing import Dict, Tuple
+
+import aiohttp
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# Application lifetime HTTP clients. Async sessions are bound to the event loop they were created on
+http_sessions: Dict[asyncio.AbstractEventLoop, aiohttp.ClientSession] = dict()
+sync_session: requests.Session = None
+session_lock = threading.Lock()
+
+
+def get_connection_limits() -> Tuple[int, int]:
+    """Get max connections in total and per host of HTTP clients.
+
+    Set KHOJ_HTTP_MAX_CONNECTIONS, KHOJ_HTTP_MAX_CONNECTIONS_PER_HOST to bound concurrent requests by tools and
+    inference calls. Requests over these limits wait for a free connection.
+    """
+    max_connections = int(os.getenv("KHOJ_HTTP_MAX_CONNECTIONS", "100"))
+    max_connections_per_host = int(os.getenv("KHOJ_HTTP_MAX_CONNECTIONS_PER_HOST", "10"))
+    return max_connections, max_connections_per_host
+
+
+def get_http_session() -> aiohttp.ClientSession:
+    """Get async HTTP session shared by all requests on the current event loop.
+
+    Connections are kept alive and pooled per host, and DNS lookups are cached, to not repeat connection setup and
+    TLS handshakes with each request. Do not close the session after use.
+    """
+    loop = asyncio.get_running_loop()
+    session = http_sessions.get(loop)
+    if session is None or session.closed:
+        # Drop sessions of closed event loops
+        for stale_loop in [stale_loop for stale_loop in http_sessions if stale_loop.is_closed()]:
+            http_sessions.pop(stale_loop)
+        max_connections, max_connections_per_host = get_connection_limits()
+        connector = aiohttp.TCPConnector(
+            limit=max_connections,
+            limit_per_host=max_connections_per_host,
+            ttl_dns_cache=300,
+            keepalive_timeout=60,
+        )
+        session = aiohttp.ClientSession(connector=connector)
+        http_sessions[loop] = session
+    return session
+
+
+def get_sync_http_session() -> requests.Session:
+    """Get HTTP session shared by all threads for synchronous requests, like calls to inference endpoints.
+
+    Connections are kept alive and pooled per host. Do not close the session after use.
+    """
+    global sync_session
+    if sync_session is None:
+        with session_lock:
+            if sync_session is None:
+                max_connections, max_connections_per_host = get_connection_limits()
+                adapter = HTTPAdapter(pool_connections=max_connections, pool_maxsize=max_connections_per_host)
+                session = requests.Session()
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                sync_session = session
+    return sync_session
+
+
+async def close_http_sessions():
+    "Close HTTP sessions on application shutdown"
+    global sync_session
+    loop = asyncio.get_running_loop()
+    session = http_sessions.pop(loop, None)
+    if session is not None and not session.closed:
+        await session.close()
+    if sync_session is not None:
+        sync_session.close()
+        sync_session = None
@@ -1,6 +1,6 @@
 import os
 import threading
-from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
 from typing import Any, Dict, List
 
@@ -11,8 +11,16 @@ from whisper import Whisper
 from khoj.database.models import ProcessLock
 from khoj.processor.embeddings import CrossEncoderModel, EmbeddingsModel
 from khoj.utils import config as utils_config
+from khoj.utils.cache import (
+    ExtractionsCache,
+    SearchResultsCache,
+    WebPageCache,
+    create_extractions_cache,
+    create_search_results_cache,
+    create_webpage_cache,
+)
 from khoj.utils.config import OfflineChatProcessorModel, SearchModels
-from khoj.utils.helpers import LRU, get_device, is_env_var_true
+from khoj.utils.helpers import get_device, is_env_var_true
 from khoj.utils.rawconfig import FullConfig
 
 # Application Global State
@@ -29,10 +37,14 @@ host: str = None
 port: int = None
 ssl_config: Dict[str, str] = None
 cli_args: List[str] = None
-query_cache: Dict[str, LRU] = defaultdict(LRU)
+query_cache: SearchResultsCache = create_search_results_cache()
+webpage_cache: WebPageCache = create_webpage_cache()
+extractions_cache: ExtractionsCache = create_extractions_cache()
 chat_lock = threading.Lock()
 SearchType = utils_config.SearchType
 scheduler: BackgroundScheduler = None
+extraction_executor: ProcessPoolExecutor = None
+search_executor: ThreadPoolExecutor = None
 schedule_leader_process_lock: ProcessLock = None
 telemetry: List[Dict[str, str]] = []
 telemetry_disabled: bool = is_env_var_true("KHOJ_TELEMETRY_DISABLE")
@@ -0,0 +1,127 @@
+"""Benchmark streaming many concurrent chat responses from a local stub of the OpenAI chat completions API.
+
+Compares streaming responses on the event loop with the previous thread per response, ThreadedGenerator approach.
+Run from the repository root: python tests/benchmarks/benchmark_chat_streaming.py [concurrent streams]
+"""
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from threading import Thread
+
+import django
+from aiohttp import web
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "khoj.app.settings")
+django.setup()
+
+import openai  # noqa: E402
+from langchain.schema import ChatMessage  # noqa: E402
+
+from khoj.processor.conversation.openai.utils import (  # noqa: E402
+    chat_completion_with_backoff,
+)
+from khoj.processor.conversation.utils import ThreadedGenerator  # noqa: E402
+from khoj.utils.helpers import AsyncIteratorWrapper  # noqa: E402
+
+CHUNKS_PER_RESPONSE = 50
+CHUNK_DELAY = 0.02
+
+
+async def stub_chat_completions(request: web.Request) -> web.StreamResponse:
+    "Stream a fake chat response in the OpenAI server sent events format"
+    response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+    await response.prepare(request)
+    for idx in range(CHUNKS_PER_RESPONSE):
+        await asyncio.sleep(CHUNK_DELAY)
+        chunk = {
+            "id": "chatcmpl-stub",
+            "object": "chat.completion.chunk",
+            "created": 0,
+            "model": "gpt-4o-mini",
+            "choices": [{"index": 0, "delta": {"content": f"word{idx} "}, "finish_reason": None}],
+        }
+        await response.write(f"data: {json.dumps(chunk)}\n\n".encode())
+    await response.write(b"data: [DONE]\n\n")
+    return response
+
+
+def threaded_llm(g: ThreadedGenerator, messages, api_base_url):
+    "Previous approach. Stream response on a thread per response with the sync client"
+    try:
+        client = openai.OpenAI(api_key="stub", base_url=api_base_url)
+        formatted_messages = [{"role": message.role, "content": message.content} for message in messages]
+        for chunk in client.chat.completions.create(messages=formatted_messages, model="gpt-4o-mini", stream=True):
+            if chunk.choices and chunk.choices[0].delta.content:
+                g.send(chunk.choices[0].delta.content)
+    finally:
+        g.close()
+
+
+async def stream_threaded(messages, api_base_url) -> float:
+    start = time.perf_counter()
+    g = ThreadedGenerator([], {})
+    Thread(target=threaded_llm, args=(g, messages, api_base_url)).start()
+    first_chunk_time = None
+    async for item in AsyncIteratorWrapper(g):
+        if item is None:
+            break
+        first_chunk_time = first_chunk_time or time.perf_counter() - start
+    return first_chunk_time
+
+
+async def stream_async(messages, api_base_url) -> float:
+    start = time.perf_counter()
+    first_chunk_time = None
+    async for _ in chat_completion_with_backoff(messages, "gpt-4o-mini", 0, "stub", api_base_url):
+        first_chunk_time = first_chunk_time or time.perf_counter() - start
+    return first_chunk_time
+
+
+async def benchmark(stream_fn, concurrent_streams: int, api_base_url: str):
+    messages = [ChatMessage(role="user", content="Hello")]
+    peak_threads = threading.active_count()
+
+    async def track_threads():
+        nonlocal peak_threads
+        while True:
+            peak_threads = max(peak_threads, threading.active_count())
+            await asyncio.sleep(0.01)
+
+    tracker = asyncio.create_task(track_threads())
+    start = time.perf_counter()
+    first_chunk_times = sorted(
+        await asyncio.gather(*[stream_fn(messages, api_base_url) for _ in range(concurrent_streams)])
+    )
+    total_time = time.perf_counter() - start
+    tracker.cancel()
+
+    p50 = first_chunk_times[len(first_chunk_times) // 2]
+    p99 = first_chunk_times[min(len(first_chunk_times) - 1, int(len(first_chunk_times) * 0.99))]
+    print(
+        f"{stream_fn.__name__}: {concurrent_streams} streams in {total_time:.2f}s. "
+        f"Time to first chunk p50: {p50 * 1000:.0f}ms, p99: {p99 * 1000:.0f}ms. Peak threads: {peak_threads}"
+    )
+
+
+async def main(concurrent_streams: int):
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", stub_chat_completions)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    api_base_url = f"http://127.0.0.1:{port}/v1"
+
+    try:
+        for stream_fn in [stream_threaded, stream_async]:
+            await benchmark(stream_fn, concurrent_streams, api_base_url)
+    finally:
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 200))
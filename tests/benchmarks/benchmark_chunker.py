@@ -0,0 +1,63 @@
+"""Benchmark chunking entries from test data with the khoj text chunker and langchain's text splitter.
+
+Run from the repository root: python tests/benchmarks/benchmark_chunker.py
+"""
+import glob
+import re
+import time
+
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+from khoj.processor.content.chunker import remove_long_words, split_text
+
+SEPARATORS = ["\n\n", "\n", "!", "?", ".", " ", "\t", ""]
+
+
+def langchain_chunk(text: str, chunk_size: int):
+    "Previous chunking of entries with a langchain text splitter per entry and regex based long word removal"
+    text_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        separators=SEPARATORS,
+        keep_separator=True,
+        length_function=lambda chunk: len(chunk.split()),
+        chunk_overlap=0,
+    )
+    chunks = []
+    for chunk in text_splitter.split_text(text):
+        splits = re.split(r"(\s+)", chunk) + [""]
+        words_with_delimiters = zip(splits[::2], splits[1::2])
+        chunks.append("".join(f"{w}{d}" for w, d in words_with_delimiters if not w.strip() or len(w.strip()) <= 500))
+    return chunks
+
+
+def khoj_chunk(text: str, chunk_size: int):
+    return [remove_long_words(chunk) for chunk in split_text(text, chunk_size)]
+
+
+def benchmark(chunk_fn, entries, chunk_size=256, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for entry in entries:
+            chunk_fn(entry, chunk_size)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+if __name__ == "__main__":
+    texts = [
+        open(file, encoding="utf-8", errors="ignore").read()
+        for file in sorted(glob.glob("tests/data/**/*.*", recursive=True))
+        if file.endswith((".markdown", ".org", ".html"))
+    ]
+    # Split test data into entries by heading, as markdown and org parsers do
+    entries = [entry for text in texts for entry in re.split(r"\n(?=#+ |\*+ )", text) if entry.strip()]
+    whole_files = ["\n\n".join(texts) * 10]
+
+    for name, corpus in [("entries", entries), ("single large file", whole_files)]:
+        langchain_time = benchmark(langchain_chunk, corpus)
+        khoj_time = benchmark(khoj_chunk, corpus)
+        print(
+            f"{name}: {len(corpus)} texts, {sum(map(len, corpus))} chars. "
+            f"langchain: {langchain_time:.3f}s, khoj: {khoj_time:.3f}s, speedup: {langchain_time / khoj_time:.1f}x"
+        )
@@ -0,0 +1,96 @@
+"""Benchmark word filtered search latency on a growing number of entries.
+
+The number of entries matching the word filter is fixed. So with the trigram index on entry text, latency should stay
+flat as entries grow. Without the index, latency grows with the number of entries scanned.
+
+Needs the khoj postgres database to be configured and migrated. Creates and deletes a benchmark user with its entries.
+Run from the repository root: python tests/benchmarks/benchmark_word_filter.py [max entries]
+"""
+import os
+import random
+import sys
+import time
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "khoj.app.settings")
+django.setup()
+
+from django.db import connection, transaction  # noqa: E402
+
+from khoj.database.adapters import EntryAdapters  # noqa: E402
+from khoj.database.models import Entry, KhojUser  # noqa: E402
+
+EMBEDDING_DIMENSIONS = 384
+WORDS_PER_ENTRY = 200
+VOCABULARY = [f"word{idx}" for idx in range(20000)]
+FILTER_WORD = "needle"
+FILTER_WORD_MATCHES = 50
+
+
+def create_entries(user: KhojUser, start: int, end: int, batch_size=5000):
+    "Create entries with random text. Only the first few entries contain the filter word"
+    for batch_start in range(start, end, batch_size):
+        entries = []
+        for idx in range(batch_start, min(end, batch_start + batch_size)):
+            words = random.choices(VOCABULARY, k=WORDS_PER_ENTRY)
+            if idx < FILTER_WORD_MATCHES:
+                words[random.randrange(WORDS_PER_ENTRY)] = FILTER_WORD.capitalize()
+            text = " ".join(words)
+            entries.append(
+                Entry(
+                    user=user,
+                    embeddings=[random.random() for _ in range(EMBEDDING_DIMENSIONS)],
+                    raw=text,
+                    compiled=text,
+                    file_path=f"notes/{idx // 100}.md",
+                    hashed_value=str(idx),
+                )
+            )
+        Entry.objects.bulk_create(entries)
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE database_entry")
+
+
+def benchmark(user: KhojUser, use_index: bool, repeat=5) -> float:
+    "Return best time in seconds to find entries matching word filter"
+    best = float("inf")
+    for _ in range(repeat):
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f"SET LOCAL enable_bitmapscan = {'on' if use_index else 'off'}")
+            start = time.perf_counter()
+            list(EntryAdapters.apply_filters(user, f'+"{FILTER_WORD}"').values_list("id", flat=True))
+            best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(max_entries: int):
+    user, _ = KhojUser.objects.get_or_create(username="benchmark-word-filter", email="benchmark@example.com")
+    Entry.objects.filter(user=user).delete()
+    entry_counts = [count for count in [50_000, 100_000, 250_000, 500_000] if count <= max_entries] or [max_entries]
+
+    try:
+        created = 0
+        latencies = []
+        for count in entry_counts:
+            create_entries(user, created, count)
+            created = count
+            with_index = benchmark(user, use_index=True)
+            without_index = benchmark(user, use_index=False)
+            latencies.append(with_index)
+            print(
+                f"{count} entries. Word filtered search with trigram index: {with_index * 1000:.1f}ms "
+                f"({with_index / latencies[0]:.1f}x of {entry_counts[0]} entries), "
+                f"without index: {without_index * 1000:.1f}ms"
+            )
+
+        print(
+            f"Entries grew {entry_counts[-1] / entry_counts[0]:.1f}x. "
+            f"Word filtered search latency with trigram index grew {latencies[-1] / latencies[0]:.1f}x"
+        )
+    finally:
+        user.delete()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500_000)
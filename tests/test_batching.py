@@ -0,0 +1,42 @@
+import asyncio
+
+import pytest
+
+from khoj.utils.batching import MicroBatcher
+
+
+# Test
+# ----------------------------------------------------------------------------------------------------
+@pytest.mark.asyncio
+async def test_micro_batcher_batches_concurrent_requests():
+    # Arrange
+    batches = []
+
+    def batch_fn(requests):
+        batches.append(requests)
+        return [request * 2 for request in requests]
+
+    batcher = MicroBatcher("test", batch_fn, max_batch_size=4, max_wait_ms=50)
+
+    # Act
+    results = await asyncio.gather(batcher.asubmit(1), batcher.asubmit_many([2, 3, 4, 5]))
+
+    # Assert
+    assert results == [2, [4, 6, 8, 10]]
+    assert sorted(len(batch) for batch in batches) == [1, 4]
+    assert batcher.stats()["batch_sizes"] == {1: 1, 4: 1}
+    assert batcher.stats()["queue_delay_p99_ms"] >= batcher.stats()["queue_delay_p50_ms"]
+
+
+# ----------------------------------------------------------------------------------------------------
+@pytest.mark.asyncio
+async def test_micro_batcher_passes_batch_errors_to_callers():
+    # Arrange
+    def batch_fn(requests):
+        raise ValueError("Failed to run batch")
+
+    batcher = MicroBatcher("test", batch_fn, max_wait_ms=1)
+
+    # Act, Assert
+    with pytest.raises(ValueError):
+        await batcher.asubmit(1)
@@ -0,0 +1,166 @@
+import time
+
+from khoj.utils.cache import (
+    EmbeddingsCache,
+    ExtractionsCache,
+    MemoryCache,
+    SearchResultsCache,
+    SqliteCache,
+    WebPage,
+    WebPageCache,
+)
+
+
+# Test
+# ----------------------------------------------------------------------------------------------------
+def test_memory_cache_evicts_least_recently_used_items_beyond_size_limit():
+    # Arrange
+    cache = MemoryCache(max_bytes=10)
+    cache.set("a", b"12345")
+    cache.set("b", b"12345")
+
+    # Act
+    cache.get("a")
+    cache.set("c", b"12345")
+
+    # Assert
+    assert cache.get("a") == b"12345"
+    assert cache.get("b") is None
+    assert cache.get("c") == b"12345"
+    assert cache.size == 10
+    assert cache.evictions == 1
+
+
+# ----------------------------------------------------------------------------------------------------
+def test_memory_cache_expires_items():
+    # Arrange
+    cache = MemoryCache(ttl=-1)
+
+    # Act
+    cache.set("a", b"12345")
+
+    # Assert
+    assert cache.get("a") is None
+    assert cache.size == 0
+
+
+# ----------------------------------------------------------------------------------------------------
+def test_search_results_cache_invalidates_results_of_user():
+    # Arrange
+    cache = SearchResultsCache(max_bytes=1024 * 1024, ttl=60)
+    cache.set("user1", "query", ["result"])
+    cache.set("user2", "query", ["result"])
+
+    # Act
+    cache.invalidate("user1")
+
+    # Assert
+    assert cache.get("user1", "query") is None
+    assert cache.get("user2", "query") == ["result"]
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+# ----------------------------------------------------------------------------------------------------
+def test_search_results_cache_shared_across_workers(tmp_path):
+    # Arrange
+    cache_path = tmp_path / "search_cache.sqlite"
+    worker1_cache = SearchResultsCache(max_bytes=1024 * 1024, ttl=60, shared_cache=SqliteCache(cache_path))
+    worker2_cache = SearchResultsCache(max_bytes=1024 * 1024, ttl=60, shared_cache=SqliteCache(cache_path))
+
+    # Act
+    worker1_cache.set("user1", "query", ["result"])
+    cached_result = worker2_cache.get("user1", "query")
+    worker1_cache.invalidate("user1")
+
+    # Assert
+    assert cached_result == ["result"]
+    assert worker2_cache.stats()["shared_hits"] == 1
+    # Invalidation by one worker invalidates results cached in memory of other workers
+    assert worker2_cache.get("user1", "query") is None
+
+
+# ----------------------------------------------------------------------------------------------------
+def test_embeddings_cache_keys_normalized_query_per_model(tmp_path):
+    # Arrange
+    cache = EmbeddingsCache(dtype="float16", path=tmp_path)
+    cache.set(cache.cache_key("model1", "Load  Khoj on Emacs? "), [0.5, 0.25])
+
+    # Act
+    cached_embedding = cache.get(cache.cache_key("model1", "Load Khoj on Emacs?"))
+    other_model_embedding = cache.get(cache.cache_key("model2", "Load Khoj on Emacs?"))
+
+    # Assert
+    assert cached_embedding.tolist() == [0.5, 0.25]
+    assert cached_embedding.dtype == "float32"
+    assert other_model_embedding is None
+
+
+# ----------------------------------------------------------------------------------------------------
+def test_embeddings_cache_shared_on_disk_across_workers(tmp_path):
+    # Arrange
+    worker1_cache = EmbeddingsCache(path=tmp_path)
+    worker2_cache = EmbeddingsCache(path=tmp_path)
+    cache_key = worker1_cache.cache_key("model", "query", {"normalize_embeddings": True})
+
+    # Act
+    worker1_cache.set(cache_key, [0.5, 0.25])
+
+    # Assert
+    assert worker2_cache.get(cache_key).tolist() == [0.5, 0.25]
+    assert worker2_cache.stats()["disk_hits"] == 1
+    # Embeddings read from disk are cached in memory
+    assert worker2_cache.get(cache_key).tolist() == [0.5, 0.25]
+    assert worker2_cache.stats()["hits"] == 1
+
+
+# ----------------------------------------------------------------------------------------------------
+def test_webpage_cache_keeps_stale_pages_for_revalidation():
+    # Arrange
+    cache = WebPageCache(ttl=60, stale_ttl=3600)
+    page = WebPage("# Khoj\n" * 100, etag='"v1"', fetched_at=time.time())
+    stale_page = WebPage("# Old Khoj", last_modified="Wed, 21 Oct 2015 07:28:00 GMT", fetched_at=time.time() - 120)
+
+    # Act
+    cache.set(cache.cache_key("direct", "HTTPS://Khoj.dev:443#about"), page)
+    cache.set(cache.cache_key("direct", "https://khoj.dev/docs"), stale_page)
+
+    # Assert
+    cached_page = cache.get(cache.cache_key("direct", "https://khoj.dev/"))
+    assert cached_page == page
+    assert cache.is_fresh(cached_page)
+    cached_stale_page = cache.get(cache.cache_key("direct", "https://khoj.dev/docs"))
+    assert cached_stale_page == stale_page
+    assert not cache.is_fresh(cached_stale_page)
+    assert cache.get(cache.cache_key("jina", "https://khoj.dev/")) is None
+    # Page content is stored compressed
+    assert cache.stats()["size_bytes"] < len(page.content)
+    assert cache.stats() | {"size_bytes": 0} == {
+        "hits": 1,
+        "stale_hits": 1,
+        "misses": 1,
+        "evictions": 0,
+        "size_bytes": 0,
+    }
+
+
+# ----------------------------------------------------------------------------------------------------
+def test_extractions_cache_reuses_extraction_for_same_or_similar_queries():
+    # Arrange
+    cache = ExtractionsCache(similarity_threshold=0.95)
+    context_key = cache.context_key("gpt-4o-mini", "Web page content")
+    cache.set(context_key, {"Who is Khoj?", "khoj  pricing"}, "Khoj is an AI copilot", query_embedding=[1.0, 0.0])
+
+    # Act
+    cached_extraction = cache.get(context_key, {"Khoj pricing", "who is khoj?"})
+    similar_extraction = cache.get_similar(context_key, [0.99, 0.05])
+    dissimilar_extraction = cache.get_similar(context_key, [0.0, 1.0])
+    other_model_extraction = cache.get(cache.context_key("gpt-4o", "Web page content"), {"Who is Khoj?"})
+
+    # Assert
+    assert cached_extraction == "Khoj is an AI copilot"
+    assert similar_extraction == "Khoj is an AI copilot"
+    assert dissimilar_extraction is None
+    assert other_model_extraction is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["similar_hits"] == 1
@@ -0,0 +1,73 @@
+import glob
+import re
+
+import pytest
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+from khoj.processor.content.chunker import remove_long_words, split_text
+
+SEPARATORS = ["\n\n", "\n", "!", "?", ".", " ", "\t", ""]
+
+
+def langchain_split_text(text: str, chunk_size: int):
+    text_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        separators=SEPARATORS,
+        keep_separator=True,
+        length_function=lambda chunk: len(chunk.split()),
+        chunk_overlap=0,
+    )
+    return text_splitter.split_text(text)
+
+
+def get_test_data_files():
+    return sorted(glob.glob("tests/data/**/*.*", recursive=True))
+
+
+# Test
+# ----------------------------------------------------------------------------------------------------
+@pytest.mark.parametrize("chunk_size", [3, 50, 256])
+def test_split_text_matches_langchain_splitter_on_test_data(chunk_size):
+    # Arrange
+    texts = [
+        open(file, encoding="utf-8", errors="ignore").read()
+        for file in get_test_data_files()
+        if file.endswith((".markdown", ".org", ".html"))
+    ]
+
+    # Act & Assert
+    for text in texts:
+        assert split_text(text, chunk_size) == langchain_split_text(text, chunk_size)
+
+
+# ----------------------------------------------------------------------------------------------------
+def test_split_text_matches_langchain_splitter_on_edge_cases():
+    # Arrange
+    texts = [
+        "",
+        "   \n\n\t ",
+        "word",
+        "A sentence. Another one! And a question?\nNew line\n\nNew paragraph",
+        "e.g. 1.2.3... trailing dots.",
+        "a" * 1000,
+        "one two three four five six seven eight nine ten " * 5,
+        "\n\n\n\nbreaks\n\n\n\n\n",
+    ]
+
+    # Act & Assert
+    for text in texts:
+        for chunk_size in [1, 2, 4]:
+            assert split_text(text, chunk_size) == langchain_split_text(text, chunk_size)
+
+
+# ----------------------------------------------------------------------------------------------------
+def test_remove_long_words_with_whitespace_after_them():
+    # Arrange
+    text = f"keep {'x' * 10}  this\n{'y' * 10}\ttext {'z' * 10}"
+
+    # Act
+    cleaned_text = remove_long_words(text, max_word_length=5)
+
+    # Assert
+    assert cleaned_text == "keep this\ntext "
+    assert re.search(r"\S{6,}", cleaned_text) is None
@@ -1,7 +1,13 @@
+import copy
+
+import pytest
 import tiktoken
 from langchain.schema import ChatMessage
 
+from khoj.database.adapters import ConversationAdapters
+from khoj.database.models import ChatModelOptions, Conversation
 from khoj.processor.conversation import utils
+from tests.helpers import ConversationFactory
 
 
 class TestTruncateMessage:
@@ -103,6 +109,179 @@ class TestTruncateMessage:
         assert len(chat_messages) == 1
         assert truncated_chat_history[0] != copy_big_chat_message
 
+    def test_truncate_long_conversation_encodes_each_message_once(self, monkeypatch):
+        # Arrange
+        encoded_messages = []
+        encoder = self.encoder
+
+        class CountingEncoder:
+            def encode(self, text):
+                encoded_messages.append(text)
+                return encoder.encode(text)
+
+        monkeypatch.setitem(utils.state.pretrained_tokenizers, "tiktoken:gpt-4o-mini", CountingEncoder())
+        monkeypatch.setattr(utils, "token_counts", utils.OrderedDict())
+        chat_history = [
+            ChatMessage(role="user", content=f"{generate_content(50)} turn {index}") for index in range(400)
+        ]
+
+        # Act
+        truncated_chat_history = utils.truncate_messages(chat_history, 1000, self.model_name)
+        tokens = sum([len(self.encoder.encode(message.content)) for message in truncated_chat_history])
+
+        # Assert
+        assert len(encoded_messages) == 400
+        assert 1 < len(truncated_chat_history) < 400
+        assert tokens + 4 * len(truncated_chat_history) <= 1000
+
+
+def test_generate_chatml_messages_reuses_cached_token_counts_of_past_messages(monkeypatch):
+    # Arrange
+    encoded_messages = []
+    encoder = tiktoken.encoding_for_model("gpt-4o-mini")
+
+    class CountingEncoder:
+        def encode(self, text):
+            encoded_messages.append(text)
+            return encoder.encode(text)
+
+    monkeypatch.setitem(utils.state.pretrained_tokenizers, "tiktoken:gpt-4o-mini", CountingEncoder())
+    chat_model = ChatModelOptions(chat_model="gpt-4o-mini", model_type=ChatModelOptions.ModelType.OPENAI)
+    conversation_log = []
+    for index in range(10):
+        references = [{"file": "notes.org", "compiled": f"Note {index}"}]
+        utils.message_to_log(
+            f"Question {index}", f"Answer {index}", {}, {"context": references}, conversation_log, chat_model
+        )
+    saved_conversation_log = copy.deepcopy(conversation_log)
+    monkeypatch.setattr(utils, "token_counts", utils.OrderedDict())
+    encoded_messages.clear()
+
+    # Act
+    messages = utils.generate_chatml_messages_with_context("Next question", conversation_log={"chat": conversation_log})
+
+    # Assert
+    assert encoded_messages == ["Next question"]
+    # Past messages are not changed when building the prompt, so they are not re-saved with every new message
+    assert conversation_log == saved_conversation_log
+    assert "tiktoken:gpt-4o-mini" in conversation_log[-1]["tokenCounts"]
+    assert "Note 9" in conversation_log[-1]["renderedContext"]
+    assert [message.content for message in messages[-3:]] == [
+        conversation_log[-1]["renderedContext"],
+        "Answer 9",
+        "Next question",
+    ]
+
+
+@pytest.mark.django_db
+def test_save_conversation_appends_new_messages(default_user):
+    # Arrange
+    references = [{"file": "notes.org", "compiled": "Note"}]
+    chat = utils.message_to_log(
+        "Question 1",
+        "Answer 1",
+        {"created": "2024-12-01 10:00:00", "turnId": "1"},
+        {"turnId": "1", "context": references},
+        [],
+    )
+    conversation = ConversationFactory(user=default_user, conversation_log={"chat": chat})
+    saved_messages = list(conversation.chat_messages.order_by("index").values_list("id", "updated_at"))
+
+    # Act
+    chat = Conversation.objects.get(id=conversation.id).conversation_log["chat"]
+    utils.message_to_log(
+        "Question 2", "Answer 2", {"created": "2024-12-01 10:01:00", "turnId": "2"}, {"turnId": "2"}, chat
+    )
+    ConversationAdapters.save_conversation(default_user, {"chat": chat}, conversation_id=str(conversation.id))
+
+    # Assert
+    conversation = Conversation.objects.get(id=conversation.id)
+    assert [message["message"] for message in conversation.conversation_log["chat"]] == [
+        "Question 1",
+        "Answer 1",
+        "Question 2",
+        "Answer 2",
+    ]
+    assert conversation.conversation_log["chat"][1]["context"] == references
+    # Previously saved messages are not rewritten
+    assert list(conversation.chat_messages.order_by("index").values_list("id", "updated_at"))[:2] == saved_messages
+
+
+@pytest.mark.django_db
+def test_get_conversation_messages_in_windows_of_whole_turns(default_user):
+    # Arrange
+    chat = []
+    for turn in range(5):
+        utils.message_to_log(
+            f"Question {turn}",
+            f"Answer {turn}",
+            {"created": "2024-12-01 10:00:00", "turnId": f"{turn}"},
+            {"turnId": f"{turn}", "context": [{"file": "notes.org", "compiled": f"Note {turn}"}]},
+            chat,
+        )
+    conversation = ConversationFactory(user=default_user, conversation_log={"chat": chat})
+
+    # Act
+    latest, latest_has_more = ConversationAdapters.get_conversation_messages(conversation, limit=3)
+    older, older_has_more = ConversationAdapters.get_conversation_messages(conversation, before_turn_id="3", limit=3)
+    oldest, oldest_has_more = ConversationAdapters.get_conversation_messages(conversation, before_turn_id="1", limit=3)
+    context = ConversationAdapters.get_conversation_turn_context(conversation, "4")
+
+    # Assert
+    assert [message["message"] for message in latest] == ["Question 3", "Answer 3", "Question 4", "Answer 4"]
+    assert [message["message"] for message in older] == ["Question 1", "Answer 1", "Question 2", "Answer 2"]
+    assert [message["message"] for message in oldest] == ["Question 0", "Answer 0"]
+    assert (latest_has_more, older_has_more, oldest_has_more) == (True, True, False)
+    assert all("context" not in message for message in latest + older + oldest)
+    assert context[1]["context"] == [{"file": "notes.org", "compiled": "Note 4"}]
+
+
+@pytest.mark.django_db
+def test_default_conversation_history_excludes_rendered_context(default_user):
+    # Arrange
+    chat_model = ChatModelOptions(chat_model="gpt-4o-mini", model_type=ChatModelOptions.ModelType.OPENAI)
+    chat = utils.message_to_log(
+        "Question 1",
+        "Answer 1",
+        {"created": "2024-12-01 10:00:00", "turnId": "1"},
+        {"turnId": "1", "context": [{"file": "notes.org", "compiled": "Note"}]},
+        [],
+        chat_model=chat_model,
+    )
+    conversation = ConversationFactory(user=default_user, conversation_log={"chat": chat})
+
+    # Act
+    messages, _ = ConversationAdapters.get_conversation_messages(conversation)
+    context = ConversationAdapters.get_conversation_turn_context(conversation, "1")
+
+    # Assert
+    assert [message["message"] for message in messages] == ["Question 1", "Answer 1"]
+    assert all("renderedContext" not in message and "tokenCounts" not in message for message in messages)
+    assert "Note" in context[1]["renderedContext"]
+    assert "tokenCounts" in context[1]
+
+
+@pytest.mark.asyncio
+async def test_stream_chat_response_saves_aggregated_response_once_streamed():
+    # Arrange
+    saved_responses = []
+
+    async def response_chunks():
+        for chunk in ["Hello", " ", "world"]:
+            yield chunk
+
+    # Act
+    streamed_chunks = [
+        chunk
+        async for chunk in utils.stream_chat_response(
+            response_chunks(), completion_func=lambda chat_response: saved_responses.append(chat_response)
+        )
+    ]
+
+    # Assert
+    assert streamed_chunks == ["Hello", " ", "world"]
+    assert saved_responses == ["Hello world"]
+
 
 def test_load_complex_raw_json_string():
     # Arrange
@@ -125,6 +125,22 @@ def test_get_multiple_include_exclude_file_filter_terms():
     assert filter_terms == ["file 1.org", "/path/to/dir/.*.org", "-file 1.org", "-/path/to/dir/*.org"]
 
 
+def test_convert_file_filters_to_like_patterns():
+    # Arrange
+    file_filter = FileFilter()
+
+    # Act
+    glob_pattern = file_filter.convert_to_like_pattern("/path/to/dir/*.org")
+    file_name_pattern = file_filter.convert_to_like_pattern("file_1?.org")
+
+    # Assert
+    assert file_filter.is_glob("/path/to/dir/*.org")
+    assert not file_filter.is_glob("file 1.org")
+    assert glob_pattern == "%/path/to/dir/%.org"
+    # LIKE wildcards in file names are escaped
+    assert file_name_pattern == r"%file\_1_.org"
+
+
 def arrange_content():
     entries = [
         Entry(compiled="", raw="First Entry", file="file 1.org"),
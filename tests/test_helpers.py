@@ -11,7 +11,7 @@ from khoj.processor.tools.online_search import (
     read_webpage_at_url,
     read_webpage_with_olostep,
 )
-from khoj.utils import helpers
+from khoj.utils import helpers, http_clients
 
 
 def test_get_from_null_dict():
@@ -102,6 +102,27 @@ async def test_reading_webpage():
     )
 
 
+@pytest.mark.asyncio
+async def test_http_session_is_reused_on_event_loop():
+    # Act
+    session = http_clients.get_http_session()
+    reused_session = http_clients.get_http_session()
+
+    # Assert
+    assert session is reused_session
+    assert not session.closed
+
+    # Act
+    await http_clients.close_http_sessions()
+
+    # Assert
+    assert session.closed
+    assert http_clients.get_http_session() is not session
+
+    # Cleanup
+    await http_clients.close_http_sessions()
+
+
 @pytest.mark.skipif(os.getenv("OLOSTEP_API_KEY") is None, reason="OLOSTEP_API_KEY is not set")
 @pytest.mark.asyncio
 async def test_reading_webpage_with_olostep():
@@ -1,3 +1,4 @@
+import asyncio
 from datetime import datetime
 
 import freezegun
@@ -163,7 +164,7 @@ def test_chat_with_no_chat_history_or_retrieved_content():
         user_query="Hello, my name is Testatron. Who are you?",
         api_key=api_key,
     )
-    response = "".join([response_chunk for response_chunk in response_gen])
+    response = collect_response(response_gen)
 
     # Assert
     expected_responses = ["Khoj", "khoj"]
@@ -189,7 +190,7 @@ def test_answer_from_chat_history_and_no_content():
         conversation_log=populate_chat_history(message_list),
         api_key=api_key,
     )
-    response = "".join([response_chunk for response_chunk in response_gen])
+    response = collect_response(response_gen)
 
     # Assert
     expected_responses = ["Testatron", "testatron"]
@@ -220,7 +221,7 @@ def test_answer_from_chat_history_and_previously_retrieved_content():
         conversation_log=populate_chat_history(message_list),
         api_key=api_key,
     )
-    response = "".join([response_chunk for response_chunk in response_gen])
+    response = collect_response(response_gen)
 
     # Assert
     assert len(response) > 0
@@ -247,7 +248,7 @@ def test_answer_from_chat_history_and_currently_retrieved_content():
         conversation_log=populate_chat_history(message_list),
         api_key=api_key,
     )
-    response = "".join([response_chunk for response_chunk in response_gen])
+    response = collect_response(response_gen)
 
     # Assert
     assert len(response) > 0
@@ -271,7 +272,7 @@ def test_refuse_answering_unanswerable_question():
         conversation_log=populate_chat_history(message_list),
         api_key=api_key,
     )
-    response = "".join([response_chunk for response_chunk in response_gen])
+    response = collect_response(response_gen)
 
     # Assert
     expected_responses = [
@@ -323,7 +324,7 @@ Expenses:Food:Dining  10.00 USD""",
         user_query="What did I have for Dinner today?",
         api_key=api_key,
     )
-    response = "".join([response_chunk for response_chunk in response_gen])
+    response = collect_response(response_gen)
 
     # Assert
     expected_responses = ["tacos", "Tacos"]
@@ -367,7 +368,7 @@ Expenses:Food:Dining  10.00 USD""",
         user_query="How much did I spend on dining this year?",
         api_key=api_key,
     )
-    response = "".join([response_chunk for response_chunk in response_gen])
+    response = collect_response(response_gen)
 
     # Assert
     assert len(response) > 0
@@ -392,7 +393,7 @@ def test_answer_general_question_not_in_chat_history_or_retrieved_content():
         conversation_log=populate_chat_history(message_list),
         api_key=api_key,
     )
-    response = "".join([response_chunk for response_chunk in response_gen])
+    response = collect_response(response_gen)
 
     # Assert
     expected_responses = ["test", "bug", "code"]
@@ -431,7 +432,7 @@ My sister, Aiyla is married to Tolga. They have 3 kids, Yildiz, Ali and Ahmet.""
         user_query="How many kids does my older sister have?",
         api_key=api_key,
     )
-    response = "".join([response_chunk for response_chunk in response_gen])
+    response = collect_response(response_gen)
 
     # Assert
     expected_responses = [
@@ -464,14 +465,14 @@ def test_agent_prompt_should_be_used(openai_agent):
         user_query="What did I buy?",
         api_key=api_key,
     )
-    no_agent_response = "".join([response_chunk for response_chunk in response_gen])
+    no_agent_response = collect_response(response_gen)
     response_gen = converse_openai(
         references=context,  # Assume context retrieved from notes for the user_query
         user_query="What did I buy?",
         api_key=api_key,
         agent=openai_agent,
     )
-    agent_response = "".join([response_chunk for response_chunk in response_gen])
+    agent_response = collect_response(response_gen)
 
     # Assert that the model without the agent prompt does not include the summary of purchases
     assert all([expected_response not in no_agent_response for expected_response in expected_responses]), (
@@ -711,3 +712,12 @@ def populate_chat_history(message_list):
             conversation_log=[],
         )
     return conversation_log
+
+
+def collect_response(response_gen) -> str:
+    "Join chunks of chat response streamed by the chat model"
+
+    async def collect():
+        return "".join([response_chunk async for response_chunk in response_gen])
+
+    return asyncio.run(collect())
@@ -2,8 +2,10 @@ import os
 import re
 import time
 
+from khoj.processor.content import extraction
 from khoj.processor.content.org_mode.org_to_entries import OrgToEntries
 from khoj.processor.content.text_to_entries import TextToEntries
+from khoj.utils import state
 from khoj.utils.fs_syncer import get_org_files
 from khoj.utils.helpers import is_none_or_empty
 from khoj.utils.rawconfig import Entry, TextContentConfig
@@ -397,6 +399,27 @@ def test_extract_entries_with_different_level_headings(tmp_path):
     assert entries[1][1].raw == "* Heading 2\n"
 
 
+def test_extract_entries_in_parallel_matches_serial_extraction(tmp_path, monkeypatch):
+    "Parse org files on the extraction process pool in the same order as parsing them serially."
+    # Arrange
+    data = {f"{tmp_path}/note{idx}.org": f"* Heading {idx}\n- Body of note {idx}\n" for idx in range(8)}
+    serial_entries = OrgToEntries.extract_org_entries(org_files=data)
+    monkeypatch.setattr(extraction, "EXTRACTION_WORKERS", 2)
+    monkeypatch.setenv("KHOJ_EXTRACTION_PARALLEL_MIN_BYTES", "0")
+
+    # Act
+    try:
+        parallel_entries = OrgToEntries.extract_org_entries(org_files=data)
+    finally:
+        state.extraction_executor.shutdown()
+        state.extraction_executor = None
+
+    # Assert
+    assert parallel_entries[0] == serial_entries[0]
+    assert [entry.compiled for entry in parallel_entries[1]] == [entry.compiled for entry in serial_entries[1]]
+    assert [entry.file for entry in parallel_entries[1]] == list(data.keys())
+
+
 # Helper Functions
 def create_file(tmp_path, entry=None, filename="test.org"):
     org_file = tmp_path / filename
@@ -5,6 +5,7 @@ import pytest
 
 from khoj.processor.content.pdf.pdf_to_entries import PdfToEntries
 from khoj.utils.fs_syncer import get_pdf_files
+from khoj.utils.helpers import is_none_or_empty
 from khoj.utils.rawconfig import TextContentConfig
 
 
@@ -39,6 +40,21 @@ def test_multi_page_pdf_to_jsonl():
     assert len(entries[1]) == 6
 
 
+def test_extract_pdf_pages_lazily_from_memory():
+    "Extract text of each page of PDF file content in memory as it is requested."
+    # Arrange
+    with open("tests/data/pdf/multipage.pdf", "rb") as f:
+        pdf_bytes = f.read()
+
+    # Act
+    pages = PdfToEntries.extract_pages(pdf_bytes)
+    first_page = next(pages)
+
+    # Assert
+    assert not is_none_or_empty(first_page)
+    assert len(list(pages)) == 5
+
+
 @pytest.mark.skip(reason="Temporarily disabled OCR due to performance issues")
 def test_ocr_page_pdf_to_jsonl():
     "Convert multiple pages from single PDF file to jsonl."
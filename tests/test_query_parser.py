@@ -0,0 +1,51 @@
+from datetime import datetime
+
+from khoj.search_filter import query_parser
+from khoj.search_filter.query_parser import parse_query_filters
+
+
+# Test
+# ----------------------------------------------------------------------------------------------------
+def test_parse_query_filters():
+    # Arrange
+    query = 'head +"include_word" -"exclude_word" file:"*.org" -file:"file 1.org" dt>="1984-01-01" tail'
+
+    # Act
+    query_filters = parse_query_filters(query)
+
+    # Assert
+    assert query_filters.words == ("+include_word", "-exclude_word")
+    assert query_filters.files == ("*.org", "-file 1.org")
+    assert query_filters.dates == ("dt>='1984-01-01'",)
+    assert query_filters.date_range == (datetime(1984, 1, 1, 0, 0, 0).timestamp(), None)
+    assert query_filters.terms == query_filters.words + query_filters.files + query_filters.dates
+    assert query_filters.has_filters()
+    assert parse_query_filters("head tail").has_filters() == False
+
+
+# ----------------------------------------------------------------------------------------------------
+def test_parse_query_filters_once_per_query(monkeypatch):
+    # Arrange
+    query = 'head dt>="1984-01-04" dt<"1984-01-07" tail'
+    parse = query_parser.date_filter.parse
+    parsed_dates = []
+
+    def count_parse(date_str, relative_base=None):
+        parsed_dates.append(date_str)
+        return parse(date_str, relative_base)
+
+    monkeypatch.setattr(query_parser.date_filter, "parse", count_parse)
+    query_parser._parse_query_filters.cache_clear()
+
+    # Act
+    query_filters = parse_query_filters(query)
+    cached_query_filters = parse_query_filters(query)
+
+    # Assert
+    # Each date in query is parsed once and parsed filters are reused for the same query
+    assert parsed_dates == ["1984-01-04", "1984-01-07"]
+    assert cached_query_filters is query_filters
+    assert query_filters.date_range == (
+        datetime(1984, 1, 4, 0, 0, 0).timestamp(),
+        datetime(1984, 1, 7, 0, 0, 0).timestamp(),
+    )
@@ -0,0 +1,36 @@
+import asyncio
+import time
+
+import pytest
+
+from khoj.processor.conversation.utils import InformationCollectionIteration
+from khoj.routers.research import run_tools_in_parallel
+
+
+# Test
+# ----------------------------------------------------------------------------------------------------
+@pytest.mark.asyncio
+async def test_run_tools_in_parallel_with_timeouts():
+    # Arrange
+    iterations = [
+        InformationCollectionIteration(tool="online", query="fast"),
+        InformationCollectionIteration(tool="notes", query="fast"),
+        InformationCollectionIteration(tool="code", query="slow"),
+    ]
+
+    async def run_tool(iteration: InformationCollectionIteration):
+        yield f"Started {iteration.tool}"
+        await asyncio.sleep(0.2 if iteration.query == "fast" else 10)
+        iteration.summarizedResult = f"Ran {iteration.tool}"
+
+    # Act
+    start = time.perf_counter()
+    events = [event async for event in run_tools_in_parallel(iterations, run_tool, timeout=0.5)]
+    elapsed = time.perf_counter() - start
+
+    # Assert
+    assert sorted(events) == ["Started code", "Started notes", "Started online"]
+    # Tools ran concurrently and the slow tool was cancelled on timeout
+    assert elapsed < 1
+    assert [iteration.summarizedResult for iteration in iterations] == ["Ran online", "Ran notes", None]
+    assert iterations[2].warning == "Timed out running code tool after 0.5 seconds."
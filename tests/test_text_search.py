@@ -5,9 +5,17 @@ import os
 from pathlib import Path
 
 import pytest
-
-from khoj.database.adapters import EntryAdapters
-from khoj.database.models import Entry, GithubConfig, KhojUser, LocalOrgConfig
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from khoj.database.adapters import EntryAdapters, get_default_search_model
+from khoj.database.models import (
+    Entry,
+    EntryDates,
+    GithubConfig,
+    KhojUser,
+    LocalOrgConfig,
+)
 from khoj.processor.content.docx.docx_to_entries import DocxToEntries
 from khoj.processor.content.github.github_to_entries import GithubToEntries
 from khoj.processor.content.images.image_to_entries import ImageToEntries
@@ -17,6 +25,7 @@ from khoj.processor.content.pdf.pdf_to_entries import PdfToEntries
 from khoj.processor.content.plaintext.plaintext_to_entries import PlaintextToEntries
 from khoj.processor.content.text_to_entries import TextToEntries
 from khoj.search_type import text_search
+from khoj.utils import state
 from khoj.utils.fs_syncer import collect_files, get_org_files
 from khoj.utils.rawconfig import ContentConfig, SearchConfig
 
@@ -162,15 +171,215 @@ async def test_text_search(search_config: SearchConfig):
     )
 
     query = "Load Khoj on Emacs?"
+    latencies = {}
 
     # Act
     hits = await text_search.query(query, default_user)
     results = text_search.collate_results(hits)
     results = sorted(results, key=lambda x: float(x.score))[:1]
+    await text_search.query_batch([query], default_user, latencies=latencies)
 
     # Assert
     search_result = results[0].entry
     assert "Emacs load path" in search_result, 'Expected "Emacs load path" in entry'
+    # Latency of each search stage is reported
+    assert set(latencies.keys()) == {"encode", "filter", "ann"}
+
+
+# ----------------------------------------------------------------------------------------------------
+@pytest.mark.django_db
+def test_search_uses_vector_index(content_config: ContentConfig, default_user: KhojUser, monkeypatch):
+    # Arrange
+    search_model = build_vector_index()
+    monkeypatch.setattr(EntryAdapters, "vector_index_min_entries", 0)
+    question_embedding = state.embeddings_model[search_model.name].embed_query("Load Khoj on Emacs?")
+    index_name = EntryAdapters.get_embeddings_index_name(search_model)
+
+    # Act
+    relevant_entries = Entry.objects.filter(user=default_user)
+    indexed_entries = EntryAdapters.get_vector_index_queryset(relevant_entries, question_embedding, search_model, 3)
+    with transaction.atomic(), connection.cursor() as cursor:
+        # Test corpus is too small for the query planner to prefer the index over a sequential scan
+        cursor.execute("SET LOCAL enable_seqscan = off")
+        query_plan = indexed_entries.explain()
+    indexed_hits = EntryAdapters.search_with_embeddings(
+        "Load Khoj on Emacs?", question_embedding, default_user, max_results=3, search_model=search_model
+    )
+    exact_hits = EntryAdapters.search_with_embeddings(
+        "Load Khoj on Emacs?", question_embedding, default_user, max_results=3
+    )
+
+    # Assert
+    assert index_name in query_plan
+    assert len(indexed_hits) == 3
+    assert [hit.id for hit in indexed_hits] == [hit.id for hit in exact_hits]
+
+
+# ----------------------------------------------------------------------------------------------------
+@pytest.mark.django_db
+def test_search_caches_partition_size_check(content_config: ContentConfig, default_user: KhojUser, monkeypatch):
+    # Arrange
+    search_model = build_vector_index()
+    monkeypatch.setattr(EntryAdapters, "vector_index_min_entries", 0)
+    query = "Load Khoj on Emacs?"
+    question_embedding = state.embeddings_model[search_model.name].embed_query(query)
+    EntryAdapters.search_with_embeddings(query, question_embedding, default_user, search_model=search_model)
+
+    # Act
+    with CaptureQueriesContext(connection) as captured_queries:
+        hits = EntryAdapters.search_with_embeddings(query, question_embedding, default_user, search_model=search_model)
+
+    # Assert
+    assert len(hits) > 0
+    # Partition size of user entries is not counted again for the same filters
+    assert not any("COUNT(" in query["sql"] for query in captured_queries.captured_queries)
+
+
+# ----------------------------------------------------------------------------------------------------
+@pytest.mark.django_db
+def test_vector_index_search_falls_back_to_exact_search(
+    content_config: ContentConfig, default_user: KhojUser, default_user2: KhojUser, monkeypatch
+):
+    # Arrange
+    # Index few entries for second user, so entries of first user crowd out their candidates from the vector index
+    text_search.setup(
+        PlaintextToEntries, {"notes.txt": "Khoj can be loaded on Emacs"}, regenerate=False, user=default_user2
+    )
+    search_model = build_vector_index()
+    monkeypatch.setattr(EntryAdapters, "vector_index_min_entries", 0)
+    query = "Load Khoj on Emacs?"
+    question_embedding = state.embeddings_model[search_model.name].embed_query(query)
+
+    # Act
+    indexed_hits = EntryAdapters.search_with_embeddings(
+        query, question_embedding, default_user2, max_results=3, search_model=search_model
+    )
+    exact_hits = EntryAdapters.search_with_embeddings(query, question_embedding, default_user2, max_results=3)
+
+    # Assert
+    # Second user has fewer entries than requested results
+    assert len(indexed_hits) == 1
+    assert [hit.id for hit in indexed_hits] == [hit.id for hit in exact_hits]
+    assert all(hit.user_id == default_user2.id for hit in indexed_hits)
+
+
+# ----------------------------------------------------------------------------------------------------
+@pytest.mark.django_db
+def test_hybrid_search_finds_entries_by_exact_words(content_config: ContentConfig, default_user2: KhojUser):
+    # Arrange
+    text_search.setup(
+        PlaintextToEntries,
+        {
+            "emacs.txt": "Khoj can be loaded on Emacs",
+            "firmware.txt": "Flashing stopped with code XQ4021 after the board was unplugged",
+        },
+        regenerate=False,
+        user=default_user2,
+    )
+    search_model = get_default_search_model()
+    query = "Load Khoj on Emacs? XQ4021"
+    question_embedding = state.embeddings_model[search_model.name].embed_query(query)
+
+    # Act
+    vector_hits = EntryAdapters.search_with_embeddings(query, question_embedding, default_user2, max_distance=0.1)
+    hybrid_hits = EntryAdapters.search_with_embeddings(
+        query, question_embedding, default_user2, max_distance=0.1, hybrid=True
+    )
+
+    # Assert
+    assert not any("XQ4021" in hit.raw for hit in vector_hits)
+    # Entry with exact word in query is retrieved by full-text search even if too distant for vector search
+    assert any("XQ4021" in hit.raw for hit in hybrid_hits)
+    assert len({hit.id for hit in hybrid_hits}) == len(hybrid_hits)
+
+
+# ----------------------------------------------------------------------------------------------------
+@pytest.mark.django_db
+def test_date_filter_uses_entry_date_range(content_config: ContentConfig, default_user2: KhojUser):
+    # Arrange
+    text_search.setup(
+        PlaintextToEntries,
+        {
+            "trip.txt": "Left for Lisbon on 1984-04-01. Returned on 1984-04-09 and 1984-04-03 was the best day",
+            "notes.txt": "Khoj can be loaded on Emacs",
+        },
+        regenerate=False,
+        user=default_user2,
+    )
+
+    # Act
+    trip_entry = Entry.objects.get(user=default_user2, file_path="trip.txt")
+    filtered_entries = EntryAdapters.apply_filters(default_user2, 'Lisbon dt>="1984-04-02" dt<="1984-04-05"')
+
+    # Assert
+    assert (str(trip_entry.min_date), str(trip_entry.max_date)) == ("1984-04-01", "1984-04-09")
+    assert EntryDates.objects.filter(entry=trip_entry).count() == 3
+    # Entry with multiple dates in query date range is returned once
+    assert [entry.id for entry in filtered_entries] == [trip_entry.id]
+
+
+# ----------------------------------------------------------------------------------------------------
+@pytest.mark.django_db
+def test_vector_index_search_with_query_filters(content_config: ContentConfig, default_user: KhojUser, monkeypatch):
+    # Arrange
+    search_model = build_vector_index()
+    monkeypatch.setattr(EntryAdapters, "vector_index_min_entries", 0)
+    file_path = Entry.objects.filter(user=default_user).first().file_path
+    query = f'Load Khoj on Emacs? file:"{file_path}"'
+    question_embedding = state.embeddings_model[search_model.name].embed_query("Load Khoj on Emacs?")
+
+    # Act
+    indexed_hits = EntryAdapters.search_with_embeddings(
+        query, question_embedding, default_user, max_results=3, search_model=search_model
+    )
+    exact_hits = EntryAdapters.search_with_embeddings(query, question_embedding, default_user, max_results=3)
+
+    # Assert
+    assert len(indexed_hits) > 0
+    assert all(hit.file_path == file_path for hit in indexed_hits)
+    assert [hit.id for hit in indexed_hits] == [hit.id for hit in exact_hits]
+
+
+# ----------------------------------------------------------------------------------------------------
+@pytest.mark.django_db
+def test_batch_search_matches_search_per_query(content_config: ContentConfig, default_user: KhojUser):
+    # Arrange
+    search_model = get_default_search_model()
+    queries = ["Load Khoj on Emacs?", "How to git clone khoj?", 'Install dependencies -"conda"']
+    question_embeddings = state.embeddings_model[search_model.name].embed_queries(queries)
+
+    # Act
+    batch_hits = EntryAdapters.search_with_embeddings_batch(queries, question_embeddings, default_user, max_results=3)
+    hits_per_query = [
+        EntryAdapters.search_with_embeddings(query, question_embedding, default_user, max_results=3)
+        for query, question_embedding in zip(queries, question_embeddings)
+    ]
+
+    # Assert
+    assert len(batch_hits) == len(queries)
+    for query_batch_hits, query_hits in zip(batch_hits, hits_per_query):
+        assert [hit.id for hit in query_batch_hits] == [hit.id for hit in query_hits]
+
+
+# ----------------------------------------------------------------------------------------------------
+@pytest.mark.django_db
+def test_ensure_embeddings_index_drops_stale_index(content_config: ContentConfig, default_user: KhojUser):
+    # Arrange
+    search_model = get_default_search_model()
+    stale_index_name = f"entry_embeddings_{search_model.id}_stale_idx"
+    with connection.cursor() as cursor:
+        cursor.execute(f'CREATE INDEX "{stale_index_name}" ON "{Entry._meta.db_table}" (id)')
+
+    # Act
+    search_model = build_vector_index()
+
+    # Assert
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT indexname FROM pg_indexes WHERE indexname LIKE %s", [f"entry_embeddings_{search_model.id}_%"]
+        )
+        index_names = [row[0] for row in cursor.fetchall()]
+    assert index_names == [EntryAdapters.get_embeddings_index_name(search_model)]
 
 
 # ----------------------------------------------------------------------------------------------------
@@ -444,6 +653,47 @@ def test_update_index_with_deleted_file(
     EntryAdapters.delete_all_entries(default_user)
 
 
+# ----------------------------------------------------------------------------------------------------
+@pytest.mark.django_db
+def test_index_entries_in_batches(tmp_path, default_user: KhojUser, monkeypatch):
+    "Index entries in multiple embed and write batches."
+    # Arrange
+    monkeypatch.setattr(TextToEntries, "index_batch_size", 2)
+    data = {
+        f"{tmp_path}/notes.org": "\n".join(
+            f"* Note {idx} on 2024-0{idx}-01\n- Body of note {idx}" for idx in range(1, 6)
+        )
+    }
+
+    # Act
+    added_entries, _ = text_search.setup(OrgToEntries, data, regenerate=True, user=default_user)
+
+    # Assert
+    assert added_entries == 5
+    assert Entry.objects.filter(user=default_user).count() == 5
+    assert EntryDates.objects.filter(entry__user=default_user).count() == 5
+    verify_embeddings(5, default_user)
+
+
+# ----------------------------------------------------------------------------------------------------
+@pytest.mark.django_db
+def test_update_index_queries_do_not_scale_with_files(tmp_path, default_user: KhojUser, django_assert_max_num_queries):
+    "Identify entries to add, delete across all files with a constant number of queries."
+    # Arrange
+    data = {f"{tmp_path}/note{idx}.org": f"* Note {idx}\n- Body of note {idx}" for idx in range(20)}
+    text_search.setup(OrgToEntries, data, regenerate=True, user=default_user)
+    data[f"{tmp_path}/note0.org"] = "* Note 0\n- Updated body of note 0"
+
+    # Act
+    with django_assert_max_num_queries(20):
+        added_entries, deleted_entries = text_search.setup(OrgToEntries, data, regenerate=False, user=default_user)
+
+    # Assert
+    assert added_entries == 1
+    assert deleted_entries == 1
+    verify_embeddings(20, default_user)
+
+
 # ----------------------------------------------------------------------------------------------------
 @pytest.mark.skipif(os.getenv("GITHUB_PAT_TOKEN") is None, reason="GITHUB_PAT_TOKEN not set")
 def test_text_search_setup_github(content_config: ContentConfig, default_user: KhojUser):
@@ -468,3 +718,11 @@ def test_text_search_setup_github(content_config: ContentConfig, default_user: K
 def verify_embeddings(expected_count, user):
     embeddings = Entry.objects.filter(user=user, file_type="org").count()
     assert embeddings == expected_count
+
+
+def build_vector_index():
+    search_model = get_default_search_model()
+    search_model.embeddings_dimensions = state.embeddings_model[search_model.name].embeddings_dimensions()
+    search_model.save()
+    EntryAdapters.ensure_embeddings_index(search_model)
+    return search_model